@@ -0,0 +1,320 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from decimal import Decimal
+from time import perf_counter
+
+import django
+import rest_framework
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import exceptions
+from rest_framework.test import APIRequestFactory
+from store.models import Order, OrderLine, Product
+from store.serializers import OrderResponseSerializer
+
+from rest_batteries.errors_formatter import ErrorsFormatter
+
+from .views import OrderViewSet, ProductViewSet
+
+
+class Benchmark:
+    """
+    A single measured operation.
+
+    `setup` is called before every iteration and is not measured,
+    its return value is passed to `run`.
+    """
+
+    def __init__(self, name, run, setup=None):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda: None)
+
+    def measure(self, iterations, warmup):
+        for _ in range(warmup):
+            self.run(self.setup())
+
+        timings = []
+        for _ in range(iterations):
+            argument = self.setup()
+            started_at = perf_counter()
+            self.run(argument)
+            timings.append(perf_counter() - started_at)
+
+        argument = self.setup()
+        with CaptureQueriesContext(connection) as queries:
+            self.run(argument)
+
+        argument = self.setup()
+        tracemalloc.start()
+        try:
+            self.run(argument)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        timings.sort()
+        return {
+            'name': self.name,
+            'iterations': iterations,
+            'mean_ms': statistics.mean(timings) * 1000,
+            'p50_ms': _percentile(timings, 50) * 1000,
+            'p95_ms': _percentile(timings, 95) * 1000,
+            'ops_per_sec': len(timings) / sum(timings),
+            'queries': len(queries),
+            'peak_memory_kb': peak_memory / 1024,
+        }
+
+
+def _percentile(sorted_values, percentile):
+    index = round(percentile / 100 * (len(sorted_values) - 1))
+    return sorted_values[index]
+
+
+def create_dataset(*, orders, lines_per_order, products):
+    # Primary keys are not set by `bulk_create()` on older SQLite versions
+    Product.objects.bulk_create(
+        Product(name=f'product-{i}', price=Decimal(i % 100) + Decimal('0.99'))
+        for i in range(products)
+    )
+    Order.objects.bulk_create(Order() for _ in range(orders))
+    product_objects = list(Product.objects.order_by('pk'))
+    order_objects = list(Order.objects.order_by('pk'))
+    OrderLine.objects.bulk_create(
+        OrderLine(
+            order=order,
+            product=product_objects[(order_index + line_index) % len(product_objects)],
+            quantity=line_index + 1,
+        )
+        for order_index, order in enumerate(order_objects)
+        for line_index in range(lines_per_order)
+    )
+    return product_objects, order_objects
+
+
+def call_view(view, request, **kwargs):
+    response = view(request, **kwargs)
+    response.render()
+    assert response.status_code < 400, response.content
+    return response
+
+
+def get_view_benchmarks(products, orders):
+    factory = APIRequestFactory()
+    order_id, product_id = orders[0].id, products[0].id
+    order_payload = {
+        'lines': [{'product_id': product.id, 'quantity': 2} for product in products[:3]]
+    }
+
+    def spare_order():
+        order = Order.objects.create()
+        OrderLine.objects.create(order=order, product=products[0], quantity=1)
+        return order.id
+
+    def spare_product():
+        return Product.objects.create(name='spare-product', price=Decimal('1.00')).id
+
+    order_view = OrderViewSet.as_view
+    product_view = ProductViewSet.as_view
+    return [
+        Benchmark(
+            'orders.list',
+            lambda _: call_view(order_view({'get': 'list'}), factory.get('/orders/')),
+        ),
+        Benchmark(
+            'orders.retrieve',
+            lambda _: call_view(
+                order_view({'get': 'retrieve'}), factory.get(f'/orders/{order_id}/'), pk=order_id
+            ),
+        ),
+        Benchmark(
+            'orders.create',
+            lambda _: call_view(
+                order_view({'post': 'create'}),
+                factory.post('/orders/', order_payload, format='json'),
+            ),
+        ),
+        Benchmark(
+            'orders.update',
+            lambda _: call_view(
+                order_view({'put': 'update'}),
+                factory.put(f'/orders/{order_id}/', {'status': 1}, format='json'),
+                pk=order_id,
+            ),
+        ),
+        Benchmark(
+            'orders.partial_update',
+            lambda _: call_view(
+                order_view({'patch': 'partial_update'}),
+                factory.patch(f'/orders/{order_id}/', {'status': 2}, format='json'),
+                pk=order_id,
+            ),
+        ),
+        Benchmark(
+            'orders.destroy',
+            lambda pk: call_view(
+                order_view({'delete': 'destroy'}), factory.delete(f'/orders/{pk}/'), pk=pk
+            ),
+            setup=spare_order,
+        ),
+        Benchmark(
+            'products.list',
+            lambda _: call_view(product_view({'get': 'list'}), factory.get('/products/')),
+        ),
+        Benchmark(
+            'products.retrieve',
+            lambda _: call_view(
+                product_view({'get': 'retrieve'}),
+                factory.get(f'/products/{product_id}/'),
+                pk=product_id,
+            ),
+        ),
+        Benchmark(
+            'products.create',
+            lambda _: call_view(
+                product_view({'post': 'create'}),
+                factory.post('/products/', {'name': 'new', 'price': '9.99'}, format='json'),
+            ),
+        ),
+        Benchmark(
+            'products.update',
+            lambda _: call_view(
+                product_view({'put': 'update'}),
+                factory.put(
+                    f'/products/{product_id}/', {'name': 'new', 'price': '9.99'}, format='json'
+                ),
+                pk=product_id,
+            ),
+        ),
+        Benchmark(
+            'products.destroy',
+            lambda pk: call_view(
+                product_view({'delete': 'destroy'}), factory.delete(f'/products/{pk}/'), pk=pk
+            ),
+            setup=spare_product,
+        ),
+    ]
+
+
+def get_serializer_benchmarks():
+    def serialize_orders(_):
+        queryset = Order.objects.prefetch_related('lines__product')
+        return OrderResponseSerializer(queryset, many=True).data
+
+    return [Benchmark('serializers.order_response_many', serialize_orders)]
+
+
+def build_error_tree(size):
+    """
+    Builds a validation error with `size` invalid nested list items, similar to
+    what an invalid `OrderCreateSerializer` payload with many lines produces.
+    """
+    detail = {
+        'lines': [
+            {
+                'product_id': [exceptions.ErrorDetail('Invalid pk.', code='does_not_exist')],
+                'quantity': [exceptions.ErrorDetail('Ensure this value.', code='min_value')],
+                'meta': {'notes': [exceptions.ErrorDetail('Too long.', code='max_length')]},
+            }
+            for _ in range(size)
+        ],
+        'non_field_errors': [exceptions.ErrorDetail('Invalid order.', code='invalid')],
+    }
+    return exceptions.ValidationError(detail)
+
+
+def get_errors_formatter_benchmarks(size):
+    exception = build_error_tree(size)
+    return [Benchmark('errors_formatter.nested', lambda _: ErrorsFormatter(exception)())]
+
+
+def get_metadata(args):
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'commit': commit,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'djangorestframework': rest_framework.VERSION,
+        'orders': args.orders,
+        'lines_per_order': args.lines,
+        'products': args.products,
+        'error_tree_size': args.error_tree_size,
+        'iterations': args.iterations,
+    }
+
+
+def compare(results, baseline):
+    baseline_results = {result['name']: result for result in baseline['results']}
+    for result in results['results']:
+        previous = baseline_results.get(result['name'])
+        if previous is None:
+            continue
+        change = (result['mean_ms'] - previous['mean_ms']) / previous['mean_ms'] * 100
+        print(
+            f"{result['name']:<40} {previous['mean_ms']:>10.3f}ms -> {result['mean_ms']:>10.3f}ms "
+            f'({change:+.1f}%), queries {previous["queries"]} -> {result["queries"]}'
+        )
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Run django-rest-batteries benchmarks.')
+    parser.add_argument('--orders', type=int, default=100, help='Number of generated orders.')
+    parser.add_argument('--lines', type=int, default=5, help='Number of lines per order.')
+    parser.add_argument('--products', type=int, default=50, help='Number of products.')
+    parser.add_argument(
+        '--error-tree-size', type=int, default=500, help='Number of invalid nested items.'
+    )
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--filter', default='', help='Only run benchmarks containing this text.')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout.')
+    parser.add_argument('--compare', help='Compare results with a previous JSON output.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    call_command('migrate', verbosity=0)
+    products, orders = create_dataset(
+        orders=args.orders, lines_per_order=args.lines, products=args.products
+    )
+
+    benchmarks = [
+        *get_view_benchmarks(products, orders),
+        *get_serializer_benchmarks(),
+        *get_errors_formatter_benchmarks(args.error_tree_size),
+    ]
+    results = {
+        'meta': get_metadata(args),
+        'results': [
+            benchmark.measure(args.iterations, args.warmup)
+            for benchmark in benchmarks
+            if args.filter in benchmark.name
+        ],
+    }
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
@@ -0,0 +1,66 @@
+from rest_framework import routers, serializers
+from store.choices import OrderStatus
+from store.models import Order, Product
+from store.serializers import (
+    OrderCreateSerializer,
+    OrderResponseSerializer,
+    ProductResponseSerializer,
+)
+from store.services import create_order
+
+from rest_batteries.viewsets import ModelViewSet
+
+
+class ProductRequestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = (
+            'name',
+            'price',
+        )
+
+
+class OrderUpdateSerializer(serializers.ModelSerializer):
+    status = serializers.ChoiceField(choices=OrderStatus.choices)
+
+    class Meta:
+        model = Order
+        fields = ('status',)
+
+
+class ProductViewSet(ModelViewSet):
+    queryset = Product.objects.all()
+    request_action_serializer_classes = {
+        'create': ProductRequestSerializer,
+        'update': ProductRequestSerializer,
+    }
+    response_action_serializer_classes = {
+        'create': ProductResponseSerializer,
+        'retrieve': ProductResponseSerializer,
+        'list': ProductResponseSerializer,
+        'update': ProductResponseSerializer,
+    }
+
+
+class OrderViewSet(ModelViewSet):
+    queryset = Order.objects.prefetch_related('lines__product')
+    request_action_serializer_classes = {
+        'create': OrderCreateSerializer,
+        'update': OrderUpdateSerializer,
+    }
+    response_action_serializer_classes = {
+        'create': OrderResponseSerializer,
+        'retrieve': OrderResponseSerializer,
+        'list': OrderResponseSerializer,
+        'update': OrderResponseSerializer,
+    }
+
+    def perform_create(self, serializer):
+        return create_order(**serializer.validated_data)
+
+
+router = routers.SimpleRouter()
+router.register(r'products', ProductViewSet, basename='product')
+router.register(r'orders', OrderViewSet, basename='order')
+
+urlpatterns = router.urls
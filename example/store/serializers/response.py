@@ -1,9 +1,23 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum
 from rest_framework import serializers
 
+from rest_batteries.serializers import (
+    BatchFieldsMixin,
+    BatchMethodField,
+    CachedFieldsMixin,
+    MemoizedRepresentationMixin,
+)
+
 from ..models import Order, OrderLine, Product
 
+CENTS = Decimal('0.01')
+
 
-class ProductResponseSerializer(serializers.ModelSerializer):
+class ProductResponseSerializer(
+    MemoizedRepresentationMixin, CachedFieldsMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Product
         fields = (
@@ -13,7 +27,7 @@ class ProductResponseSerializer(serializers.ModelSerializer):
         )
 
 
-class OrderLineResponseSerializer(serializers.ModelSerializer):
+class OrderLineResponseSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     product = ProductResponseSerializer()
 
     class Meta:
@@ -25,8 +39,9 @@ class OrderLineResponseSerializer(serializers.ModelSerializer):
         )
 
 
-class OrderResponseSerializer(serializers.ModelSerializer):
+class OrderResponseSerializer(BatchFieldsMixin, CachedFieldsMixin, serializers.ModelSerializer):
     lines = OrderLineResponseSerializer(many=True)
+    total_price = BatchMethodField()
 
     class Meta:
         model = Order
@@ -36,3 +51,21 @@ class OrderResponseSerializer(serializers.ModelSerializer):
             'total_price',
             'lines',
         )
+
+    def get_total_price_batch(self, orders):
+        totals = dict(
+            OrderLine.objects.filter(order__in=orders)
+            .values('order')
+            .annotate(
+                total_price=Sum(
+                    F('product__price') * F('quantity'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                )
+            )
+            .values_list('order', 'total_price')
+        )
+        # SQLite returns computed decimals with 15 significant digits, e.g. `13.9400000000000`
+        return {
+            order.pk: totals[order.pk].quantize(CENTS) if order.pk in totals else 0
+            for order in orders
+        }
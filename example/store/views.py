@@ -1,7 +1,12 @@
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from rest_batteries.mixins import CreateModelMixin, ListModelMixin
+from rest_batteries.mixins import (
+    BatchRetrieveModelMixin,
+    CreateModelMixin,
+    ListModelMixin,
+    RetrieveModelMixin,
+)
 from rest_batteries.viewsets import GenericViewSet
 
 from .models import Order
@@ -11,6 +16,8 @@ from .services import cancel_order, create_order
 
 class OrderViewSet(
     CreateModelMixin,
+    RetrieveModelMixin,
+    BatchRetrieveModelMixin,
     ListModelMixin,
     GenericViewSet,
 ):
@@ -20,9 +27,14 @@ class OrderViewSet(
     }
     response_action_serializer_classes = {
         'create': OrderResponseSerializer,
+        'retrieve': OrderResponseSerializer,
         'list': OrderResponseSerializer,
         'cancel': OrderResponseSerializer,
     }
+    action_query_budgets = {
+        'list': 4,
+        'cancel': 5,
+    }
 
     def perform_create(self, serializer):
         return create_order(**serializer.validated_data)
@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class RestBatteriesConfig(AppConfig):
+    name = 'rest_batteries'
+    verbose_name = 'REST Batteries'
+    default_auto_field = 'django.db.models.AutoField'
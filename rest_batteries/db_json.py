@@ -0,0 +1,281 @@
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import TextField
+from django.db.models.expressions import RawSQL
+from rest_framework import fields, relations, serializers
+from rest_framework.settings import api_settings
+
+
+class NotCompilable(Exception):
+    """
+    Raised when a serializer can't be rendered to JSON in the database.
+    """
+
+
+# Fields whose representation is the database value as is
+PLAIN_FIELDS = (
+    fields.IntegerField,
+    fields.FloatField,
+    fields.CharField,
+    fields.EmailField,
+    fields.SlugField,
+    fields.URLField,
+    fields.ChoiceField,
+)
+
+INTEGER_FIELD_TYPES = (
+    'AutoField',
+    'BigAutoField',
+    'SmallAutoField',
+    'IntegerField',
+    'BigIntegerField',
+    'SmallIntegerField',
+    'PositiveIntegerField',
+    'PositiveBigIntegerField',
+    'PositiveSmallIntegerField',
+)
+
+JSON_OBJECT_FUNCTIONS = {
+    'sqlite': 'json_object',
+    'postgresql': 'json_build_object',
+    'mysql': 'JSON_OBJECT',
+}
+
+
+class JSONQueryCompiler:
+    """
+    Compiles a serializer field tree into SQL that builds the JSON representation
+    of a row in the database.
+
+    Supports plain model fields, primary key related fields, nested serializers
+    for forward foreign keys and nested `many=True` serializers for reverse foreign keys.
+    Raises `NotCompilable` for anything else, e.g. method fields, properties,
+    dates or serializers with custom `to_representation()`.
+    """
+
+    def __init__(self, connection):
+        if connection.vendor not in JSON_OBJECT_FUNCTIONS:
+            raise NotCompilable(f'{connection.vendor} database is not supported')
+
+        self.connection = connection
+        self.vendor = connection.vendor
+        self.alias_count = 0
+
+    def compile_expression(self, model, serializer):
+        """
+        Returns an expression of the JSON text of a row for querysets of the model.
+        """
+        sql, params = self.compile_object(serializer, model, model._meta.db_table)
+        if self.vendor == 'postgresql':
+            sql = f'CAST({sql} AS text)'
+        return RawSQL(sql, params, output_field=TextField())
+
+    def compile_columns(self, queryset, serializer):
+        """
+        Returns SQL and params of a query that aggregates every field of the rows of
+        the queryset into an array, as a JSON object of arrays by field name.
+        """
+        if self.vendor == 'mysql':
+            # `JSON_ARRAYAGG()` doesn't guarantee the order, the arrays must be aligned
+            raise NotCompilable('Columns are not supported on mysql')
+        self.check_representation(serializer)
+
+        model = queryset.model
+        columns = {}
+        for index, field in enumerate(serializer._readable_fields):
+            sql, params = self.compile_field(field, model, model._meta.db_table)
+            sql = f'json_quote({sql})' if self.vendor == 'sqlite' else f'to_json({sql})'
+            columns[field.field_name] = (f'_column_{index}', RawSQL(sql, params, TextField()))
+
+        rows = queryset.annotate(**dict(columns.values())).values_list(
+            *(alias for alias, _ in columns.values())
+        )
+        rows_sql, params = rows.query.sql_with_params()
+
+        pairs = []
+        for alias, _ in columns.values():
+            if self.vendor == 'sqlite':
+                array = f'json_group_array(json({self.quote(alias)}))'
+            else:
+                array = f"COALESCE(json_agg({self.quote(alias)}), '[]'::json)"
+            pairs.append(f'%s, {array}')
+        params = (*columns, *params)
+
+        sql = f'{JSON_OBJECT_FUNCTIONS[self.vendor]}({", ".join(pairs)})'
+        if self.vendor == 'postgresql':
+            sql = f'CAST({sql} AS text)'
+        return f'SELECT {sql} FROM ({rows_sql}) AS rb_json_rows', params
+
+    def compile_object(self, serializer, model, alias):
+        self.check_representation(serializer)
+
+        pairs, params = [], []
+        for field in serializer._readable_fields:
+            sql, field_params = self.compile_field(field, model, alias)
+            pairs.append(f'%s, {sql}')
+            params.extend([field.field_name, *field_params])
+
+        return f'{JSON_OBJECT_FUNCTIONS[self.vendor]}({", ".join(pairs)})', params
+
+    def check_representation(self, serializer):
+        if type(serializer).to_representation is not serializers.Serializer.to_representation:
+            raise NotCompilable(f'{serializer.__class__.__name__} has custom to_representation()')
+
+    def compile_field(self, field, model, alias):
+        if len(field.source_attrs) != 1:
+            raise NotCompilable(f'Field `{field.field_name}` has a dotted source')
+
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist:
+            if field.source_attrs[0] != 'pk':
+                raise NotCompilable(f'Field `{field.field_name}` is not a model field')
+            model_field = model._meta.pk
+
+        if isinstance(field, serializers.ListSerializer):
+            return self.compile_many(field.child, model_field, alias)
+        if isinstance(field, serializers.Serializer):
+            return self.compile_one(field, model_field, alias)
+
+        if not model_field.concrete:
+            raise NotCompilable(f'Field `{field.field_name}` is not a concrete model field')
+
+        column = f'{self.quote(alias)}.{self.quote(model_field.column)}'
+        if isinstance(field, relations.PrimaryKeyRelatedField):
+            if (
+                not model_field.is_relation
+                or field.pk_field is not None
+                or model_field.target_field.get_internal_type() not in INTEGER_FIELD_TYPES
+            ):
+                raise NotCompilable(f'Field `{field.field_name}` is not an integer foreign key')
+            return column, []
+        if model_field.is_relation:
+            raise NotCompilable(f'Field `{field.field_name}` is a relation')
+        return self.compile_value(field, column), []
+
+    def compile_value(self, field, column):
+        field_class = type(field)
+        if field_class in PLAIN_FIELDS:
+            return column
+
+        if field_class is fields.BooleanField:
+            if self.vendor == 'sqlite':
+                return (
+                    f"CASE WHEN {column} IS NULL THEN NULL "
+                    f"WHEN {column} THEN json('true') ELSE json('false') END"
+                )
+            if self.vendor == 'mysql':
+                return (
+                    f"IF({column} IS NULL, NULL, "
+                    f"IF({column}, CAST('true' AS JSON), CAST('false' AS JSON)))"
+                )
+            return column
+
+        if field_class is fields.DecimalField and not field.localize:
+            coerce_to_string = getattr(field, 'coerce_to_string', None)
+            if coerce_to_string is None:
+                coerce_to_string = api_settings.COERCE_DECIMAL_TO_STRING
+            if not coerce_to_string:
+                return column
+            if field.decimal_places is not None:
+                places = int(field.decimal_places)
+                if self.vendor == 'sqlite':
+                    return f"printf('%%.{places}f', {column})"
+                if self.vendor == 'postgresql':
+                    return f'CAST(ROUND({column}, {places}) AS text)'
+                return f'CAST(ROUND({column}, {places}) AS CHAR)'
+
+        raise NotCompilable(
+            f'Field `{field.field_name}` of {field_class.__name__} is not supported'
+        )
+
+    def compile_one(self, serializer, model_field, alias):
+        if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+            raise NotCompilable(f'Field `{model_field.name}` is not a forward foreign key')
+
+        related_model = model_field.related_model
+        related_alias = self.get_alias()
+        sql, params = self.compile_object(serializer, related_model, related_alias)
+        sql = (
+            f'SELECT {sql} FROM {self.quote(related_model._meta.db_table)} '
+            f'{self.quote(related_alias)} WHERE {self.quote(related_alias)}.'
+            f'{self.quote(model_field.target_field.column)} = '
+            f'{self.quote(alias)}.{self.quote(model_field.column)}'
+        )
+        return self.wrap_json(f'({sql})'), params
+
+    def compile_many(self, serializer, model_field, alias):
+        if not model_field.one_to_many or not model_field.auto_created:
+            raise NotCompilable(f'Field `{model_field.name}` is not a reverse foreign key')
+
+        related_model = model_field.related_model
+        foreign_key = model_field.field
+        related_alias = self.get_alias()
+        sql, params = self.compile_object(serializer, related_model, related_alias)
+        table = f'{self.quote(related_model._meta.db_table)} {self.quote(related_alias)}'
+        where = (
+            f'{self.quote(related_alias)}.{self.quote(foreign_key.column)} = '
+            f'{self.quote(alias)}.{self.quote(foreign_key.target_field.column)}'
+        )
+
+        if self.vendor == 'mysql':
+            # Derived tables can't reference outer queries, the order is not guaranteed
+            sql = f'COALESCE(JSON_ARRAYAGG({sql}), JSON_ARRAY())'
+            return f'(SELECT {sql} FROM {table} WHERE {where})', params
+
+        ordering = self.get_ordering(related_model, related_alias)
+        rows = f'SELECT {sql} AS obj FROM {table} WHERE {where} ORDER BY {ordering}'
+        if self.vendor == 'sqlite':
+            return f'(SELECT json_group_array(json(obj)) FROM ({rows}))', params
+        return f"(SELECT COALESCE(json_agg(obj), '[]'::json) FROM ({rows}) AS rows)", params
+
+    def get_ordering(self, model, alias):
+        ordering = []
+        for name in model._meta.ordering or ['pk']:
+            if not isinstance(name, str) or '__' in name or name.lstrip('-') == '?':
+                raise NotCompilable(f'Ordering of {model.__name__} is not supported')
+
+            field_name = name.lstrip('-')
+            field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+            direction = ' DESC' if name.startswith('-') else ''
+            ordering.append(f'{self.quote(alias)}.{self.quote(field.column)}{direction}')
+        return ', '.join(ordering)
+
+    def wrap_json(self, sql):
+        # SQLite would embed JSON returned by subqueries as a string
+        if self.vendor == 'sqlite':
+            return f'json({sql})'
+        return sql
+
+    def get_alias(self):
+        self.alias_count += 1
+        return f'rb_json_{self.alias_count}'
+
+    def quote(self, name):
+        return self.connection.ops.quote_name(name)
+
+
+def get_json_expression(queryset, serializer):
+    """
+    Returns an expression of the JSON text of a row to annotate the queryset with,
+    raises `NotCompilable` if the serializer can't be compiled.
+    """
+    compiler = JSONQueryCompiler(connections[queryset.db])
+    return compiler.compile_expression(queryset.model, serializer)
+
+
+def get_columnar_json(queryset, serializer):
+    """
+    Returns the columnar JSON text of the rows of the queryset with arrays of field values
+    built by the database, raises `NotCompilable` if the serializer can't be compiled.
+    """
+    connection = connections[queryset.db]
+    sql, params = JSONQueryCompiler(connection).compile_columns(queryset, serializer)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        data = cursor.fetchone()[0]
+
+    columns = [field.field_name for field in serializer._readable_fields]
+    return f'{{"columns":{json.dumps(columns, separators=(",", ":"))},"data":{data}}}'
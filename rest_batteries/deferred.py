@@ -0,0 +1,144 @@
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from django.core import exceptions as django_exceptions
+from django.core.cache import caches
+from django.db import connections
+from django.utils.module_loading import import_string
+from rest_framework import exceptions as rest_exceptions
+from rest_framework.fields import get_error_detail
+
+from .errors_formatter import ErrorsFormatter
+from .settings import get_setting
+
+logger = logging.getLogger('rest_batteries.deferred')
+
+
+class JobStatus:
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+
+@dataclass
+class Job:
+    """
+    A deferred `perform_*()` call.
+    `result` is the response serializer output, `errors` is the formatted error.
+    """
+
+    id: str
+    user_pk: Any = None
+    status: str = JobStatus.PENDING
+    result: Optional[dict] = None
+    errors: Optional[list] = None
+
+
+class BaseJobExecutor:
+    """
+    Runs deferred jobs. `fn` is the callable to run, adapters for task queues
+    have to be able to serialize it.
+    """
+
+    def submit(self, fn, *args):
+        raise NotImplementedError
+
+
+class ImmediateJobExecutor(BaseJobExecutor):
+    """
+    Runs jobs right away in the request thread. Useful for tests.
+    """
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+class ThreadPoolJobExecutor(BaseJobExecutor):
+    """
+    Runs jobs in a thread pool of the web worker process.
+    Jobs are lost when the process is stopped.
+    """
+
+    def __init__(self, max_workers=None):
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or get_setting('DEFERRED_MAX_WORKERS'),
+            thread_name_prefix='rest_batteries_deferred',
+        )
+
+    def submit(self, fn, *args):
+        self.pool.submit(self._run, fn, *args)
+
+    def _run(self, fn, *args):
+        try:
+            fn(*args)
+        finally:
+            # Database connections are per thread, don't leak them
+            connections.close_all()
+
+
+class CacheJobStore:
+    """
+    Stores jobs in Django's cache, which has to be shared between processes.
+    """
+
+    key_prefix = 'rest_batteries:jobs:'
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, job_id) -> Optional[Job]:
+        return self.cache.get(self.key_prefix + str(job_id))
+
+    def save(self, job):
+        self.cache.set(self.key_prefix + job.id, job, get_setting('DEFERRED_JOB_TTL'))
+
+
+_executors = {}
+
+
+def get_job_executor() -> BaseJobExecutor:
+    path = get_setting('DEFERRED_EXECUTOR')
+    executor = _executors.get(path)
+    if executor is None:
+        executor = _executors[path] = import_string(path)()
+    return executor
+
+
+def get_job_store():
+    return import_string(get_setting('DEFERRED_JOB_STORE'))()
+
+
+def create_job(user_pk=None) -> Job:
+    job = Job(id=uuid.uuid4().hex, user_pk=user_pk)
+    get_job_store().save(job)
+    return job
+
+
+def run_job(job, fn, *args):
+    store = get_job_store()
+    job.status = JobStatus.RUNNING
+    store.save(job)
+
+    try:
+        job.result = fn(*args)
+    except Exception as exc:
+        job.status = JobStatus.FAILED
+        job.errors = format_job_error(exc)['errors']
+    else:
+        job.status = JobStatus.SUCCEEDED
+    store.save(job)
+
+
+def format_job_error(exc) -> dict:
+    if isinstance(exc, django_exceptions.ValidationError):
+        exc = rest_exceptions.ValidationError(get_error_detail(exc))
+
+    if not isinstance(exc, rest_exceptions.APIException):
+        logger.exception('Deferred job failed')
+        exc = rest_exceptions.APIException()
+
+    return ErrorsFormatter(exc)()
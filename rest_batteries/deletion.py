@@ -0,0 +1,100 @@
+from collections import Counter
+
+from django.db import models, router, transaction
+from django.db.models import signals
+from django.db.models.deletion import get_candidate_relations_to_delete
+
+
+def delete_in_chunks(instance, chunk_size=500, delete=None, check=None):
+    """
+    Deletes the instance with its cascade, deleting dependent rows bottom-up
+    in chunks of `chunk_size`, each chunk in a short transaction.
+
+    Rows of models without delete signals are deleted with raw `DELETE` queries,
+    without loading them. Falls back to `instance.delete()` if the cascade has
+    relations that can't be deleted in chunks: `PROTECT`, `RESTRICT`, `SET_DEFAULT`,
+    `SET()`, generic relations and multi-table inheritance.
+
+    The instance itself is deleted last with `instance.delete()`, so its custom
+    `delete()` method and signals are called. Returns the same value as `delete()`.
+    Pass `delete` to call instead of `instance.delete()`, e.g. to make it conditional.
+    `check` is called in the transaction of every chunk before it's deleted,
+    it can raise to stop the deletion.
+    """
+    model = instance.__class__
+    delete = delete or instance.delete
+    if not can_delete_in_chunks(model):
+        return delete()
+
+    using = router.db_for_write(model, instance=instance)
+    counter = Counter()
+    _delete_dependents(model, [instance.pk], using, chunk_size, counter, check)
+
+    _, deleted = delete()
+    counter.update(deleted)
+    return sum(counter.values()), dict(counter)
+
+
+def can_delete_in_chunks(model, _seen=None) -> bool:
+    seen = _seen if _seen is not None else set()
+    if model in seen:
+        return True
+    seen.add(model)
+
+    if any(hasattr(field, 'bulk_related_objects') for field in model._meta.private_fields):
+        return False
+
+    for relation in get_candidate_relations_to_delete(model._meta):
+        on_delete = relation.on_delete
+        if on_delete in (models.DO_NOTHING, models.SET_NULL):
+            continue
+        if on_delete is not models.CASCADE:
+            return False
+        if relation.related_model._meta.parents:
+            return False
+        if not can_delete_in_chunks(relation.related_model, seen):
+            return False
+    return True
+
+
+def _delete_dependents(model, pks, using, chunk_size, counter, check):
+    for relation in get_candidate_relations_to_delete(model._meta):
+        related_model = relation.related_model
+        field_name = relation.field.name
+        queryset = related_model._base_manager.using(using).filter(**{f'{field_name}__in': pks})
+
+        if relation.on_delete not in (models.SET_NULL, models.CASCADE):
+            continue
+        while True:
+            chunk = list(queryset.values_list('pk', flat=True)[:chunk_size])
+            if not chunk:
+                break
+            if relation.on_delete is models.SET_NULL:
+                _set_null_chunk(related_model, field_name, chunk, using, check)
+            else:
+                _delete_dependents(related_model, chunk, using, chunk_size, counter, check)
+                _delete_chunk(related_model, chunk, using, counter, check)
+
+
+def _set_null_chunk(model, field_name, pks, using, check):
+    queryset = model._base_manager.using(using).filter(pk__in=pks)
+    with transaction.atomic(using=using, savepoint=False):
+        if check is not None:
+            check()
+        queryset.update(**{field_name: None})
+
+
+def _delete_chunk(model, pks, using, counter, check):
+    queryset = model._base_manager.using(using).filter(pk__in=pks)
+    with transaction.atomic(using=using, savepoint=False):
+        if check is not None:
+            check()
+        if _has_signal_listeners(model):
+            _, deleted = queryset.delete()
+            counter.update(deleted)
+        else:
+            counter[model._meta.label] += queryset._raw_delete(using)
+
+
+def _has_signal_listeners(model) -> bool:
+    return signals.pre_delete.has_listeners(model) or signals.post_delete.has_listeners(model)
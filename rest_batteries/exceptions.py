@@ -0,0 +1,33 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when an action executes more database queries than its budget allows.
+    """
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = _('Idempotency key was already used for a different request.')
+    default_code = 'idempotency_key_reused'
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('A request with the same idempotency key is still in progress.')
+    default_code = 'idempotency_key_in_progress'
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = _('The object was changed, its version does not match `If-Match` header.')
+    default_code = 'precondition_failed'
+
+
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = _('The object was changed by another request.')
+    default_code = 'version_conflict'
@@ -1,9 +1,35 @@
-from typing import Optional, Type
+import cProfile
+import hashlib
+import hmac
+import logging
+import random
+from contextlib import contextmanager
+from time import monotonic, sleep
+from typing import Any, Dict, Optional, Tuple, Type
 
 from django.core.exceptions import ImproperlyConfigured
-from rest_framework import generics
+from django.db import models, router, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
+from django.utils.module_loading import import_string
+from rest_framework import generics, status
+from rest_framework.permissions import AND, NOT, OR, SAFE_METHODS, BasePermission
+from rest_framework.response import Response
 from rest_framework.serializers import BaseSerializer
 
+from . import metrics, routing
+from .coalescing import single_flight
+from .deferred import create_job, get_job_executor, run_job
+from .exceptions import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    PreconditionFailed,
+    VersionConflict,
+)
+from .idempotency import BaseIdempotencyStore, IdempotencyRecord, get_request_hash
+from .identity_map import IdentityMap
+from .instrumentation import NULL_PHASE, RequestTrace
 from .mixins import (
     CreateModelMixin,
     DestroyModelMixin,
@@ -12,12 +38,621 @@ from .mixins import (
     RetrieveModelMixin,
     UpdateModelMixin,
 )
+from .permissions import has_queryset_filter
+from .profiling import BaseProfileSink, get_profile_sink
+from .settings import get_setting
+from .signals import request_trace_finished
+
+profiling_logger = logging.getLogger('rest_batteries.profiling')
+slow_action_logger = logging.getLogger('rest_batteries.slow_actions')
 
 
 class GenericAPIView(DjangoValidationErrorTransformMixin, generics.GenericAPIView):
     request_serializer_class: Optional[Type[BaseSerializer]] = None
     destroy_request_serializer_class: Optional[Type[BaseSerializer]] = None
     response_serializer_class: Optional[Type[BaseSerializer]] = None
+    phase_timing_enabled: Optional[bool] = None
+    metrics_enabled: Optional[bool] = None
+    slow_threshold: Optional[float] = None
+    request_trace: Optional[RequestTrace] = None
+    _object_permission_results: Optional[Dict[tuple, bool]] = None
+    _identity_map: Optional[IdentityMap] = None
+    _object = None
+    idempotency_header = 'Idempotency-Key'
+    idempotency_store: Optional[BaseIdempotencyStore] = None
+    idempotency_poll_interval = 0.05
+    coalesce_requests = False
+    deferred = False
+    version_field: Optional[str] = None
+    side_loading = False
+    profiling_sample_rate: Optional[float] = None
+    profile_sink: Optional[BaseProfileSink] = None
+    db_alias: Optional[str] = None
+    _replica_alias: Optional[str] = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.should_profile(request):
+            return self._dispatch(request, *args, **kwargs)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active, e.g. of an outer view
+            return self._dispatch(request, *args, **kwargs)
+
+        try:
+            return self._dispatch(request, *args, **kwargs)
+        finally:
+            profiler.disable()
+            self.save_profile(request, profiler)
+
+    def _dispatch(self, request, *args, **kwargs):
+        trace = self.get_request_trace(request)
+        if trace is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        self.request_trace = trace
+        with trace.capture():
+            response = super().dispatch(request, *args, **kwargs)
+            if not getattr(response, 'is_rendered', True):
+                with trace.phase('render'):
+                    response.render()
+
+        self.finish_request_trace(trace, response)
+        return response
+
+    def get_dispatch_action(self, request) -> str:
+        """
+        Returns the name of the handler before `initial()`, when `self.action` isn't set yet.
+        """
+        return request.method.lower()
+
+    def should_profile(self, request) -> bool:
+        sample_rate = self.get_profiling_sample_rate(request)
+        if sample_rate and random.random() < sample_rate:
+            return True
+
+        secret = get_setting('PROFILING_SECRET')
+        if not secret:
+            return False
+        header = 'HTTP_' + get_setting('PROFILING_HEADER').upper().replace('-', '_')
+        value = request.META.get(header)
+        # WSGI decodes headers as latin-1, `compare_digest()` doesn't accept non-ASCII strings
+        return value is not None and hmac.compare_digest(value.encode('latin-1'), secret.encode())
+
+    def get_profiling_sample_rate(self, request) -> float:
+        if self.profiling_sample_rate is not None:
+            return self.profiling_sample_rate
+        return get_setting('PROFILING_SAMPLE_RATE')
+
+    def get_profile_key(self, request) -> str:
+        view_class = self.__class__
+        action = self.get_dispatch_action(request)
+        return f'{view_class.__module__}.{view_class.__qualname__}.{action}'
+
+    def save_profile(self, request, profiler):
+        sink = self.profile_sink or get_profile_sink()
+        try:
+            sink.save(self.get_profile_key(request), profiler)
+        except Exception:
+            profiling_logger.exception('Failed to save the profile of %s', self.__class__.__name__)
+
+    def get_request_trace(self, request) -> Optional[RequestTrace]:
+        if self.get_slow_threshold_or_none(request) is not None:
+            return RequestTrace(record_queries=True, record_frames=True)
+        if self.is_phase_timing_enabled() or self.is_metrics_enabled():
+            return RequestTrace()
+
+    def is_phase_timing_enabled(self) -> bool:
+        if self.phase_timing_enabled is not None:
+            return self.phase_timing_enabled
+        return get_setting('PHASE_TIMING')
+
+    def is_metrics_enabled(self) -> bool:
+        if self.metrics_enabled is not None:
+            return self.metrics_enabled
+        return get_setting('METRICS_ENABLED')
+
+    def finish_request_trace(self, trace, response):
+        if self.is_phase_timing_enabled():
+            response['Server-Timing'] = trace.get_server_timing()
+        if self.is_metrics_enabled():
+            self.record_metrics(trace, response)
+        self.check_slow_action(trace, response)
+
+        request_trace_finished.send(
+            sender=self.__class__,
+            view=self,
+            request=self.request,
+            response=response,
+            trace=trace,
+        )
+
+    def get_metrics_labels(self) -> tuple:
+        view_class = self.__class__
+        return (
+            ('view', f'{view_class.__module__}.{view_class.__qualname__}'),
+            ('action', self.get_dispatch_action(self.request)),
+        )
+
+    def record_metrics(self, trace, response):
+        """
+        Records the latency, the number of queries, the response size
+        and error codes of `ErrorsFormatter` to the metrics store.
+        """
+        store = metrics.get_metrics_store()
+        labels = self.get_metrics_labels()
+        store.observe(metrics.REQUEST_DURATION, labels, trace.duration)
+        store.observe(metrics.REQUEST_QUERIES, labels, trace.query_count)
+        if not response.streaming:
+            store.observe(metrics.RESPONSE_SIZE, labels, len(response.content))
+
+        if response.status_code >= 400:
+            data = getattr(response, 'data', None)
+            errors = data.get('errors') if isinstance(data, dict) else None
+            codes = {error.get('code') for error in errors or () if isinstance(error, dict)}
+            codes.discard(None)
+            for code in sorted(codes) or ['unknown']:
+                store.inc(
+                    metrics.ERRORS,
+                    (*labels, ('status', str(response.status_code)), ('code', code)),
+                )
+
+    def get_slow_threshold_or_none(self, _request) -> Optional[float]:
+        if self.slow_threshold is not None:
+            return self.slow_threshold
+        return get_setting('SLOW_ACTION_THRESHOLD')
+
+    def check_slow_action(self, trace, response):
+        """
+        Logs requests that took longer than the threshold with the phase breakdown and
+        every query with its duration, the frame that issued it and the serializer field
+        that triggered it. The data is available in the `slow_action` attribute of the record.
+        """
+        threshold = self.get_slow_threshold_or_none(self.request)
+        if threshold is None or trace.duration <= threshold:
+            return
+
+        action = self.get_dispatch_action(self.request)
+        data = {
+            'view': f'{self.__class__.__module__}.{self.__class__.__qualname__}',
+            'action': action,
+            'status': response.status_code,
+            'duration': trace.duration,
+            'threshold': threshold,
+            'phases': [
+                {
+                    'name': phase.name,
+                    'duration': phase.duration,
+                    'query_count': phase.query_count,
+                    'query_time': phase.query_time,
+                }
+                for phase in trace.phases
+            ],
+            'queries': [
+                {
+                    'sql': query.sql,
+                    'duration': query.duration,
+                    'phase': query.phase,
+                    'frame': query.frame,
+                    'field': query.field,
+                }
+                for query in trace.queries
+            ],
+        }
+        slow_action_logger.warning(
+            '%s.%s took %.2fms, the threshold is %.2fms: %d queries in %.2fms',
+            self.__class__.__name__,
+            action,
+            trace.duration * 1000,
+            threshold * 1000,
+            trace.query_count,
+            trace.query_time * 1000,
+            extra={'slow_action': data},
+        )
+
+    def initial(self, request, *args, **kwargs):
+        with self.trace_phase('initial'):
+            super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if (
+            get_setting('READ_REPLICA_ALIASES')
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            self.pin_to_primary(response)
+        return response
+
+    def trace_phase(self, name):
+        if self.request_trace is None:
+            return NULL_PHASE
+        return self.request_trace.phase(name)
+
+    def render_response(self, request, response):
+        response = self.finalize_response(request, response, *self.args, **self.kwargs)
+        if not getattr(response, 'is_rendered', True):
+            with self.trace_phase('render'):
+                response.render()
+        return response
+
+    def call_idempotent(self, handler, request, *args, **kwargs):
+        """
+        Calls the handler once per `Idempotency-Key` header value.
+        Repeated requests with the same key get the stored response without calling
+        the handler, concurrent ones wait until the first request has finished.
+        """
+        key = self.get_idempotency_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+
+        store = self.get_idempotency_store()
+        record = IdempotencyRecord(request_hash=get_request_hash(request))
+        lock_timeout = get_setting('IDEMPOTENCY_LOCK_TIMEOUT')
+        deadline = monotonic() + lock_timeout
+        while not store.add(key, record, lock_timeout):
+            stored_record = store.get(key)
+            if stored_record is not None:
+                if stored_record.request_hash != record.request_hash:
+                    raise IdempotencyKeyReused()
+                if stored_record.is_completed:
+                    return self.get_idempotent_response(stored_record)
+            if monotonic() >= deadline:
+                raise IdempotencyKeyInProgress()
+            sleep(self.idempotency_poll_interval)
+
+        try:
+            response = self.render_response(request, handler(request, *args, **kwargs))
+        except BaseException:
+            # Let the client retry requests that failed
+            store.delete(key)
+            raise
+
+        if response.status_code >= 500:
+            store.delete(key)
+            return response
+
+        record.status_code = response.status_code
+        record.headers = list(response.items())
+        record.content = response.content
+        store.set(key, record, get_setting('IDEMPOTENCY_TTL'))
+        return response
+
+    def get_idempotency_key(self, request) -> Optional[str]:
+        value = request.headers.get(self.idempotency_header)
+        if not value:
+            return None
+
+        # Keys are scoped to the view and user, so clients can't replay each other's responses
+        view_name = f'{self.__class__.__module__}.{self.__class__.__qualname__}'
+        user_pk = getattr(request.user, 'pk', None)
+        return hashlib.sha256(f'{view_name}:{user_pk}:{value}'.encode()).hexdigest()
+
+    def get_idempotency_store(self) -> BaseIdempotencyStore:
+        if self.idempotency_store is not None:
+            return self.idempotency_store
+        return import_string(get_setting('IDEMPOTENCY_STORE'))()
+
+    def get_idempotent_response(self, record):
+        response = self.get_stored_response(record.status_code, record.headers, record.content)
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def get_stored_response(self, status_code, headers, content):
+        response = HttpResponse(content, status=status_code)
+        for header, value in headers:
+            response[header] = value
+        return response
+
+    def call_coalesced(self, handler, request, *args, **kwargs):
+        """
+        Coalesces identical concurrent requests when `coalesce_requests` is enabled.
+        Only one of them calls the handler, the others wait and get a copy of its response.
+        """
+        if not self.coalesce_requests:
+            return handler(request, *args, **kwargs)
+
+        own_response = None
+
+        def compute():
+            nonlocal own_response
+            own_response = self.render_response(request, handler(request, *args, **kwargs))
+            if own_response.streaming:
+                return None
+            # Copy the response before middlewares of this request change it
+            return own_response.status_code, list(own_response.items()), own_response.content
+
+        shared_response, is_leader = single_flight.do(self.get_coalescing_key(request), compute)
+        if is_leader:
+            return own_response
+        if shared_response is None:
+            return handler(request, *args, **kwargs)
+        return self.get_stored_response(*shared_response)
+
+    def is_deferred(self) -> bool:
+        return self.deferred
+
+    def defer(self, fn, *args):
+        """
+        Hands `fn` off to the deferred executor and responds with 202 Accepted and the job id.
+        The job is submitted when the transaction of the request is committed, if any,
+        so it sees the writes of the request and doesn't run when they are rolled back.
+        """
+        job = create_job(user_pk=getattr(self.request.user, 'pk', None))
+        data = {'id': job.id, 'status': job.status}
+        transaction.on_commit(
+            lambda: get_job_executor().submit(run_job, job, fn, *args),
+            using=self.get_queryset_db(),
+        )
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+
+    def get_coalescing_key(self, request) -> tuple:
+        query = tuple(sorted((key, tuple(values)) for key, values in request.query_params.lists()))
+        return (
+            self.__class__,
+            request.path,
+            query,
+            request.accepted_media_type,
+            getattr(request, 'LANGUAGE_CODE', None),
+            getattr(request.user, 'pk', None),
+            # Pinned clients must not get responses read from replicas
+            self.get_queryset_db(),
+        )
+
+    def get_permissions(self):
+        return [
+            self.instantiate_permission(permission_class)
+            for permission_class in self.permission_classes
+        ]
+
+    def instantiate_permission(self, permission_class):
+        if not getattr(permission_class, 'stateless', False):
+            return permission_class()
+
+        # Look up the class's own __dict__ to not share instances with parent view classes
+        permissions = self.__class__.__dict__.get('_stateless_permissions')
+        if permissions is None:
+            permissions = {}
+            setattr(self.__class__, '_stateless_permissions', permissions)
+
+        permission = permissions.get(permission_class)
+        if permission is None:
+            permission = permissions[permission_class] = permission_class()
+        return permission
+
+    def check_object_permissions(self, request, obj):
+        for permission in self.get_permissions():
+            if not self.has_object_permission(permission, request, obj):
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, 'message', None),
+                    code=getattr(permission, 'code', None),
+                )
+
+    def has_object_permission(self, permission, request, obj) -> bool:
+        """
+        Memoizes results of `permission.has_object_permission()` per request.
+        Composed permissions (`&`, `|`, `~`) and unsaved objects are not memoized.
+        """
+        pk = getattr(obj, 'pk', None)
+        if pk is None or not isinstance(permission, BasePermission):
+            return permission.has_object_permission(request, self, obj)
+
+        if self._object_permission_results is None:
+            self._object_permission_results = {}
+
+        key = (permission.__class__, obj.__class__, pk)
+        result = self._object_permission_results.get(key)
+        if result is None:
+            result = bool(permission.has_object_permission(request, self, obj))
+            self._object_permission_results[key] = result
+        return result
+
+    @property
+    def identity_map(self) -> IdentityMap:
+        if self._identity_map is None:
+            self._identity_map = IdentityMap()
+        return self._identity_map
+
+    def get_object(self):
+        """
+        Memoizes the object for the duration of the request.
+        Call `invalidate_object_cache()` after changing the object outside of
+        `perform_update()`/`perform_destroy()`.
+        """
+        if self._object is None:
+            with self.trace_phase('get_object'):
+                obj = self.get_object_from_identity_map()
+                if obj is None:
+                    obj = self.identity_map.add(super().get_object())
+            self._object = obj
+        return self._object
+
+    def get_object_from_identity_map(self):
+        if not self._identity_map:
+            return None
+
+        model = self.get_queryset().model
+        if self.lookup_field not in ('pk', model._meta.pk.name):
+            return None
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        obj = self._identity_map.get(model, self.kwargs.get(lookup_url_kwarg))
+        if obj is not None:
+            self.check_object_permissions(self.request, obj)
+        return obj
+
+    def invalidate_object_cache(self, obj=None):
+        obj = obj if obj is not None else self._object
+        self._object = None
+        if obj is None:
+            return
+
+        if self._identity_map:
+            self._identity_map.discard(obj)
+
+        if self._object_permission_results:
+            self._object_permission_results = {
+                key: result
+                for key, result in self._object_permission_results.items()
+                if key[1:] != (obj.__class__, obj.pk)
+            }
+
+    def get_etag(self, instance) -> Optional[str]:
+        if self.version_field is not None:
+            return quote_etag(str(getattr(instance, self.version_field)))
+
+    def get_etag_headers(self, instance) -> Dict[str, str]:
+        etag = self.get_etag(instance)
+        return {'ETag': etag} if etag is not None else {}
+
+    def check_preconditions(self, request, instance):
+        """
+        Responds with 412 if the `If-Match` header doesn't match the object's version.
+        """
+        if_match = request.headers.get('If-Match')
+        etag = self.get_etag(instance)
+        if if_match is None or etag is None:
+            return
+
+        # Weak comparison, `W/` prefixes are ignored
+        etags = [value[2:] if value.startswith('W/') else value for value in parse_etags(if_match)]
+        if '*' not in etags and etag not in etags:
+            raise PreconditionFailed()
+
+    @contextmanager
+    def versioned_write(self, instance):
+        """
+        Bumps the version with `UPDATE ... WHERE version = <loaded version>` before the write,
+        so concurrent writes of the same version fail with 409 instead of overwriting each other.
+        The row is locked only until the end of the write, not during validation.
+        """
+        if self.version_field is None:
+            yield
+            return
+
+        model = instance.__class__
+        using = router.db_for_write(model, instance=instance)
+        with transaction.atomic(using=using):
+            field = model._meta.get_field(self.version_field)
+            version = getattr(instance, field.attname)
+            if isinstance(field, models.DateTimeField):
+                next_version = timezone.now()
+            else:
+                next_version = version + 1
+
+            updated = (
+                model._base_manager.using(using)
+                .filter(pk=instance.pk, **{field.attname: version})
+                .update(**{field.attname: next_version})
+            )
+            if not updated:
+                raise VersionConflict()
+
+            setattr(instance, field.attname, next_version)
+            yield
+
+    def check_version(self, instance):
+        """
+        Raises `VersionConflict` if the object was written since it was loaded or since
+        its version was bumped. Locks the row until the end of the current transaction.
+        """
+        if self.version_field is None:
+            return
+
+        model = instance.__class__
+        field = model._meta.get_field(self.version_field)
+        rows = (
+            model._base_manager.using(router.db_for_write(model, instance=instance))
+            .select_for_update()
+            .filter(pk=instance.pk, **{field.attname: getattr(instance, field.attname)})
+        )
+        if not rows.exists():
+            raise VersionConflict()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        db = self.get_queryset_db()
+        if db is not None:
+            queryset = queryset.using(db)
+        return queryset
+
+    def get_db_alias_or_none(self) -> Optional[str]:
+        return self.db_alias
+
+    def get_queryset_db(self) -> Optional[str]:
+        """
+        Returns the database to run the queries of the request on,
+        `None` to leave it to database routers.
+
+        With `READ_REPLICA_ALIASES`, safe requests read from one of the replicas and
+        other requests use `PRIMARY_DB_ALIAS`. Clients that wrote recently are pinned
+        to the primary, so they read their own writes despite the replication lag.
+        """
+        replicas = get_setting('READ_REPLICA_ALIASES')
+        db = self.get_db_alias_or_none()
+        if db is None:
+            if not replicas:
+                return None
+            if self.request.method not in SAFE_METHODS:
+                return get_setting('PRIMARY_DB_ALIAS')
+            if self._replica_alias is None:
+                self._replica_alias = random.choice(replicas)
+            db = self._replica_alias
+
+        if db in replicas and self.is_pinned_to_primary(self.request):
+            return get_setting('PRIMARY_DB_ALIAS')
+        return db
+
+    def is_pinned_to_primary(self, request) -> bool:
+        return routing.is_pinned_to_primary(request)
+
+    def pin_to_primary(self, response):
+        routing.set_primary_pin(response, routing.make_primary_pin())
+
+    def filter_queryset(self, queryset):
+        with self.trace_phase('filter_queryset'):
+            queryset = super().filter_queryset(queryset)
+            return self.filter_queryset_by_permissions(queryset)
+
+    def filter_queryset_by_permissions(self, queryset):
+        for permission in self.get_permissions():
+            queryset = self.filter_queryset_for_permission(permission, queryset)
+        return queryset
+
+    def filter_queryset_for_permission(self, permission, queryset):
+        """
+        Applies `filter_queryset_for()` of the permission. Permissions composed with `&`
+        apply the filters of both operands, with `|` the union of them. Filters can't be
+        negated with `~` or combined with `|` with a permission that doesn't filter.
+        """
+        filter_queryset_for = getattr(permission, 'filter_queryset_for', None)
+        if filter_queryset_for is not None:
+            return filter_queryset_for(self.request, self, queryset)
+
+        if isinstance(permission, AND):
+            queryset = self.filter_queryset_for_permission(permission.op1, queryset)
+            return self.filter_queryset_for_permission(permission.op2, queryset)
+        if isinstance(permission, OR):
+            if has_queryset_filter(permission.op1) and has_queryset_filter(permission.op2):
+                return self.filter_queryset_for_permission(
+                    permission.op1, queryset
+                ) | self.filter_queryset_for_permission(permission.op2, queryset)
+        elif not isinstance(permission, NOT):
+            return queryset
+
+        if has_queryset_filter(permission):
+            raise ImproperlyConfigured(
+                f'{self.__class__.__name__} has a permission that filters querysets '
+                f'negated with `~` or combined with `|` with a permission that doesn\'t filter'
+            )
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        with self.trace_phase('paginate_queryset'):
+            return super().paginate_queryset(queryset)
 
     def get_request_serializer(self, *args, **kwargs) -> BaseSerializer:
         serializer = self.get_request_serializer_or_none(*args, **kwargs)
@@ -63,6 +698,20 @@ class GenericAPIView(DjangoValidationErrorTransformMixin, generics.GenericAPIVie
     def get_response_serializer_context(self):
         return self.get_serializer_context()
 
+    def is_side_loading(self) -> bool:
+        return self.side_loading
+
+    def serialize_side_loaded(self, serializer) -> Tuple[Any, Optional[dict]]:
+        """
+        Returns the data of the response serializer and objects of nested `SideLoadedMixin`
+        serializers by type and id, or `None` instead of them if side-loading is disabled.
+        """
+        if not self.is_side_loading():
+            return serializer.data, None
+
+        included = serializer.context['included'] = {}
+        return serializer.data, included
+
     def raise_response_serializer_error(self):
         raise ImproperlyConfigured(
             f'{self.__class__.__name__} should properly configure '
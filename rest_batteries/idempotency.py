@@ -0,0 +1,130 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import List, Optional, Tuple
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+
+@dataclass
+class IdempotencyRecord:
+    """
+    A request made with an `Idempotency-Key` header.
+    `status_code` is `None` until the first request has finished.
+    """
+
+    request_hash: str
+    status_code: Optional[int] = None
+    headers: Optional[List[Tuple[str, str]]] = None
+    content: Optional[bytes] = None
+
+    @property
+    def is_completed(self) -> bool:
+        return self.status_code is not None
+
+
+class BaseIdempotencyStore:
+    """
+    Storage of idempotency records.
+
+    `add()` has to be atomic: only one of the concurrent requests with the same key
+    may add the record, the others wait until it's completed.
+    """
+
+    def add(self, key, record, timeout) -> bool:
+        raise NotImplementedError
+
+    def get(self, key) -> Optional[IdempotencyRecord]:
+        raise NotImplementedError
+
+    def set(self, key, record, timeout):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class CacheIdempotencyStore(BaseIdempotencyStore):
+    """
+    Stores records in Django's cache.
+    The cache has to be shared between processes, e.g. Redis or Memcached.
+    """
+
+    key_prefix = 'rest_batteries:idempotency:'
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def add(self, key, record, timeout):
+        return self.cache.add(self.key_prefix + key, record, timeout)
+
+    def get(self, key):
+        return self.cache.get(self.key_prefix + key)
+
+    def set(self, key, record, timeout):
+        self.cache.set(self.key_prefix + key, record, timeout)
+
+    def delete(self, key):
+        self.cache.delete(self.key_prefix + key)
+
+
+class DatabaseIdempotencyStore(BaseIdempotencyStore):
+    """
+    Stores records in the `IdempotencyKey` table.
+    Requires `rest_batteries` in `INSTALLED_APPS`.
+    """
+
+    def __init__(self, using=None):
+        self.using = using
+
+    @property
+    def queryset(self):
+        from .models import IdempotencyKey
+
+        return IdempotencyKey.objects.using(self.using)
+
+    def add(self, key, record, timeout):
+        self.queryset.filter(key=key, expires_at__lte=timezone.now()).delete()
+        try:
+            with transaction.atomic(using=self.using):
+                self.queryset.create(key=key, **self._get_fields(record, timeout))
+        except IntegrityError:
+            return False
+        return True
+
+    def get(self, key):
+        row = self.queryset.filter(key=key, expires_at__gt=timezone.now()).first()
+        if row is not None:
+            return IdempotencyRecord(
+                request_hash=row.request_hash,
+                status_code=row.status_code,
+                headers=[tuple(header) for header in row.headers or ()],
+                content=bytes(row.content) if row.content is not None else None,
+            )
+
+    def set(self, key, record, timeout):
+        self.queryset.update_or_create(key=key, defaults=self._get_fields(record, timeout))
+
+    def delete(self, key):
+        self.queryset.filter(key=key).delete()
+
+    def _get_fields(self, record, timeout):
+        return {
+            'request_hash': record.request_hash,
+            'status_code': record.status_code,
+            'headers': record.headers,
+            'content': record.content,
+            'expires_at': timezone.now() + timedelta(seconds=timeout),
+        }
+
+
+def get_request_hash(request) -> str:
+    data = request.data
+    if hasattr(data, 'lists'):
+        # Keep all values of multi-value form fields
+        data = dict(data.lists())
+    payload = json.dumps([request.method, request.path, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
@@ -0,0 +1,56 @@
+from django.core.exceptions import ValidationError
+
+
+class IdentityMap:
+    """
+    Request-scoped map of model instances by model and primary key.
+
+    Repeated lookups of the same object during one request reuse the same instance
+    instead of repeating the query.
+    """
+
+    def __init__(self):
+        self._instances = {}
+        # Keys by instance id, as deleted instances don't have a primary key anymore
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._instances)
+
+    def get(self, model, pk):
+        key = self._get_key(model, pk)
+        if key is not None:
+            return self._instances.get(key)
+
+    def add(self, instance):
+        key = self._get_key(instance.__class__, instance.pk)
+        if key is not None:
+            self._instances[key] = instance
+            self._keys[id(instance)] = key
+        return instance
+
+    def discard(self, instance):
+        key = self._keys.pop(id(instance), None)
+        if key is not None and self._instances.get(key) is instance:
+            del self._instances[key]
+
+    def get_or_fetch(self, queryset, pk):
+        instance = self.get(queryset.model, pk)
+        if instance is None:
+            instance = self.add(queryset.get(pk=pk))
+        return instance
+
+    def clear(self):
+        self._instances.clear()
+        self._keys.clear()
+
+    def _get_key(self, model, pk):
+        if pk is None:
+            return None
+
+        opts = model._meta.concrete_model._meta
+        try:
+            pk = opts.pk.to_python(pk)
+        except (TypeError, ValueError, ValidationError):
+            return None
+        return opts.label, pk
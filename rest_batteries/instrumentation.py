@@ -0,0 +1,228 @@
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager, nullcontext
+from time import perf_counter
+from typing import List, Optional
+
+from django.db import connections
+from rest_framework.fields import Field
+from rest_framework.serializers import ListSerializer
+
+# Returned instead of a real phase when a request is not traced,
+# so that instrumented code paths cost a single attribute check.
+NULL_PHASE = nullcontext()
+
+
+class Phase:
+    """
+    A named, timed part of the request/response cycle.
+    """
+
+    __slots__ = ('name', 'duration', 'query_count', 'query_time')
+
+    def __init__(self, name):
+        self.name = name
+        self.duration = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+
+
+class QueryRecord:
+    """
+    A database query executed during a traced request.
+    """
+
+    __slots__ = ('sql', 'duration', 'phase', 'field', 'frame')
+
+    def __init__(self, sql, duration, phase=None, field=None, frame=None):
+        self.sql = sql
+        self.duration = duration
+        self.phase = phase
+        self.field = field
+        self.frame = frame
+
+
+class RepeatedQuery:
+    """
+    A group of near-identical queries, most likely caused by an N+1 problem.
+    """
+
+    __slots__ = ('sql', 'count', 'field')
+
+    def __init__(self, sql, count, field=None):
+        self.sql = sql
+        self.count = count
+        self.field = field
+
+    def __str__(self):
+        source = f'`{self.field}`' if self.field else 'unknown source'
+        return f'{self.count} similar queries triggered by {source}: {self.sql}'
+
+
+class RequestTrace:
+    """
+    Collects phase timings and database queries of a single request.
+
+    Queries are attributed to every phase active at the moment of execution,
+    so an outer phase (e.g. `get_object`) includes queries of an inner one
+    (e.g. `filter_queryset`).
+    """
+
+    def __init__(self, *, record_queries=False, record_frames=False):
+        self.record_queries = record_queries
+        self.record_frames = record_frames
+        self.queries: List[QueryRecord] = []
+        self.phases: List[Phase] = []
+        self.duration = 0.0
+        self.query_count = 0
+        self.query_time = 0.0
+        self._active_phases: List[Phase] = []
+        self._started_at = perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        phase = Phase(name)
+        self.phases.append(phase)
+        self._active_phases.append(phase)
+        started_at = perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.duration = perf_counter() - started_at
+            self._active_phases.pop()
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self._execute_wrapper))
+            try:
+                yield self
+            finally:
+                self.duration = perf_counter() - self._started_at
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        started_at = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record_query(sql, perf_counter() - started_at)
+
+    def record_query(self, sql, duration):
+        self.query_count += 1
+        self.query_time += duration
+        for phase in self._active_phases:
+            phase.query_count += 1
+            phase.query_time += duration
+
+        if self.record_queries:
+            phase_name = self._active_phases[-1].name if self._active_phases else None
+            self.queries.append(
+                QueryRecord(
+                    sql,
+                    duration,
+                    phase=phase_name,
+                    field=get_serializer_field_path(),
+                    frame=get_caller_frame() if self.record_frames else None,
+                )
+            )
+
+    def get_query_count(self, *, exclude_phases=()):
+        query_count = self.query_count
+        for phase in self.phases:
+            if phase.name in exclude_phases:
+                query_count -= phase.query_count
+        return query_count
+
+    def find_repeated_queries(self, threshold, *, exclude_phases=()) -> List[RepeatedQuery]:
+        """
+        Groups recorded queries by their normalized SQL and the serializer field
+        that triggered them, and returns groups of at least `threshold` queries.
+        """
+        counter = Counter(
+            (normalize_sql(query.sql), query.field)
+            for query in self.queries
+            if query.phase not in exclude_phases
+        )
+        return [
+            RepeatedQuery(sql, count, field=field)
+            for (sql, field), count in counter.most_common()
+            if count >= threshold
+        ]
+
+    def get_server_timing(self):
+        """
+        Returns the value of the `Server-Timing` header.
+        See https://www.w3.org/TR/server-timing/
+        """
+        metrics = [
+            f'{phase.name};dur={phase.duration * 1000:.2f};'
+            f'desc="{phase.query_count} queries in {phase.query_time * 1000:.2f}ms"'
+            for phase in self.phases
+        ]
+        metrics.append(f'db;dur={self.query_time * 1000:.2f};desc="{self.query_count} queries"')
+        metrics.append(f'total;dur={self.duration * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+_PLACEHOLDERS_RE = re.compile(r'\((?:\s*%s\s*,)*\s*%s\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    Makes queries that differ only in the number of `IN (...)` parameters identical.
+    """
+    sql = _PLACEHOLDERS_RE.sub('(%s, ...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+_SERIALIZER_FRAMES = {'to_representation', 'get_attribute'}
+
+
+def get_serializer_field_path() -> Optional[str]:
+    """
+    Returns a dotted path of the serializer field that is being serialized right now,
+    e.g. `OrderResponseSerializer.lines.product`, or `None` outside of serialization.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name in _SERIALIZER_FRAMES:
+            field = frame.f_locals.get('self')
+            if isinstance(field, Field):
+                return _get_field_path(field)
+        frame = frame.f_back
+    return None
+
+
+# Modules whose frames never issue queries on their own
+_LIBRARY_MODULES = ('django.', 'rest_framework.', 'contextlib', __name__)
+
+
+def get_caller_frame() -> Optional[str]:
+    """
+    Returns the innermost frame outside of Django and REST framework,
+    e.g. `store/services.py:12 in create_order`.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_LIBRARY_MODULES):
+            return f'{frame.f_code.co_filename}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def _get_field_path(field):
+    names = []
+    while field.parent is not None:
+        if field.field_name:
+            names.append(field.field_name)
+        field = field.parent
+
+    if isinstance(field, ListSerializer):
+        field = field.child
+    names.append(field.__class__.__name__)
+
+    return '.'.join(reversed(names))
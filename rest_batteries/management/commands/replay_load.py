@@ -0,0 +1,461 @@
+import json
+import random
+import sys
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from io import BytesIO
+from itertools import repeat
+from multiprocessing import get_context
+from time import perf_counter
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connections, transaction
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+from rest_framework import fields, relations, serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.encoders import JSONEncoder
+
+from ...instrumentation import RequestTrace
+from ...viewsets import GenericViewSet
+
+DETAIL_ACTIONS = {'retrieve', 'update', 'partial_update', 'destroy'}
+PAYLOAD_ACTIONS = {'create', 'update', 'partial_update'}
+DEFAULT_MIX = 'list=10,retrieve=10,create=1,update=1,destroy=1'
+
+
+class Route:
+    """
+    A URL pattern that dispatches to a `rest_batteries` ViewSet.
+    """
+
+    def __init__(self, viewset, url_name, actions, initkwargs):
+        self.viewset = viewset
+        self.url_name = url_name
+        self.actions = actions
+        self.initkwargs = initkwargs
+
+    def get_view(self, method, action):
+        view = self.viewset(**self.initkwargs)
+        view.action_map = self.actions
+        view.action = action
+        view.args = ()
+        view.kwargs = {}
+        view.format_kwarg = None
+        view.request = Request(APIRequestFactory().generic(method.upper(), '/'))
+        return view
+
+
+class Target:
+    """
+    An action of a route the load is replayed against.
+    """
+
+    def __init__(self, route, method, action, object_ids):
+        self.route = route
+        self.method = method.upper()
+        self.action = action
+        self.object_ids = object_ids
+        self.label = route.viewset.__name__
+        self.view = route.get_view(method, action)
+
+    def get_path(self, rng):
+        if self.action not in DETAIL_ACTIONS:
+            return reverse(self.route.url_name)
+
+        if self.action == 'destroy':
+            object_id = self.object_ids.pop(rng.randrange(len(self.object_ids)))
+        else:
+            object_id = rng.choice(self.object_ids)
+        lookup_url_kwarg = self.view.lookup_url_kwarg or self.view.lookup_field
+        return reverse(self.route.url_name, kwargs={lookup_url_kwarg: object_id})
+
+    def is_exhausted(self):
+        return self.action in DETAIL_ACTIONS and not self.object_ids
+
+
+class PayloadGenerator:
+    """
+    Generates request payloads that pass validation of the most common serializer fields.
+    """
+
+    def __init__(self, rng):
+        self.rng = rng
+        self._related_pks = {}
+
+    def generate(self, serializer):
+        data = {}
+        for field in serializer.fields.values():
+            if field.read_only:
+                continue
+            value = self.generate_field(field)
+            if value is not fields.empty:
+                data[field.field_name] = value
+        return data
+
+    def generate_field(self, field):
+        rng = self.rng
+        if isinstance(field, serializers.ListSerializer):
+            return [self.generate_field(field.child)]
+        if isinstance(field, serializers.BaseSerializer):
+            return self.generate(field)
+        if isinstance(field, relations.ManyRelatedField):
+            value = self.generate_field(field.child_relation)
+            return [] if value is fields.empty else [value]
+        if isinstance(field, relations.PrimaryKeyRelatedField):
+            pks = self.get_related_pks(field.get_queryset())
+            return rng.choice(pks) if pks else fields.empty
+        if isinstance(field, fields.BooleanField):
+            return rng.choice([True, False])
+        if isinstance(field, fields.ChoiceField):
+            choice = rng.choice(list(field.choices))
+            return [choice] if isinstance(field, fields.MultipleChoiceField) else choice
+        if isinstance(field, fields.IntegerField):
+            min_value = field.min_value if field.min_value is not None else 1
+            max_value = field.max_value if field.max_value is not None else min_value + 100
+            return rng.randint(min_value, max_value)
+        if isinstance(field, (fields.DecimalField, fields.FloatField)):
+            return str(rng.randint(1, 99))
+        if isinstance(field, fields.DateTimeField):
+            return timezone.now().isoformat()
+        if isinstance(field, fields.DateField):
+            return date.today().isoformat()
+        if isinstance(field, fields.UUIDField):
+            return str(uuid.uuid4())
+        if isinstance(field, fields.EmailField):
+            return f'load-{self.get_token(12)}@example.com'
+        if isinstance(field, fields.URLField):
+            return f'https://example.com/{self.get_token(12)}'
+        if isinstance(field, fields.CharField):
+            return self.get_token(min(field.max_length or 16, 16))
+        if isinstance(field, fields.ListField):
+            return [self.generate_field(field.child)]
+        if isinstance(field, (fields.DictField, fields.JSONField)):
+            return {}
+        return fields.empty
+
+    def get_related_pks(self, queryset):
+        key = str(queryset.query)
+        if key not in self._related_pks:
+            self._related_pks[key] = list(queryset.values_list('pk', flat=True)[:1000])
+        return self._related_pks[key]
+
+    def get_token(self, length):
+        return ''.join(self.rng.choices('abcdefghijklmnopqrstuvwxyz0123456789', k=length))
+
+
+def discover_routes(urlconf=None):
+    routes = {}
+    for pattern, url_name in _iter_url_patterns(get_resolver(urlconf).url_patterns):
+        viewset = getattr(pattern.callback, 'cls', None)
+        actions = getattr(pattern.callback, 'actions', None)
+        if viewset is None or not actions or not issubclass(viewset, GenericViewSet):
+            continue
+
+        # Format suffix patterns share a name with the original ones
+        routes.setdefault(
+            (viewset, url_name),
+            Route(viewset, url_name, actions, pattern.callback.initkwargs),
+        )
+    return list(routes.values())
+
+
+def _iter_url_patterns(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            pattern_namespace = namespace
+            if pattern.namespace:
+                pattern_namespace = (
+                    f'{namespace}:{pattern.namespace}' if namespace else pattern.namespace
+                )
+            yield from _iter_url_patterns(pattern.url_patterns, pattern_namespace)
+        elif pattern.name:
+            yield pattern, f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+def build_environ(method, path, body, host, headers):
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SCRIPT_NAME': '',
+        'SERVER_NAME': host,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': host,
+        'HTTP_ACCEPT': 'application/json',
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers:
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+def replay(plan, host, headers):
+    """
+    Sends planned requests through the WSGI handler and returns tuples of
+    `(viewset, action, status code, duration, query count)`.
+    """
+    handler = WSGIHandler()
+    results = []
+
+    def start_response(status, _headers, _exc_info=None):
+        response_status.append(int(status.split(' ', 1)[0]))
+
+    # Like Django's test client, keep database connections open between requests
+    request_started.disconnect(close_old_connections)
+    request_finished.disconnect(close_old_connections)
+    try:
+        for label, action, method, path, body in plan:
+            response_status = []
+            trace = RequestTrace()
+            started_at = perf_counter()
+            with trace.capture():
+                response = handler(
+                    build_environ(method, path, body, host, headers), start_response
+                )
+                try:
+                    b''.join(response)
+                finally:
+                    response.close()
+            duration = perf_counter() - started_at
+            results.append((label, action, response_status[0], duration, trace.query_count))
+    finally:
+        request_started.connect(close_old_connections)
+        request_finished.connect(close_old_connections)
+
+    return results
+
+
+def _percentile(sorted_values, percentile):
+    index = round(percentile / 100 * (len(sorted_values) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, elapsed):
+    groups = defaultdict(list)
+    for label, action, status, duration, query_count in results:
+        groups[(label, action)].append((status, duration, query_count))
+
+    actions = []
+    for (label, action), items in sorted(groups.items()):
+        durations = sorted(duration for _, duration, _ in items)
+        actions.append(
+            {
+                'viewset': label,
+                'action': action,
+                'requests': len(items),
+                'errors': sum(1 for status, _, _ in items if status >= 400),
+                'p50_ms': _percentile(durations, 50) * 1000,
+                'p95_ms': _percentile(durations, 95) * 1000,
+                'p99_ms': _percentile(durations, 99) * 1000,
+                # Sequential throughput of a single worker
+                'requests_per_sec': len(durations) / sum(durations),
+                'mean_queries': sum(query_count for _, _, query_count in items) / len(items),
+            }
+        )
+
+    return {
+        'requests': len(results),
+        'elapsed_sec': elapsed,
+        'requests_per_sec': len(results) / elapsed if elapsed else 0.0,
+        'actions': actions,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays a mix of list/retrieve/create/update/destroy requests against '
+        'rest_batteries ViewSets in-process and reports latency, throughput and queries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Number of requests.')
+        parser.add_argument(
+            '--mix',
+            default=DEFAULT_MIX,
+            help=f'Relative weights of actions, "{DEFAULT_MIX}" by default.',
+        )
+        parser.add_argument(
+            '--viewset',
+            action='append',
+            default=[],
+            help='Only replay requests for ViewSets with this class name.',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Replay requests across a pool of processes.',
+        )
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument(
+            '--host',
+            default=None,
+            help='Value of the Host header, the first of ALLOWED_HOSTS by default.',
+        )
+        parser.add_argument(
+            '--header',
+            action='append',
+            default=[],
+            help='Extra request header, e.g. "Authorization: Token 123".',
+        )
+        parser.add_argument(
+            '--rollback',
+            action='store_true',
+            help='Roll back all database changes afterwards (single process only).',
+        )
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        if options['rollback'] and options['processes'] > 1:
+            raise CommandError('--rollback can not be used with multiple processes.')
+
+        rng = random.Random(options['seed'])
+        weights = self.parse_mix(options['mix'])
+        headers = self.parse_headers(options['header'])
+        host = options['host'] or self.get_default_host()
+
+        targets = self.get_targets(weights, options['viewset'])
+        if not targets:
+            raise CommandError('No rest_batteries ViewSet routes match the request mix.')
+
+        plan = self.build_plan(targets, weights, options['requests'], rng)
+
+        if options['rollback']:
+            with transaction.atomic():
+                results, elapsed = self.run(plan, host, headers, 1)
+                transaction.set_rollback(True)
+        else:
+            results, elapsed = self.run(plan, host, headers, options['processes'])
+
+        report = summarize(results, elapsed)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.write_report(report)
+
+    def get_default_host(self):
+        for host in settings.ALLOWED_HOSTS:
+            if host != '*' and not host.startswith('.'):
+                return host
+        return 'localhost'
+
+    def parse_mix(self, mix):
+        weights = {}
+        for item in mix.split(','):
+            action, _, weight = item.partition('=')
+            try:
+                weights[action.strip()] = float(weight)
+            except ValueError:
+                raise CommandError(f'Invalid request mix item: "{item}".')
+        return weights
+
+    def parse_headers(self, raw_headers):
+        headers = []
+        for raw_header in raw_headers:
+            name, separator, value = raw_header.partition(':')
+            if not separator:
+                raise CommandError(f'Invalid header: "{raw_header}".')
+            headers.append((name.strip(), value.strip()))
+        return headers
+
+    def get_targets(self, weights, viewset_names):
+        targets = []
+        for route in discover_routes():
+            if viewset_names and route.viewset.__name__ not in viewset_names:
+                continue
+
+            object_ids = None
+            for method, action in route.actions.items():
+                if not weights.get(action):
+                    continue
+                if action in DETAIL_ACTIONS and object_ids is None:
+                    object_ids = self.get_object_ids(route, method, action)
+                targets.append(Target(route, method, action, object_ids))
+        return targets
+
+    def get_object_ids(self, route, method, action):
+        view = route.get_view(method, action)
+        queryset = view.get_queryset()
+        return list(queryset.values_list(view.lookup_field, flat=True)[:1000])
+
+    def build_plan(self, targets, weights, count, rng):
+        generator = PayloadGenerator(rng)
+        action_targets = defaultdict(list)
+        for target in targets:
+            action_targets[target.action].append(target)
+
+        plan = []
+        for _ in range(count):
+            available = [target for target in targets if not target.is_exhausted()]
+            if not available:
+                break
+
+            # Split an action's weight between all ViewSets providing it
+            target = rng.choices(
+                available,
+                [
+                    weights[target.action] / len(action_targets[target.action])
+                    for target in available
+                ],
+            )[0]
+
+            body = b''
+            if target.action in PAYLOAD_ACTIONS:
+                serializer = target.view.get_request_serializer_or_none()
+                if serializer is not None:
+                    body = json.dumps(generator.generate(serializer), cls=JSONEncoder).encode()
+
+            path = target.get_path(rng)
+            plan.append((target.label, target.action, target.method, path, body))
+        return plan
+
+    def run(self, plan, host, headers, processes):
+        started_at = perf_counter()
+        if processes <= 1:
+            results = replay(plan, host, headers)
+        else:
+            # Forked workers must not share database connections with the parent process
+            connections.close_all()
+            chunks = [plan[index::processes] for index in range(processes)]
+            with ProcessPoolExecutor(processes, mp_context=get_context('fork')) as executor:
+                results = [
+                    result
+                    for chunk_results in executor.map(
+                        replay, chunks, repeat(host), repeat(headers)
+                    )
+                    for result in chunk_results
+                ]
+        return results, perf_counter() - started_at
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_sec']:.2f}s, "
+            f"{report['requests_per_sec']:.1f} requests/sec"
+        )
+        self.stdout.write(
+            f"{'viewset':<30} {'action':<16} {'requests':>8} {'errors':>6} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rps':>8} {'queries':>8}"
+        )
+        for row in report['actions']:
+            self.stdout.write(
+                f"{row['viewset']:<30} {row['action']:<16} {row['requests']:>8} "
+                f"{row['errors']:>6} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                f"{row['p99_ms']:>8.2f} {row['requests_per_sec']:>8.1f} "
+                f"{row['mean_queries']:>8.1f}"
+            )
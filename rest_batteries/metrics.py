@@ -0,0 +1,254 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+from time import monotonic
+from typing import Dict, Iterable, Tuple
+
+from django.utils.module_loading import import_string
+
+from .settings import get_setting
+
+REQUEST_DURATION = 'rest_batteries_request_duration_seconds'
+REQUEST_QUERIES = 'rest_batteries_request_queries'
+RESPONSE_SIZE = 'rest_batteries_response_size_bytes'
+ERRORS = 'rest_batteries_errors_total'
+
+HISTOGRAMS = {
+    REQUEST_DURATION: (
+        'Duration of requests in seconds.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    REQUEST_QUERIES: (
+        'Number of database queries per request.',
+        (0, 1, 2, 5, 10, 20, 50, 100),
+    ),
+    RESPONSE_SIZE: (
+        'Size of response bodies in bytes.',
+        (100, 1000, 10000, 100000, 1000000, 10000000),
+    ),
+}
+
+COUNTERS = {
+    ERRORS: 'Number of error responses by status and error code.',
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class MetricsRegistry:
+    """
+    Histograms and counters by metric name and labels.
+
+    A histogram is stored as `[bucket_counts, sum, count]`, where bucket counts
+    are not cumulative and the last bucket is `+Inf`.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Labels], list] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, labels: Labels, value):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = [[0] * (len(buckets) + 1), 0, 0]
+            histogram[0][bisect.bisect_left(buckets, value)] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def inc(self, name, labels: Labels, amount=1):
+        with self.lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def dump(self) -> dict:
+        with self.lock:
+            return {
+                'histograms': [
+                    [name, labels, bucket_counts, total, count]
+                    for (name, labels), (bucket_counts, total, count) in self.histograms.items()
+                ],
+                'counters': [
+                    [name, labels, value] for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def merge(self, dump: dict):
+        with self.lock:
+            for name, labels, bucket_counts, total, count in dump['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    self.histograms[key] = [list(bucket_counts), total, count]
+                else:
+                    histogram[0] = [a + b for a, b in zip(histogram[0], bucket_counts)]
+                    histogram[1] += total
+                    histogram[2] += count
+            for name, labels, value in dump['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                self.counters[key] = self.counters.get(key, 0) + value
+
+
+class BaseMetricsStore:
+    """
+    Records metrics of requests to a registry of the process.
+    `collect()` returns the registry with metrics of all processes.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+
+    def observe(self, name, labels: Labels, value):
+        self.registry.observe(name, labels, value)
+
+    def inc(self, name, labels: Labels, amount=1):
+        self.registry.inc(name, labels, amount)
+
+    def collect(self) -> MetricsRegistry:
+        return self.registry
+
+
+class MemoryMetricsStore(BaseMetricsStore):
+    """
+    Keeps metrics in memory of the process, for single-process servers.
+    """
+
+
+class FileMetricsStore(BaseMetricsStore):
+    """
+    Keeps metrics in memory of the process and writes them to `<pid>.json`
+    in `METRICS_DIRECTORY` at most once per `METRICS_FLUSH_INTERVAL` seconds.
+    `collect()` sums the files of all processes, so any worker can expose them.
+
+    Files of finished processes are kept, so counters don't go backwards.
+    Clean the directory on deployment.
+    """
+
+    def __init__(self, directory=None, flush_interval=None):
+        super().__init__()
+        self.directory = directory or get_setting('METRICS_DIRECTORY')
+        if flush_interval is None:
+            flush_interval = get_setting('METRICS_FLUSH_INTERVAL')
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.flushed_at = None
+        self.flush_lock = threading.Lock()
+
+    def observe(self, name, labels, value):
+        self.check_fork()
+        super().observe(name, labels, value)
+        self.flush_if_due()
+
+    def inc(self, name, labels, amount=1):
+        self.check_fork()
+        super().inc(name, labels, amount)
+        self.flush_if_due()
+
+    def check_fork(self):
+        # Metrics inherited from the parent process are already in its file
+        if os.getpid() != self.pid:
+            self.registry = MetricsRegistry()
+            self.pid = os.getpid()
+            self.flushed_at = None
+
+    def flush_if_due(self):
+        if self.flushed_at is None or monotonic() - self.flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as file:
+                    json.dump(self.registry.dump(), file)
+                os.replace(temp_path, os.path.join(self.directory, f'{self.pid}.json'))
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            self.flushed_at = monotonic()
+
+    def collect(self):
+        self.check_fork()
+        self.flush()
+
+        registry = MetricsRegistry()
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name)) as file:
+                    registry.merge(json.load(file))
+            except (OSError, ValueError):
+                # The file was removed or is of another version
+                continue
+        return registry
+
+
+_stores = {}
+
+
+def get_metrics_store() -> BaseMetricsStore:
+    path = get_setting('METRICS_STORE')
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = import_string(path)()
+    return store
+
+
+def render_prometheus(registry: MetricsRegistry) -> str:
+    """
+    Renders metrics in the Prometheus text exposition format.
+    """
+    dump = registry.dump()
+    lines = []
+
+    histograms = sorted(dump['histograms'], key=lambda histogram: histogram[:2])
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        samples = [histogram for histogram in histograms if histogram[0] == name]
+        if not samples:
+            continue
+        lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} histogram'])
+        for _, labels, bucket_counts, total, count in samples:
+            cumulative = 0
+            for bound, bucket_count in zip((*buckets, '+Inf'), bucket_counts):
+                cumulative += bucket_count
+                bucket_labels = (*labels, ('le', _format_value(bound)))
+                lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+    counters = sorted(dump['counters'], key=lambda counter: counter[:2])
+    for name, help_text in COUNTERS.items():
+        samples = [counter for counter in counters if counter[0] == name]
+        if not samples:
+            continue
+        lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} counter'])
+        for _, labels, value in samples:
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ','.join(f'{name}="{_escape(str(value))}"' for name, value in labels)
+    return f'{{{pairs}}}'
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
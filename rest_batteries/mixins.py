@@ -1,9 +1,26 @@
+import json
+import logging
+from contextlib import contextmanager
+from typing import Optional
+
 from django.core import exceptions as django_exceptions
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import exceptions as rest_exceptions
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.fields import get_error_detail
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 
+from .db_json import NotCompilable, get_columnar_json, get_json_expression
+from .deletion import delete_in_chunks
+from .errors_formatter import ErrorsFormatter
+from .serializers import serialize_columns
+
+logger = logging.getLogger('rest_batteries.db_json')
+
+DB_JSON_PLACEHOLDER = '__rest_batteries_db_json__'
+
 
 class DjangoValidationErrorTransformMixin:
     """
@@ -24,14 +41,30 @@ class CreateModelMixin:
     Create a model instance.
     """
 
-    def create(self, request, *_args, **_kwargs):
+    def create(self, request, *args, **kwargs):
+        return self.call_idempotent(self._create, request, *args, **kwargs)
+
+    def _create(self, request, *_args, **_kwargs):
         request_serializer = self.get_request_serializer(data=request.data)
-        request_serializer.is_valid(raise_exception=True)
+        with self.trace_phase('is_valid'):
+            request_serializer.is_valid(raise_exception=True)
 
-        instance = self.perform_create(request_serializer)
+        if self.is_deferred():
+            return self.defer(self._perform_create_deferred, request_serializer)
+
+        with self.trace_phase('perform_create'):
+            instance = self.perform_create(request_serializer)
 
         response_serializer = self.get_response_serializer(instance)
-        return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+        with self.trace_phase('serialize'):
+            data = response_serializer.data
+        return Response(
+            data, status=status.HTTP_201_CREATED, headers=self.get_etag_headers(instance)
+        )
+
+    def _perform_create_deferred(self, serializer):
+        instance = self.perform_create(serializer)
+        return self.get_response_serializer(instance).data
 
     def perform_create(self, serializer):
         return serializer.save()
@@ -42,42 +75,257 @@ class RetrieveModelMixin:
     Retrieve a model instance.
     """
 
-    def retrieve(self, _request, *_args, **_kwargs):
+    def retrieve(self, request, *args, **kwargs):
+        return self.call_coalesced(self._retrieve, request, *args, **kwargs)
+
+    def _retrieve(self, _request, *_args, **_kwargs):
         instance = self.get_object()
         serializer = self.get_response_serializer(instance)
-        return Response(serializer.data)
+        with self.trace_phase('serialize'):
+            data, included = self.serialize_side_loaded(serializer)
+        if included is not None:
+            data = {'data': data, 'included': included}
+        return Response(data, headers=self.get_etag_headers(instance))
+
+
+class BatchRetrieveModelMixin:
+    """
+    Retrieve many model instances by comma-separated ids in one query,
+    e.g. `GET /orders/batch/?ids=1,2,3`.
+
+    Results are returned in the order of requested ids. Ids that don't exist or
+    fail object permissions are returned as error markers in the `ErrorsFormatter` format:
+    {"id": 3, "errors": [{"message": "Not found.", "code": "not_found"}]}
+    """
+
+    batch_retrieve_query_param = 'ids'
+    batch_retrieve_max_size = 100
+
+    @action(detail=False, methods=['get'], url_path='batch')
+    def batch_retrieve(self, request, *_args, **_kwargs):
+        ids = self.get_batch_retrieve_ids(request)
+        objects, errors = self.get_batch_objects(ids)
+
+        serializer = self.get_response_serializer(list(objects.values()), many=True)
+        with self.trace_phase('serialize'):
+            data = dict(zip(objects, serializer.data))
+
+        return Response(
+            [data[lookup_id] if lookup_id in data else errors[lookup_id] for lookup_id in ids]
+        )
+
+    def get_batch_retrieve_ids(self, request):
+        param = self.batch_retrieve_query_param
+        value = request.query_params.get(param, '')
+        ids = list(dict.fromkeys(item.strip() for item in value.split(',') if item.strip()))
+
+        if not ids:
+            raise rest_exceptions.ValidationError({param: ['This field is required.']})
+        if len(ids) > self.batch_retrieve_max_size:
+            raise rest_exceptions.ValidationError(
+                {param: [f'Ensure there are no more than {self.batch_retrieve_max_size} ids.']}
+            )
+        return ids
+
+    def get_batch_objects(self, ids):
+        """
+        Fetches objects with one query and checks object permissions.
+        Returns two dicts by requested id: found objects and error markers.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        opts = queryset.model._meta
+        field = opts.pk if self.lookup_field == 'pk' else opts.get_field(self.lookup_field)
+
+        values = {}
+        for lookup_id in ids:
+            try:
+                values[lookup_id] = field.to_python(lookup_id)
+            except (TypeError, ValueError, django_exceptions.ValidationError):
+                pass
+
+        with self.trace_phase('get_object'):
+            found = {
+                getattr(obj, self.lookup_field): obj
+                for obj in queryset.filter(**{f'{self.lookup_field}__in': set(values.values())})
+            }
+
+        objects, errors = {}, {}
+        for lookup_id in ids:
+            # Ids of markers have the type of the field when they are valid
+            value = values.get(lookup_id, lookup_id)
+            obj = found.get(values.get(lookup_id))
+            if obj is None:
+                errors[lookup_id] = self.get_batch_error(value, rest_exceptions.NotFound())
+                continue
+
+            try:
+                self.check_object_permissions(self.request, obj)
+            except rest_exceptions.APIException as exc:
+                errors[lookup_id] = self.get_batch_error(value, exc)
+            else:
+                objects[lookup_id] = self.identity_map.add(obj)
+        return objects, errors
+
+    def get_batch_error(self, lookup_value, exc):
+        return {'id': lookup_value, **ErrorsFormatter(exc)()}
 
 
 class ListModelMixin:
     """
     List a queryset.
+    Set `db_json_rendering` to build the JSON of simple response serializers
+    in the database, see `JSONQueryCompiler`.
+    With `ColumnarJSONRenderer`, e.g. `?format=columnar`, objects are serialized
+    column by column, see `serialize_columns()`.
     """
 
-    def list(self, _request, *_args, **_kwargs):
+    db_json_rendering = False
+
+    def list(self, request, *args, **kwargs):
+        return self.call_coalesced(self._list, request, *args, **kwargs)
+
+    def _list(self, request, *_args, **_kwargs):
         queryset = self.filter_queryset(self.get_queryset())
 
+        if self.db_json_rendering:
+            response = self.get_db_json_response_or_none(request, queryset)
+            if response is not None:
+                return response
+
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_response_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            with self.trace_phase('serialize'):
+                data, included = self.serialize_list(serializer)
+            response = self.get_paginated_response(data)
+            if included is not None:
+                response.data['included'] = included
+            return response
 
         serializer = self.get_response_serializer(queryset, many=True)
-        return Response(serializer.data)
+        with self.trace_phase('serialize'):
+            data, included = self.serialize_list(serializer)
+        if included is not None:
+            data = {'data': data, 'included': included}
+        return Response(data)
+
+    def is_columnar(self) -> bool:
+        return getattr(self.request.accepted_renderer, 'format', None) == 'columnar'
+
+    def serialize_list(self, serializer):
+        """
+        Returns the data of the response serializer and side-loaded objects,
+        columnar responses are not side-loaded.
+        """
+        if self.is_columnar():
+            return serialize_columns(serializer), None
+        return self.serialize_side_loaded(serializer)
+
+    def get_db_json_response_or_none(self, request, queryset):
+        """
+        Returns a response with JSON built by the database,
+        or `None` if the response serializer or the request isn't supported.
+        """
+        if self.is_columnar():
+            return self.get_db_columnar_response_or_none(request, queryset)
+        if getattr(request.accepted_renderer, 'format', None) != 'json':
+            return None
+        if self.is_side_loading():
+            return None
+        if isinstance(self.paginator, CursorPagination):
+            return None
+
+        try:
+            expression = get_json_expression(queryset, self.get_response_serializer())
+        except NotCompilable as exc:
+            logger.debug('%s.list is rendered in Python: %s', self.__class__.__name__, exc)
+            return None
+
+        if self.paginator is None:
+            rows = queryset.annotate(_json=expression).values_list('_json', flat=True)
+            return StreamingHttpResponse(
+                _stream_json_array(rows.iterator()), content_type='application/json'
+            )
+
+        page = self.paginate_queryset(queryset.values_list('pk', flat=True))
+        with self.trace_phase('serialize'):
+            # Rows are fetched by primary keys of the page and joined in the page order
+            rows = (
+                queryset.model._base_manager.using(queryset.db)
+                .filter(pk__in=page)
+                .annotate(_json=expression)
+                .values_list('pk', '_json')
+            )
+            rows_by_pk = dict(rows)
+            # Rows deleted after the page query are skipped
+            results = '[' + ','.join(rows_by_pk[pk] for pk in page if pk in rows_by_pk) + ']'
+
+        return self.get_db_json_paginated_response(request, results)
+
+    def get_db_columnar_response_or_none(self, request, queryset):
+        """
+        Returns a columnar response with arrays of field values aggregated by the database
+        in one query, or `None` if the response serializer or the request isn't supported.
+        """
+        if isinstance(self.paginator, CursorPagination):
+            return None
+
+        serializer = self.get_response_serializer()
+        try:
+            if self.paginator is None:
+                with self.trace_phase('serialize'):
+                    content = get_columnar_json(queryset, serializer)
+                return HttpResponse(content, content_type='application/json')
+
+            page = self.paginate_queryset(queryset.values_list('pk', flat=True))
+            with self.trace_phase('serialize'):
+                # The queryset keeps its ordering, so columns are in the page order
+                results = get_columnar_json(queryset.filter(pk__in=page), serializer)
+        except NotCompilable as exc:
+            logger.debug('%s.list is rendered in Python: %s', self.__class__.__name__, exc)
+            return None
+
+        return self.get_db_json_paginated_response(request, results)
+
+    def get_db_json_paginated_response(self, request, results):
+        # Let the paginator build the response around a placeholder and insert results after
+        response = self.render_response(request, self.get_paginated_response(DB_JSON_PLACEHOLDER))
+        response.content = response.content.replace(
+            json.dumps(DB_JSON_PLACEHOLDER).encode(), results.encode(), 1
+        )
+        return response
+
+
+def _stream_json_array(rows):
+    yield '['
+    for index, row in enumerate(rows):
+        yield row if index == 0 else ',' + row
+    yield ']'
 
 
 class _UpdateMixin:
-    def _update(self, request, *_args, **kwargs):
+    def _update(self, request, *args, **kwargs):
+        return self.call_idempotent(self._update_object, request, *args, **kwargs)
+
+    def _update_object(self, request, *_args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
+        self.check_preconditions(request, instance)
         request_serializer = self.get_request_serializer(
             instance, data=request.data, partial=partial
         )
-        request_serializer.is_valid(raise_exception=True)
+        with self.trace_phase('is_valid'):
+            request_serializer.is_valid(raise_exception=True)
 
-        if partial:
-            instance = self.perform_partial_update(instance, request_serializer)
-        else:
-            instance = self.perform_update(instance, request_serializer)
+        if self.is_deferred():
+            return self.defer(self._perform_update_deferred, instance, request_serializer, partial)
+
+        with self.trace_phase('perform_update'), self.versioned_write(instance):
+            if partial:
+                instance = self.perform_partial_update(instance, request_serializer)
+            else:
+                instance = self.perform_update(instance, request_serializer)
+        self.invalidate_object_cache()
 
         if getattr(instance, '_prefetched_objects_cache', None):
             # If 'prefetch_related' has been applied to a queryset, we need to
@@ -85,7 +333,17 @@ class _UpdateMixin:
             instance._prefetched_objects_cache = {}
 
         response_serializer = self.get_response_serializer(instance)
-        return Response(response_serializer.data)
+        with self.trace_phase('serialize'):
+            data = response_serializer.data
+        return Response(data, headers=self.get_etag_headers(instance))
+
+    def _perform_update_deferred(self, instance, serializer, partial):
+        with self.versioned_write(instance):
+            if partial:
+                instance = self.perform_partial_update(instance, serializer)
+            else:
+                instance = self.perform_update(instance, serializer)
+        return self.get_response_serializer(instance).data
 
     def perform_update(self, instance, serializer):
         return serializer.save()
@@ -129,17 +387,54 @@ class PartialUpdateModelMixin(_UpdateMixin):
 class DestroyModelMixin:
     """
     Destroy a model instance.
+    Set `destroy_chunk_size` to delete its cascade in chunks, see `delete_in_chunks()`.
+
+    Chunks are committed separately, so with `version_field` the version is bumped
+    in a short transaction before the chunks, and every chunk checks that the version
+    didn't change since, so a concurrent write stops the deletion with 409.
     """
 
+    destroy_chunk_size: Optional[int] = None
+
     def destroy(self, request, *_args, **_kwargs):
         instance = self.get_object()
+        self.check_preconditions(request, instance)
         serializer = self.get_request_serializer_or_none(instance, data=request.data)
         if serializer is not None:
-            serializer.is_valid(raise_exception=True)
-            self.perform_destroy(instance, serializer)
+            with self.trace_phase('is_valid'):
+                serializer.is_valid(raise_exception=True)
+            with self.trace_phase('perform_destroy'), self.versioned_destroy(instance):
+                self.perform_destroy(instance, serializer)
         else:
-            self.perform_destroy(instance)
+            with self.trace_phase('perform_destroy'), self.versioned_destroy(instance):
+                self.perform_destroy(instance)
+        self.invalidate_object_cache()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @contextmanager
+    def versioned_destroy(self, instance):
+        if self.destroy_chunk_size is None:
+            with self.versioned_write(instance):
+                yield
+            return
+
+        # Don't hold the transaction of the version during the chunks
+        with self.versioned_write(instance):
+            pass
+        yield
+
     def perform_destroy(self, instance, serializer=None):
-        instance.delete()
+        if self.destroy_chunk_size is None:
+            instance.delete()
+        else:
+            delete_in_chunks(
+                instance,
+                chunk_size=self.destroy_chunk_size,
+                delete=lambda: self.delete_versioned(instance),
+                check=lambda: self.check_version(instance),
+            )
+
+    def delete_versioned(self, instance):
+        # Fails with 409 when the object was written after the version was bumped
+        with self.versioned_write(instance):
+            return instance.delete()
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored result of a request made with an `Idempotency-Key` header.
+    Used by `DatabaseIdempotencyStore`.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    headers = models.JSONField(null=True)
+    content = models.BinaryField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
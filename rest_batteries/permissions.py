@@ -0,0 +1,54 @@
+from rest_framework import permissions
+
+
+class StatelessPermission(permissions.BasePermission):
+    """
+    Marks a permission class as stateless.
+
+    Stateless permissions don't keep any per-request state on the instance,
+    so views instantiate them once per view class instead of on every request.
+    """
+
+    stateless = True
+
+
+class QuerysetFilterPermission(permissions.BasePermission):
+    """
+    Base class for permissions that restrict which objects are visible in SQL.
+
+    Generic views apply `filter_queryset_for()` of every permission in `filter_queryset()`,
+    so both `list` and `get_object()` only see permitted rows. Any permission class
+    implementing `filter_queryset_for()` is supported, inheriting from this class is optional.
+    """
+
+    def filter_queryset_for(self, request, view, queryset):
+        return queryset
+
+
+class AllowAny(StatelessPermission, permissions.AllowAny):
+    pass
+
+
+class IsAuthenticated(StatelessPermission, permissions.IsAuthenticated):
+    pass
+
+
+class IsAdminUser(StatelessPermission, permissions.IsAdminUser):
+    pass
+
+
+class IsAuthenticatedOrReadOnly(StatelessPermission, permissions.IsAuthenticatedOrReadOnly):
+    pass
+
+
+def has_queryset_filter(permission) -> bool:
+    """
+    Returns whether the permission instance, or an operand of a composed one, filters querysets.
+    """
+    if hasattr(permission, 'filter_queryset_for'):
+        return True
+    if isinstance(permission, (permissions.AND, permissions.OR)):
+        return has_queryset_filter(permission.op1) or has_queryset_filter(permission.op2)
+    if isinstance(permission, permissions.NOT):
+        return has_queryset_filter(permission.op1)
+    return False
@@ -0,0 +1,82 @@
+import os
+import pstats
+import tempfile
+import threading
+from typing import Dict
+
+from django.utils.module_loading import import_string
+
+from .settings import get_setting
+
+
+class BaseProfileSink:
+    """
+    Storage of `cProfile` samples by key, e.g. `store.views.OrderViewSet.list`.
+    Samples with the same key are aggregated.
+    """
+
+    def save(self, key, profiler):
+        raise NotImplementedError
+
+
+class MemoryProfileSink(BaseProfileSink):
+    """
+    Aggregates samples in memory of the process.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, pstats.Stats] = {}
+        self.sample_counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def save(self, key, profiler):
+        with self.lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                self.stats[key] = pstats.Stats(profiler)
+            else:
+                stats.add(profiler)
+            self.sample_counts[key] = self.sample_counts.get(key, 0) + 1
+
+
+class DirectoryProfileSink(BaseProfileSink):
+    """
+    Aggregates samples into `<key>.prof` files in `PROFILING_DIRECTORY`,
+    which can be opened with `pstats` or tools like snakeviz.
+
+    Files are replaced atomically. Concurrent samples of the same key from other
+    processes may overwrite each other, which loses samples but not files.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or get_setting('PROFILING_DIRECTORY')
+        self.lock = threading.Lock()
+
+    def save(self, key, profiler):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{key}.prof')
+
+        with self.lock:
+            stats = pstats.Stats(profiler)
+            if os.path.exists(path):
+                stats.add(path)
+
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            os.close(fd)
+            try:
+                stats.dump_stats(temp_path)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+
+_sinks = {}
+
+
+def get_profile_sink() -> BaseProfileSink:
+    path = get_setting('PROFILING_SINK')
+    sink = _sinks.get(path)
+    if sink is None:
+        sink = _sinks[path] = import_string(path)()
+    return sink
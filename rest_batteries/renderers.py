@@ -0,0 +1,37 @@
+from rest_framework import renderers
+
+
+class ColumnarJSONRenderer(renderers.JSONRenderer):
+    """
+    Renders lists of objects column by column, e.g. with `?format=columnar`:
+    {"columns": ["id", "name"], "data": {"id": [1, 2], "name": ["a", "b"]}}
+
+    `ListModelMixin.list` builds the columns from the response serializer fields.
+    Other lists of objects, including `results` of paginated responses,
+    are converted by the renderer, anything else is rendered as is.
+    """
+
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+def to_columnar(data):
+    if _is_rows(data):
+        return rows_to_columns(data)
+    if isinstance(data, dict) and _is_rows(data.get('results')):
+        return {**data, 'results': rows_to_columns(data['results'])}
+    return data
+
+
+def rows_to_columns(rows):
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return {
+        'columns': columns,
+        'data': {column: [row.get(column) for row in rows] for column in columns},
+    }
+
+
+def _is_rows(data):
+    return isinstance(data, list) and all(isinstance(row, dict) for row in data)
@@ -0,0 +1,63 @@
+from time import time
+from typing import Optional
+
+from django.core import signing
+
+from .settings import get_setting
+
+PRIMARY_PIN_SALT = 'rest_batteries.primary_pin'
+
+
+def make_primary_pin() -> str:
+    """
+    Returns a signed time until which a client that has just written reads from the primary.
+    """
+    pinned_until = str(int(time() + get_setting('PRIMARY_PIN_SECONDS')))
+    return signing.TimestampSigner(salt=PRIMARY_PIN_SALT).sign(pinned_until)
+
+
+def is_valid_primary_pin(pin) -> bool:
+    """
+    Pins are only valid when they are signed by this server and end within `PRIMARY_PIN_SECONDS`,
+    so clients can't pin themselves to the primary forever.
+    """
+    seconds = get_setting('PRIMARY_PIN_SECONDS')
+    try:
+        pinned_until = float(signing.TimestampSigner(salt=PRIMARY_PIN_SALT).unsign(pin, seconds))
+    except (signing.BadSignature, ValueError):
+        return False
+    now = time()
+    return now < pinned_until <= now + seconds
+
+
+def is_pinned_to_primary(request) -> bool:
+    cookie = get_setting('PRIMARY_PIN_COOKIE')
+    header = get_setting('PRIMARY_PIN_HEADER')
+    pins = (
+        request.COOKIES.get(cookie) if cookie else None,
+        request.headers.get(header) if header else None,
+    )
+    return any(pin is not None and is_valid_primary_pin(pin) for pin in pins)
+
+
+def set_primary_pin(response, pin):
+    """
+    Sets the pin to the cookie and to the header, which clients without cookies should send back.
+    """
+    cookie = get_setting('PRIMARY_PIN_COOKIE')
+    if cookie:
+        max_age = get_setting('PRIMARY_PIN_SECONDS')
+        response.set_cookie(cookie, pin, max_age=max_age, httponly=True)
+    header = get_setting('PRIMARY_PIN_HEADER')
+    if header:
+        response[header] = pin
+
+
+def get_primary_pin_or_none(response) -> Optional[str]:
+    cookie = get_setting('PRIMARY_PIN_COOKIE')
+    if cookie and cookie in response.cookies:
+        return response.cookies[cookie].value
+    header = get_setting('PRIMARY_PIN_HEADER')
+    if header:
+        return response.get(header)
+    return None
@@ -0,0 +1,225 @@
+import copy
+from typing import Optional
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.fields import Field, SkipField
+from rest_framework.relations import PKOnlyObject
+
+# Per-instance state of fields and serializers, which copies must not share
+_INSTANCE_ATTRIBUTES = ('fields', '_data', '_errors', '_validated_data', '_representation_memo')
+_CHILD_ATTRIBUTES = ('child', 'child_relation')
+
+
+class CachedFieldsMixin:
+    """
+    Computes the fields of a serializer class once and gives every new serializer
+    instance shallow copies of them, instead of deep-copying declared fields and
+    introspecting the model on every instantiation.
+
+    Only use it for serializers whose `get_fields()` doesn't depend on the instance
+    or the context. Apply it to nested serializer classes too.
+    """
+
+    def get_fields(self):
+        # Look up the class's own __dict__ to not share fields with parent serializer classes
+        fields = self.__class__.__dict__.get('_cached_fields')
+        if fields is None:
+            fields = super().get_fields()
+            setattr(self.__class__, '_cached_fields', fields)
+        return {field_name: copy_field(field) for field_name, field in fields.items()}
+
+
+def copy_field(field):
+    """
+    Returns a shallow copy of an unbound field. Children of list fields and
+    serializers with `many=True` are copied and bound to the copy.
+    """
+    field_copy = copy.copy(field)
+    for attribute in _INSTANCE_ATTRIBUTES:
+        field_copy.__dict__.pop(attribute, None)
+
+    for attribute in _CHILD_ATTRIBUTES:
+        child = field.__dict__.get(attribute)
+        if isinstance(child, Field):
+            child_copy = copy_field(child)
+            # Reset what `bind()` has set for the original child
+            child_copy.source = child._kwargs.get('source')
+            child_copy.bind(field_name='', parent=field_copy)
+            setattr(field_copy, attribute, child_copy)
+    return field_copy
+
+
+class MemoizedRepresentationMixin:
+    """
+    Serializes every object once per response and reuses the representation
+    when the same object appears again, e.g. a product in many order lines.
+
+    Representations are memoized on the root serializer by serializer class, model and
+    primary key, so the reused representations are the same dicts. Only use it for
+    serializers whose representation doesn't depend on where the object is nested.
+    """
+
+    def to_representation(self, instance):
+        pk = getattr(instance, 'pk', None)
+        if pk is None:
+            return super().to_representation(instance)
+
+        memo = self.__dict__.get('_representation_memo')
+        if memo is None:
+            memo = self._representation_memo = self.root.__dict__.setdefault(
+                '_representation_memo', {}
+            )
+        key = (self.__class__, instance.__class__, pk)
+        representation = memo.get(key)
+        if representation is None:
+            representation = memo[key] = super().to_representation(instance)
+        return representation
+
+
+class SideLoadedMixin:
+    """
+    Emits nested objects once in the top-level `included` map of views with
+    `side_loading`, by type and id, and represents them by the primary key in rows.
+
+    The type is `side_loaded_type` or the model name. Top-level objects of a response
+    and responses of views without side-loading are represented as usual.
+    """
+
+    side_loaded_type: Optional[str] = None
+
+    def get_side_loaded_type(self, instance) -> str:
+        return self.side_loaded_type or instance._meta.model_name
+
+    def to_representation(self, instance):
+        included = self.context.get('included')
+        if included is None or self.is_top_level():
+            return super().to_representation(instance)
+
+        objects = included.setdefault(self.get_side_loaded_type(instance), {})
+        key = str(instance.pk)
+        if key not in objects:
+            objects[key] = super().to_representation(instance)
+        return instance.pk
+
+    def is_top_level(self) -> bool:
+        if self.parent is None:
+            return True
+        return isinstance(self.parent, serializers.ListSerializer) and self.parent.parent is None
+
+
+class BatchMethodField(Field):
+    """
+    A read-only field whose values are computed for many objects in one call.
+
+    The value is taken from the mapping by primary key returned by
+    `get_<field_name>_batch(instances)` of the parent serializer. Objects missing
+    from the mapping get `None`. The parent serializer should use `BatchFieldsMixin`,
+    so a list is loaded in one call, otherwise every object is loaded on its own.
+    """
+
+    def __init__(self, method_name=None, **kwargs):
+        self.method_name = method_name
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def bind(self, field_name, parent):
+        if self.method_name is None:
+            self.method_name = f'get_{field_name}_batch'
+        super().bind(field_name, parent)
+
+    def load(self, instances):
+        method = getattr(self.parent, self.method_name)
+        self._loaded_pks = {instance.pk for instance in instances}
+        self._values = method(instances)
+
+    def to_representation(self, value):
+        if value.pk not in self.__dict__.get('_loaded_pks', ()):
+            self.load([value])
+        return self._values.get(value.pk)
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """
+    Loads the batch fields of the child serializer for all objects
+    before representing them one by one.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        instances = list(iterable)
+        self.child.load_batch_fields(instances)
+        return [self.child.to_representation(item) for item in instances]
+
+
+class BatchFieldsMixin:
+    """
+    Makes `many=True` serializers load `BatchMethodField`s for the whole list,
+    e.g. a page of `ListModelMixin.list`, in one call per field.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_serializer = super().many_init(*args, **kwargs)
+        # Keep custom `Meta.list_serializer_class`
+        if type(list_serializer) is not serializers.ListSerializer:
+            return list_serializer
+
+        # Reset what `bind()` has set for the child, it's bound to the new list serializer
+        child = list_serializer.child
+        child.source = child._kwargs.get('source')
+        return BatchListSerializer(*list_serializer._args, **list_serializer._kwargs)
+
+    def load_batch_fields(self, instances):
+        if not instances:
+            return
+        for field in self._readable_fields:
+            if isinstance(field, BatchMethodField):
+                field.load(instances)
+
+
+def serialize_columns(serializer):
+    """
+    Serializes the objects of a `many=True` serializer column by column:
+    {"columns": ["id", "name"], "data": {"id": [1, 2], "name": ["a", "b"]}}
+
+    Columns are the readable fields of the child serializer. Children with
+    a custom `to_representation()` are serialized row by row and transposed.
+    """
+    child = serializer.child
+    data = serializer.instance
+    instances = list(data.all() if isinstance(data, models.Manager) else data)
+    fields = list(child._readable_fields)
+    columns = [field.field_name for field in fields]
+
+    if isinstance(child, BatchFieldsMixin):
+        child.load_batch_fields(instances)
+
+    if type(child).to_representation is not serializers.Serializer.to_representation:
+        rows = [child.to_representation(instance) for instance in instances]
+        return {
+            'columns': columns,
+            'data': {column: [row.get(column) for row in rows] for column in columns},
+        }
+
+    values = {}
+    for field in fields:
+        column = values[field.field_name] = []
+        for instance in instances:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                column.append(None)
+                continue
+
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            column.append(None if check_for_none is None else field.to_representation(attribute))
+    return {'columns': columns, 'data': values}
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE'))
+    path = serializers.RegexField(r'^/', max_length=2048)
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
@@ -0,0 +1,50 @@
+"""
+Settings for REST Batteries are all namespaced in the REST_BATTERIES setting.
+For example your project's `settings.py` file might look like this:
+
+REST_BATTERIES = {
+    'PHASE_TIMING': True,
+}
+"""
+from django.conf import settings
+
+DEFAULTS = {
+    # Instrumentation
+    'PHASE_TIMING': False,
+    # Query budgets: `None` means raise in DEBUG mode and in tests, and log otherwise
+    'QUERY_BUDGETS_RAISE': None,
+    'N_PLUS_ONE_THRESHOLD': 3,
+    # Slow actions: requests longer than this number of seconds are logged
+    'SLOW_ACTION_THRESHOLD': None,
+    # Idempotency keys
+    'IDEMPOTENCY_STORE': 'rest_batteries.idempotency.CacheIdempotencyStore',
+    'IDEMPOTENCY_TTL': 24 * 60 * 60,
+    'IDEMPOTENCY_LOCK_TIMEOUT': 10,
+    # Deferred execution
+    'DEFERRED_EXECUTOR': 'rest_batteries.deferred.ThreadPoolJobExecutor',
+    'DEFERRED_JOB_STORE': 'rest_batteries.deferred.CacheJobStore',
+    'DEFERRED_JOB_TTL': 24 * 60 * 60,
+    'DEFERRED_MAX_WORKERS': 4,
+    # Profiling: the header enables profiling when its value matches the secret
+    'PROFILING_SAMPLE_RATE': 0,
+    'PROFILING_HEADER': 'X-Profile',
+    'PROFILING_SECRET': None,
+    'PROFILING_SINK': 'rest_batteries.profiling.DirectoryProfileSink',
+    'PROFILING_DIRECTORY': 'profiles',
+    # Metrics
+    'METRICS_ENABLED': False,
+    'METRICS_STORE': 'rest_batteries.metrics.MemoryMetricsStore',
+    'METRICS_DIRECTORY': 'metrics',
+    'METRICS_FLUSH_INTERVAL': 1,
+    # Database routing: clients are pinned to the primary for a while after a write
+    'READ_REPLICA_ALIASES': (),
+    'PRIMARY_DB_ALIAS': 'default',
+    'PRIMARY_PIN_SECONDS': 10,
+    'PRIMARY_PIN_COOKIE': 'rest_batteries_primary_pin',
+    'PRIMARY_PIN_HEADER': 'X-Primary-Pin',
+}
+
+
+def get_setting(name):
+    user_settings = getattr(settings, 'REST_BATTERIES', None) or {}
+    return user_settings.get(name, DEFAULTS[name])
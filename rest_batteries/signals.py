@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent by GenericAPIView once a traced request is finished and its response is rendered.
+# Arguments: `view`, `request`, `response`, `trace`.
+request_trace_finished = Signal()
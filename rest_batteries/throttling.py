@@ -0,0 +1,195 @@
+import threading
+import time
+from typing import Optional
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """
+    Parses a rate like `100/min` into `(requests, seconds)`.
+    """
+    try:
+        num, period = rate.split('/')
+        return int(num), PERIODS[period[0]]
+    except (KeyError, IndexError, ValueError):
+        raise ImproperlyConfigured(f'Invalid throttle rate: {rate!r}')
+
+
+class TokenBucket:
+    """
+    A token bucket of one client.
+
+    `pending` counts tokens consumed since the last synchronization with the shared
+    cache, `synced_total` is the last seen total consumption of all processes,
+    `None` before the first synchronization.
+    """
+
+    __slots__ = ('lock', 'tokens', 'updated_at', 'pending', 'synced_at', 'synced_total')
+
+    def __init__(self, capacity, now):
+        self.lock = threading.Lock()
+        self.tokens = float(capacity)
+        self.updated_at = now
+        self.pending = 0
+        self.synced_at = now
+        self.synced_total = None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttles requests with an in-process token bucket per client.
+
+    A bucket holds up to `burst` tokens (the number of requests of `rate` by default)
+    and is refilled at `rate`. Checks don't touch the cache, buckets are kept
+    in memory of the process and every bucket has its own lock.
+
+    With `sync_interval`, every process periodically adds its consumption to a shared
+    counter in the cache and takes the consumption of other processes out of its
+    buckets, so the limit is approximately shared between processes with one cache
+    round trip per bucket and interval.
+
+    Buckets are shared by all instances of a throttle class, subclasses get their own.
+    Override `get_cache_key()` to identify clients, like for DRF's `SimpleRateThrottle`.
+    """
+
+    scope: Optional[str] = None
+    rate: Optional[str] = None
+    burst: Optional[int] = None
+    sync_interval: Optional[float] = None
+    cache_alias = 'default'
+    cache_key_prefix = 'rest_batteries:throttle:'
+    # Idle buckets are dropped when the number of buckets exceeds this
+    max_buckets = 10000
+    timer = time.monotonic
+
+    def __init__(self):
+        if self.rate is None:
+            self.rate = self.get_rate()
+        self.num_requests, self.duration = parse_rate(self.rate)
+        self.capacity = self.burst if self.burst is not None else self.num_requests
+        self.refill_rate = self.num_requests / self.duration
+        self.bucket = None
+
+    def get_rate(self):
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f'{self.__class__.__name__} should set `rate` or have a rate '
+                f'for the {self.scope!r} scope in `DEFAULT_THROTTLE_RATES`'
+            )
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError('.get_cache_key() must be overridden')
+
+    @classmethod
+    def get_buckets(cls):
+        # Look up the class's own __dict__ to not share buckets with parent throttle classes
+        buckets = cls.__dict__.get('_buckets')
+        if buckets is None:
+            buckets = {}
+            setattr(cls, '_buckets', buckets)
+        return buckets
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+
+        now = self.timer()
+        buckets = self.get_buckets()
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= self.max_buckets:
+                self.drop_idle_buckets(buckets, now)
+            # `setdefault()` is atomic, concurrent requests end up with the same bucket
+            bucket = buckets.setdefault(key, TokenBucket(self.capacity, now))
+        self.bucket = bucket
+
+        with bucket.lock:
+            self.refill(bucket, now)
+            if self.sync_interval is not None and now - bucket.synced_at >= self.sync_interval:
+                self.sync(key, bucket, now)
+
+            if bucket.tokens < 1:
+                return False
+            bucket.tokens -= 1
+            bucket.pending += 1
+            return True
+
+    def refill(self, bucket, now):
+        elapsed = now - bucket.updated_at
+        bucket.tokens = min(self.capacity, bucket.tokens + elapsed * self.refill_rate)
+        bucket.updated_at = now
+
+    def sync(self, key, bucket, now):
+        """
+        Adds the local consumption to the shared counter and takes the consumption
+        of other processes since the last synchronization out of the bucket.
+        """
+        cache = caches[self.cache_alias]
+        cache_key = self.cache_key_prefix + key
+        # The counter expires when no process has used it for a while
+        timeout = max(self.duration, self.sync_interval) * 2
+        try:
+            total = cache.incr(cache_key, bucket.pending)
+        except ValueError:
+            cache.add(cache_key, 0, timeout)
+            total = cache.incr(cache_key, bucket.pending)
+        cache.touch(cache_key, timeout)
+
+        # The counter is cumulative, so the first synchronization only gets the starting point
+        if bucket.synced_total is not None:
+            consumed_by_others = total - bucket.synced_total - bucket.pending
+            if consumed_by_others > 0:
+                bucket.tokens = max(0.0, bucket.tokens - consumed_by_others)
+
+        bucket.synced_total = total
+        bucket.pending = 0
+        bucket.synced_at = now
+
+    def drop_idle_buckets(self, buckets, now):
+        refill_time = self.capacity / self.refill_rate
+        for key, bucket in list(buckets.items()):
+            if now - bucket.updated_at >= refill_time:
+                buckets.pop(key, None)
+
+    def wait(self):
+        if self.bucket is None:
+            return None
+        return max(0.0, (1 - self.bucket.tokens) / self.refill_rate)
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Limits the rate of requests of anonymous users by the IP address.
+    """
+
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return f'{self.scope}:{self.get_ident(request)}'
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Limits the rate of requests of authenticated users by the user id,
+    and of anonymous users by the IP address.
+    """
+
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return f'{self.scope}:{ident}'
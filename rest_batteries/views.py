@@ -1,7 +1,289 @@
-from rest_framework import views
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional
 
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from rest_framework import exceptions, status, views
+from rest_framework.response import Response
+
+from . import routing
+from .deferred import JobStatus, get_job_store
+from .errors_formatter import ErrorsFormatter
+from .generics import GenericAPIView
+from .metrics import get_metrics_store, render_prometheus
 from .mixins import DjangoValidationErrorTransformMixin
+from .serializers import BatchOperationSerializer
+from .settings import get_setting
+
+logger = logging.getLogger('rest_batteries.batch')
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
 
 
 class APIView(DjangoValidationErrorTransformMixin, views.APIView):
     pass
+
+
+class JobStatusView(APIView):
+    """
+    Returns the status of a deferred job with the response serializer output
+    or the formatted error. Jobs are only visible to the user who created them.
+    """
+
+    def get(self, request, job_id, *_args, **_kwargs):
+        job = get_job_store().get(job_id)
+        if job is None or job.user_pk != getattr(request.user, 'pk', None):
+            raise exceptions.NotFound()
+
+        data = {'id': job.id, 'status': job.status}
+        if job.status == JobStatus.SUCCEEDED:
+            data['result'] = job.result
+        elif job.status == JobStatus.FAILED:
+            data['errors'] = job.errors
+        return Response(data)
+
+
+class MetricsView(APIView):
+    """
+    Exposes metrics of generic views and ViewSets in the Prometheus text format.
+    """
+
+    def get(self, _request, *_args, **_kwargs):
+        registry = get_metrics_store().collect()
+        return HttpResponse(render_prometheus(registry), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+class BatchAPIView(APIView):
+    """
+    Executes a list of `{"method", "path", "body", "headers"}` operations in-process
+    with generic views and viewsets, and responds with a list of `{"status", "body"}`
+    results in the same order. Failures are returned in the `ErrorsFormatter` format.
+
+    Operations are executed one by one. With `parallel_reads`, consecutive `GET`
+    operations are executed concurrently in a thread pool. Every write is executed
+    in its own savepoint, so a failed write only rolls back itself. With `atomic_writes`,
+    batches with writes are executed in one transaction, which is rolled back
+    when a write fails.
+
+    When a write pins the client to the primary database, the following operations
+    are pinned too and the pin is set to the batch response.
+    """
+
+    max_operations = 20
+    parallel_reads = False
+    max_workers = 4
+    atomic_writes = False
+    # Headers of the batch request that are not passed to operations
+    operation_excluded_headers = ('HTTP_IDEMPOTENCY_KEY', 'HTTP_IF_MATCH')
+    primary_pin: Optional[str] = None
+
+    def post(self, request, *_args, **_kwargs):
+        serializer = BatchOperationSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        operations = serializer.validated_data
+        if len(operations) > self.max_operations:
+            raise exceptions.ValidationError(
+                [f'Ensure there are no more than {self.max_operations} operations.']
+            )
+
+        has_writes = any(operation['method'] != 'GET' for operation in operations)
+        if self.atomic_writes and has_writes:
+            response = Response(self.execute_atomic(request, operations))
+        else:
+            response = Response(self.execute(request, operations))
+
+        if self.primary_pin is not None:
+            routing.set_primary_pin(response, self.primary_pin)
+        return response
+
+    def execute(self, request, operations):
+        results, reads = [], []
+        for operation in operations:
+            if self.parallel_reads and operation['method'] == 'GET':
+                reads.append(operation)
+                continue
+
+            results.extend(self.execute_reads(request, reads))
+            reads = []
+            if operation['method'] == 'GET':
+                results.append(self.execute_operation(request, operation))
+            else:
+                results.append(self.execute_write(request, operation))
+
+        results.extend(self.execute_reads(request, reads))
+        return results
+
+    def execute_write(self, request, operation):
+        # With `ATOMIC_REQUESTS`, a failed operation rolls back the innermost atomic block,
+        # which must be the operation's own savepoint and not the whole batch request
+        with transaction.atomic():
+            result = self.execute_operation(request, operation)
+            if result['status'] >= 500:
+                transaction.set_rollback(True)
+        return result
+
+    def execute_reads(self, request, operations):
+        if len(operations) < 2:
+            return [self.execute_operation(request, operation) for operation in operations]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(
+                pool.map(lambda operation: self._execute_in_thread(request, operation), operations)
+            )
+
+    def _execute_in_thread(self, request, operation):
+        try:
+            return self.execute_operation(request, operation)
+        finally:
+            # Database connections are per thread, don't leak them
+            connections.close_all()
+
+    def execute_atomic(self, request, operations):
+        results = []
+        with transaction.atomic():
+            for index, operation in enumerate(operations):
+                result = self.execute_operation(request, operation)
+                results.append(result)
+                if operation['method'] != 'GET' and result['status'] >= 400:
+                    transaction.set_rollback(True)
+                    return self.get_rolled_back_results(operations, results, index)
+        return results
+
+    def get_rolled_back_results(self, operations, results, failed_index):
+        rolled_back = exceptions.APIException(
+            f'The operation was rolled back, because the operation {failed_index} failed.',
+            code='rolled_back',
+        )
+        not_executed = exceptions.APIException(
+            f'The operation was not executed, because the operation {failed_index} failed.',
+            code='not_executed',
+        )
+
+        rolled_back_results = []
+        for index, (operation, result) in enumerate(zip(operations, results)):
+            if index < failed_index and operation['method'] != 'GET':
+                result = self.get_error_result(status.HTTP_409_CONFLICT, rolled_back)
+            rolled_back_results.append(result)
+        for _ in operations[failed_index + 1 :]:
+            rolled_back_results.append(
+                self.get_error_result(status.HTTP_424_FAILED_DEPENDENCY, not_executed)
+            )
+        return rolled_back_results
+
+    def execute_operation(self, request, operation):
+        path, _, query_string = operation['path'].partition('?')
+        try:
+            match = resolve(path)
+        except Resolver404:
+            return self.get_error_result(status.HTTP_404_NOT_FOUND, exceptions.NotFound())
+
+        if not self.is_supported_view(match.func):
+            return self.get_error_result(
+                status.HTTP_400_BAD_REQUEST,
+                exceptions.ValidationError(
+                    {'path': ['Only generic views and viewsets are supported.']},
+                ),
+            )
+
+        operation_request = self.get_operation_request(request, operation, path, query_string)
+        try:
+            response = match.func(operation_request, *match.args, **match.kwargs)
+            if not getattr(response, 'is_rendered', True):
+                response.render()
+        except Exception:
+            logger.exception('Batch operation %s %s failed', operation['method'], path)
+            return self.get_error_result(
+                status.HTTP_500_INTERNAL_SERVER_ERROR, exceptions.APIException()
+            )
+
+        if operation['method'] != 'GET' and response.status_code < 400:
+            pin = routing.get_primary_pin_or_none(response)
+            if pin is not None:
+                self.primary_pin = pin
+        return self.get_result(response)
+
+    def is_supported_view(self, view):
+        view_class = getattr(view, 'cls', None)
+        return (
+            view_class is not None
+            and issubclass(view_class, GenericAPIView)
+            and not issubclass(view_class, BatchAPIView)
+        )
+
+    def get_operation_request(self, request, operation, path, query_string):
+        body = b''
+        if 'body' in operation:
+            body = json.dumps(operation['body']).encode()
+
+        environ = {
+            key: value
+            for key, value in request._request.META.items()
+            if key not in self.operation_excluded_headers
+        }
+        environ.update(
+            {
+                'REQUEST_METHOD': operation['method'],
+                'PATH_INFO': path,
+                'QUERY_STRING': query_string,
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(len(body)),
+                'HTTP_ACCEPT': 'application/json',
+                'wsgi.input': BytesIO(body),
+            }
+        )
+        for name, value in operation.get('headers', {}).items():
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+        operation_request = WSGIRequest(environ)
+        if self.primary_pin is not None:
+            # Read the writes of previous operations
+            self.set_operation_primary_pin(operation_request)
+        # Attributes set by middlewares and the test client
+        for attribute in ('user', 'session', '_dont_enforce_csrf_checks'):
+            if hasattr(request._request, attribute):
+                setattr(operation_request, attribute, getattr(request._request, attribute))
+        return operation_request
+
+    def set_operation_primary_pin(self, operation_request):
+        cookie = get_setting('PRIMARY_PIN_COOKIE')
+        if cookie:
+            operation_request.COOKIES = {**operation_request.COOKIES, cookie: self.primary_pin}
+        header = get_setting('PRIMARY_PIN_HEADER')
+        if header:
+            operation_request.META['HTTP_' + header.upper().replace('-', '_')] = self.primary_pin
+
+    def get_result(self, response):
+        if response.streaming:
+            content = b''.join(response.streaming_content)
+        else:
+            content = response.content
+
+        body = None
+        if content and response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(content)
+        elif content:
+            body = content.decode(response.charset)
+
+        if response.status_code >= 400 and not (isinstance(body, dict) and 'errors' in body):
+            return self.get_error_result(response.status_code, self.get_exception(response))
+        return {'status': response.status_code, 'body': body}
+
+    def get_exception(self, response):
+        """
+        Rebuilds the exception from error responses of views that
+        don't use `errors_formatter_exception_handler`.
+        """
+        data = getattr(response, 'data', None)
+        if isinstance(data, dict) and list(data) == ['detail']:
+            return exceptions.APIException(data['detail'], getattr(data['detail'], 'code', None))
+        if data is not None:
+            return exceptions.ValidationError(data)
+        return exceptions.APIException(response.reason_phrase, code='error')
+
+    def get_error_result(self, status_code, exception):
+        return {'status': status_code, 'body': ErrorsFormatter(exception)()}
@@ -1,11 +1,17 @@
+import logging
 from typing import Dict, Iterable, Optional, Type, Union
 
+from django.conf import settings
+from django.core import mail
 from django.core.exceptions import ImproperlyConfigured
 from rest_framework import viewsets
 from rest_framework.permissions import BasePermission
 from rest_framework.serializers import BaseSerializer
+from rest_framework.throttling import BaseThrottle
 
+from .exceptions import QueryBudgetExceeded
 from .generics import GenericAPIView
+from .instrumentation import RequestTrace
 from .mixins import (
     CreateModelMixin,
     DestroyModelMixin,
@@ -13,21 +19,54 @@ from .mixins import (
     RetrieveModelMixin,
     UpdateModelMixin,
 )
+from .settings import get_setting
+
+logger = logging.getLogger('rest_batteries.query_budgets')
 
 
 class GenericViewSet(viewsets.ViewSetMixin, GenericAPIView):
     action_permission_classes: Optional[
         Dict[str, Union[Type[BasePermission], Iterable[Type[BasePermission]]]]
     ] = None
+    action_throttle_classes: Optional[
+        Dict[str, Union[Type[BaseThrottle], Iterable[Type[BaseThrottle]]]]
+    ] = None
     request_action_serializer_classes: Optional[Dict[str, Type[BaseSerializer]]] = None
     response_action_serializer_classes: Optional[Dict[str, Type[BaseSerializer]]] = None
+    action_query_budgets: Optional[Dict[str, int]] = None
+    deferred_actions: Optional[Iterable[str]] = None
+    action_profiling: Optional[Dict[str, float]] = None
+    action_slow_thresholds: Optional[Dict[str, float]] = None
+    action_db_alias: Optional[Dict[str, str]] = None
+    # Actions that use the configuration of another action when they have none
+    action_fallbacks: Dict[str, str] = {
+        'partial_update': 'update',
+        'batch_retrieve': 'retrieve',
+    }
+
+    def get_action_config(self, action_config, action=None):
+        action = action or self.action
+        value = action_config.get(action)
+        fallback_action = self.action_fallbacks.get(action)
+        if value is None and fallback_action is not None:
+            value = action_config.get(fallback_action)
+        return value
+
+    def get_dispatch_action(self, request) -> str:
+        method = request.method.lower()
+        return self.action_map.get(method) or method
+
+    def get_profiling_sample_rate(self, request) -> float:
+        if self.action_profiling:
+            action = self.get_dispatch_action(request)
+            sample_rate = self.get_action_config(self.action_profiling, action)
+            if sample_rate is not None:
+                return sample_rate
+        return super().get_profiling_sample_rate(request)
 
     def get_permission_classes_or_none(self):
         if self.action_permission_classes:
-            permission_classes = self.action_permission_classes.get(self.action)
-            if permission_classes is None and self.action == 'partial_update':
-                permission_classes = self.action_permission_classes.get('update')
-            return permission_classes
+            return self.get_action_config(self.action_permission_classes)
 
     def get_permissions(self):
         permissions = super().get_permissions()
@@ -36,19 +75,33 @@ class GenericViewSet(viewsets.ViewSetMixin, GenericAPIView):
         if permission_classes is not None:
             if isinstance(permission_classes, Iterable):
                 for permission_class in permission_classes:
-                    permissions.append(permission_class())
+                    permissions.append(self.instantiate_permission(permission_class))
             else:
-                permissions.append(permission_classes())
+                permissions.append(self.instantiate_permission(permission_classes))
 
         return permissions
 
+    def get_throttle_classes_or_none(self):
+        if self.action_throttle_classes:
+            return self.get_action_config(self.action_throttle_classes)
+
+    def get_throttles(self):
+        throttles = super().get_throttles()
+
+        throttle_classes = self.get_throttle_classes_or_none()
+        if throttle_classes is not None:
+            if isinstance(throttle_classes, Iterable):
+                throttles.extend(throttle_class() for throttle_class in throttle_classes)
+            else:
+                throttles.append(throttle_classes())
+
+        return throttles
+
     def get_request_serializer_class_or_none(self) -> Optional[Type[BaseSerializer]]:
         serializer_class = None
 
         if self.request_action_serializer_classes:
-            serializer_class = self.request_action_serializer_classes.get(self.action)
-            if serializer_class is None and self.action == 'partial_update':
-                serializer_class = self.request_action_serializer_classes.get('update')
+            serializer_class = self.get_action_config(self.request_action_serializer_classes)
 
         if serializer_class is None:
             return super().get_request_serializer_class_or_none()
@@ -65,9 +118,7 @@ class GenericViewSet(viewsets.ViewSetMixin, GenericAPIView):
         serializer_class = None
 
         if self.response_action_serializer_classes:
-            serializer_class = self.response_action_serializer_classes.get(self.action)
-            if serializer_class is None and self.action == 'partial_update':
-                serializer_class = self.response_action_serializer_classes.get('update')
+            serializer_class = self.get_action_config(self.response_action_serializer_classes)
 
         if serializer_class is None:
             return super().get_response_serializer_class_or_none()
@@ -80,6 +131,72 @@ class GenericViewSet(viewsets.ViewSetMixin, GenericAPIView):
             '`response_action_serializer_classes` attribute'
         )
 
+    def is_deferred(self) -> bool:
+        if self.deferred_actions is None:
+            return super().is_deferred()
+
+        fallback_action = self.action_fallbacks.get(self.action)
+        return self.action in self.deferred_actions or fallback_action in self.deferred_actions
+
+    def get_slow_threshold_or_none(self, request) -> Optional[float]:
+        if self.action_slow_thresholds:
+            action = self.get_dispatch_action(request)
+            threshold = self.get_action_config(self.action_slow_thresholds, action)
+            if threshold is not None:
+                return threshold
+        return super().get_slow_threshold_or_none(request)
+
+    def get_db_alias_or_none(self) -> Optional[str]:
+        if self.action_db_alias:
+            db = self.get_action_config(self.action_db_alias)
+            if db is not None:
+                return db
+        return super().get_db_alias_or_none()
+
+    def get_request_trace(self, request) -> Optional[RequestTrace]:
+        trace = super().get_request_trace(request)
+        if self.action_query_budgets:
+            trace = trace or RequestTrace()
+            trace.record_queries = True
+        return trace
+
+    def finish_request_trace(self, trace, response):
+        super().finish_request_trace(trace, response)
+        self.check_query_budget(trace)
+
+    def get_query_budget_or_none(self) -> Optional[int]:
+        if self.action_query_budgets:
+            return self.get_action_config(self.action_query_budgets)
+
+    def check_query_budget(self, trace):
+        budget = self.get_query_budget_or_none()
+        if budget is None:
+            return
+
+        # Authentication, permissions and throttling are not part of the action
+        query_count = trace.get_query_count(exclude_phases=('initial',))
+        if query_count <= budget:
+            return
+
+        message = (
+            f'{self.__class__.__name__}.{self.action} executed {query_count} queries, '
+            f'the budget is {budget}.'
+        )
+        repeated_queries = trace.find_repeated_queries(
+            get_setting('N_PLUS_ONE_THRESHOLD'), exclude_phases=('initial',)
+        )
+        for repeated_query in repeated_queries:
+            message += f'\nLikely N+1: {repeated_query}'
+
+        should_raise = get_setting('QUERY_BUDGETS_RAISE')
+        if should_raise is None:
+            # Test runners force `DEBUG = False`, `setup_test_environment()` sets up the outbox
+            should_raise = settings.DEBUG or hasattr(mail, 'outbox')
+
+        if should_raise:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
     def raise_serializer_error(self):
         raise ImproperlyConfigured(
             f'{self.__class__.__name__} should properly configure one of these attributes: '
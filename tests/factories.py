@@ -1,7 +1,7 @@
 import factory
 from django.contrib.auth import get_user_model
 
-from .models import Article, Comment
+from .models import Article, Comment, Document, DocumentNote, DocumentPage
 
 User = get_user_model()
 
@@ -22,6 +22,29 @@ class CommentFactory(factory.django.DjangoModelFactory):
         model = Comment
 
 
+class DocumentFactory(factory.django.DjangoModelFactory):
+    title = factory.Sequence(lambda n: f'document-title-{n}')
+
+    class Meta:
+        model = Document
+
+
+class DocumentPageFactory(factory.django.DjangoModelFactory):
+    document = factory.SubFactory('tests.factories.DocumentFactory')
+    text = factory.Sequence(lambda n: f'document-page-text-{n}')
+
+    class Meta:
+        model = DocumentPage
+
+
+class DocumentNoteFactory(factory.django.DjangoModelFactory):
+    document = factory.SubFactory('tests.factories.DocumentFactory')
+    text = factory.Sequence(lambda n: f'document-note-text-{n}')
+
+    class Meta:
+        model = DocumentNote
+
+
 class UserFactory(factory.django.DjangoModelFactory):
     username = factory.Sequence(lambda n: 'username-{n}')
     password = factory.Faker(
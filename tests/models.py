@@ -10,3 +10,21 @@ class Article(models.Model):
 class Comment(models.Model):
     article = models.ForeignKey('Article', on_delete=models.CASCADE, related_name='comments')
     text = models.TextField()
+
+
+class Document(models.Model):
+    title = models.CharField(max_length=255)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class DocumentPage(models.Model):
+    document = models.ForeignKey('Document', on_delete=models.CASCADE, related_name='pages')
+    text = models.TextField()
+
+
+class DocumentNote(models.Model):
+    document = models.ForeignKey(
+        'Document', on_delete=models.SET_NULL, null=True, related_name='notes'
+    )
+    text = models.TextField()
@@ -1,7 +1,7 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-from .models import Article, Comment
+from .models import Article, Comment, Document
 
 User = get_user_model()
 
@@ -62,3 +62,14 @@ class UserSerializer(serializers.ModelSerializer):
             'username',
             'email',
         )
+
+
+class DocumentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Document
+        fields = (
+            'id',
+            'title',
+            'version',
+        )
+        read_only_fields = ('version',)
@@ -28,6 +28,7 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_batteries',
     'tests',
+    'store',
 ]
 
 MIDDLEWARE = [
@@ -69,7 +70,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # A separate database to test routing of reads to replicas
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),
+    },
 }
 
 
@@ -0,0 +1,182 @@
+import threading
+
+import pytest
+from django.db import connection
+from django.urls import path
+from rest_framework import permissions, routers, serializers
+
+from rest_batteries.mixins import ListModelMixin
+from rest_batteries.views import APIView, BatchAPIView
+from rest_batteries.viewsets import GenericViewSet, ModelViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+
+class ArticleViewSet(ModelViewSet):
+    queryset = Article.objects.all()
+    permission_classes = (permissions.IsAuthenticated,)
+    request_serializer_class = ArticleRequestSerializer
+    response_serializer_class = ArticleResponseSerializer
+
+
+class ItemSerializer(serializers.Serializer):
+    name = serializers.CharField()
+
+
+class ItemViewSet(ListModelMixin, GenericViewSet):
+    response_serializer_class = ItemSerializer
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_queryset(self):
+        # Both reads have to run at the same time to pass the barrier
+        ItemViewSet.barrier.wait()
+        return [{'name': self.request.query_params['name']}]
+
+
+class PlainView(APIView):
+    def get(self, _request):
+        pass
+
+
+class AtomicBatchAPIView(BatchAPIView):
+    atomic_writes = True
+
+
+class ParallelBatchAPIView(BatchAPIView):
+    parallel_reads = True
+    max_operations = 3
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'items', ItemViewSet, basename='item')
+
+urlpatterns = router.urls + [
+    path('plain/', PlainView.as_view()),
+    path('batch/', BatchAPIView.as_view()),
+    path('atomic-batch/', AtomicBatchAPIView.as_view()),
+    path('parallel-batch/', ParallelBatchAPIView.as_view()),
+]
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+def not_found_error():
+    return {'errors': [{'message': 'Not found.', 'code': 'not_found'}]}
+
+
+class TestBatchAPIView:
+    def test_operations(self, test_user_api_client):
+        article_1 = f.ArticleFactory.create()
+
+        response = test_user_api_client.post(
+            '/batch/',
+            [
+                {'method': 'GET', 'path': f'/articles/{article_1.id}/'},
+                {'method': 'POST', 'path': '/articles/', 'body': {'title': 't', 'text': 'x'}},
+                {'method': 'PATCH', 'path': f'/articles/{article_1.id}/', 'body': {'text': 'y'}},
+                {'method': 'GET', 'path': '/articles/?ordering=id'},
+            ],
+            format='json',
+        )
+
+        assert response.status_code == 200
+        assert [result['status'] for result in response.data] == [200, 201, 200, 200]
+        assert response.data[0]['body']['title'] == article_1.title
+        assert response.data[1]['body']['title'] == 't'
+        assert response.data[2]['body']['text'] == 'y'
+        assert len(response.data[3]['body']) == 2
+
+    def test_failures_are_formatted(self, test_user_api_client):
+        response = test_user_api_client.post(
+            '/batch/',
+            [
+                {'method': 'POST', 'path': '/articles/', 'body': {'text': 'x'}},
+                {'method': 'GET', 'path': '/articles/999/'},
+                {'method': 'GET', 'path': '/unknown/'},
+                {'method': 'GET', 'path': '/plain/'},
+                {'method': 'DELETE', 'path': '/articles/'},
+            ],
+            format='json',
+        )
+
+        assert [result['status'] for result in response.data] == [400, 404, 404, 400, 405]
+        assert response.data[0]['body'] == {
+            'errors': [
+                {'message': 'This field is required.', 'code': 'required', 'field': 'title'}
+            ]
+        }
+        assert response.data[1]['body'] == not_found_error()
+        assert response.data[2]['body'] == not_found_error()
+        assert response.data[3]['body']['errors'][0]['field'] == 'path'
+        assert response.data[4]['body']['errors'][0]['code'] == 'method_not_allowed'
+
+    def test_operations_are_authenticated_as_batch_request(self, api_client):
+        response = api_client.post(
+            '/batch/', [{'method': 'GET', 'path': '/articles/'}], format='json'
+        )
+
+        assert response.data[0]['status'] == 403
+
+    def test_atomic_writes(self, test_user_api_client):
+        article_1 = f.ArticleFactory.create()
+
+        response = test_user_api_client.post(
+            '/atomic-batch/',
+            [
+                {'method': 'POST', 'path': '/articles/', 'body': {'title': 't', 'text': 'x'}},
+                {'method': 'GET', 'path': f'/articles/{article_1.id}/'},
+                {'method': 'POST', 'path': '/articles/', 'body': {'text': 'x'}},
+                {'method': 'DELETE', 'path': f'/articles/{article_1.id}/'},
+            ],
+            format='json',
+        )
+
+        assert [result['status'] for result in response.data] == [409, 200, 400, 424]
+        assert response.data[0]['body']['errors'][0]['code'] == 'rolled_back'
+        assert response.data[3]['body']['errors'][0]['code'] == 'not_executed'
+        assert list(Article.objects.all()) == [article_1]
+
+    def test_failed_write_only_rolls_back_itself_with_atomic_requests(
+        self, monkeypatch, test_user_api_client
+    ):
+        monkeypatch.setitem(connection.settings_dict, 'ATOMIC_REQUESTS', True)
+
+        response = test_user_api_client.post(
+            '/batch/',
+            [
+                {'method': 'POST', 'path': '/articles/', 'body': {'title': 't', 'text': 'x'}},
+                {'method': 'POST', 'path': '/articles/', 'body': {'text': 'x'}},
+            ],
+            format='json',
+        )
+
+        assert [result['status'] for result in response.data] == [201, 400]
+        assert [article.title for article in Article.objects.all()] == ['t']
+
+    def test_parallel_reads(self, api_client):
+        response = api_client.post(
+            '/parallel-batch/',
+            [
+                {'method': 'GET', 'path': '/items/?name=first'},
+                {'method': 'GET', 'path': '/items/?name=second'},
+            ],
+            format='json',
+        )
+
+        assert [result['body'] for result in response.data] == [
+            [{'name': 'first'}],
+            [{'name': 'second'}],
+        ]
+
+    def test_max_operations(self, api_client):
+        response = api_client.post(
+            '/parallel-batch/', [{'method': 'GET', 'path': '/items/'}] * 4, format='json'
+        )
+
+        assert response.status_code == 400
@@ -0,0 +1,112 @@
+import pytest
+from rest_framework import permissions, routers
+
+from rest_batteries.mixins import BatchRetrieveModelMixin, RetrieveModelMixin
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleResponseSerializer
+
+
+class IsNotDeleted(permissions.BasePermission):
+    def has_object_permission(self, request, view, obj):
+        return not obj.is_deleted
+
+
+class ArticleViewSet(BatchRetrieveModelMixin, RetrieveModelMixin, GenericViewSet):
+    queryset = Article.objects.prefetch_related('comments')
+    action_permission_classes = {
+        'retrieve': IsNotDeleted,
+    }
+    response_action_serializer_classes = {
+        'retrieve': ArticleResponseSerializer,
+    }
+    batch_retrieve_max_size = 4
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+class TestBatchRetrieve:
+    def test_batch_retrieve(self, api_client, django_assert_num_queries):
+        article_1 = f.ArticleFactory.create()
+        article_2 = f.ArticleFactory.create()
+        comment_1 = f.CommentFactory.create(article=article_2)
+
+        # Articles and prefetched comments
+        with django_assert_num_queries(2):
+            response = api_client.get(f'/articles/batch/?ids={article_2.id},{article_1.id}')
+
+        assert response.status_code == 200
+        assert response.data == [
+            {
+                'id': article_2.id,
+                'title': article_2.title,
+                'text': article_2.text,
+                'comments': [{'id': comment_1.id, 'text': comment_1.text}],
+            },
+            {
+                'id': article_1.id,
+                'title': article_1.title,
+                'text': article_1.text,
+                'comments': [],
+            },
+        ]
+
+    def test_not_found_and_forbidden_ids_are_marked(self, test_user_api_client):
+        article_1 = f.ArticleFactory.create()
+        article_2 = f.ArticleFactory.create(is_deleted=True)
+
+        response = test_user_api_client.get(
+            f'/articles/batch/?ids=999,{article_2.id},abc,{article_1.id}'
+        )
+
+        assert response.status_code == 200
+        assert response.data[0] == {
+            'id': 999,
+            'errors': [{'message': 'Not found.', 'code': 'not_found'}],
+        }
+        assert response.data[1] == {
+            'id': article_2.id,
+            'errors': [
+                {
+                    'message': 'You do not have permission to perform this action.',
+                    'code': 'permission_denied',
+                }
+            ],
+        }
+        # Invalid ids are returned as is
+        assert response.data[2] == {
+            'id': 'abc',
+            'errors': [{'message': 'Not found.', 'code': 'not_found'}],
+        }
+        assert response.data[3]['id'] == article_1.id
+
+    def test_duplicate_ids_are_returned_once(self, api_client):
+        article_1 = f.ArticleFactory.create()
+
+        response = api_client.get(f'/articles/batch/?ids={article_1.id}, {article_1.id}')
+
+        assert response.status_code == 200
+        assert [item['id'] for item in response.data] == [article_1.id]
+
+    def test_ids_are_required(self, api_client):
+        response = api_client.get('/articles/batch/')
+
+        assert response.status_code == 400
+        assert response.data == {'ids': ['This field is required.']}
+
+    def test_too_many_ids(self, api_client):
+        response = api_client.get('/articles/batch/?ids=1,2,3,4,5')
+
+        assert response.status_code == 400
+        assert response.data == {'ids': ['Ensure there are no more than 4 ids.']}
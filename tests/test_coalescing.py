@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+from rest_framework import routers, serializers
+
+from rest_batteries.coalescing import SingleFlight
+from rest_batteries.mixins import ListModelMixin
+from rest_batteries.routing import make_primary_pin
+from rest_batteries.viewsets import GenericViewSet
+
+from .utils import APIClient
+
+
+class ItemSerializer(serializers.Serializer):
+    name = serializers.CharField()
+
+
+class ItemViewSet(ListModelMixin, GenericViewSet):
+    response_serializer_class = ItemSerializer
+    coalesce_requests = True
+    calls = 0
+    release = threading.Event()
+
+    def get_queryset(self):
+        ItemViewSet.calls += 1
+        ItemViewSet.release.wait(5)
+        return [{'name': f'item-{self.request.query_params.get("page", 1)}'}]
+
+
+class NotCoalescedItemViewSet(ItemViewSet):
+    coalesce_requests = False
+
+
+router = routers.SimpleRouter()
+router.register(r'items', ItemViewSet, basename='item')
+router.register(r'not-coalesced-items', NotCoalescedItemViewSet, basename='not-coalesced-item')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture(autouse=True)
+def reset_items():
+    ItemViewSet.calls = 0
+    ItemViewSet.release.clear()
+    yield
+    ItemViewSet.release.set()
+
+
+def get_concurrently(urls, headers=None):
+    responses = [None] * len(urls)
+    headers = headers or [{}] * len(urls)
+
+    def get(index):
+        responses[index] = APIClient().get(urls[index], **headers[index])
+
+    threads = [threading.Thread(target=get, args=(index,)) for index in range(len(urls))]
+    for thread in threads:
+        thread.start()
+    # Let all requests reach the view before the first one finishes
+    time.sleep(0.2)
+    ItemViewSet.release.set()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+class TestRequestCoalescing:
+    def test_identical_requests_are_coalesced(self):
+        responses = get_concurrently(['/items/?page=2&size=1', '/items/?size=1&page=2'] * 3)
+
+        assert ItemViewSet.calls == 1
+        assert all(response.status_code == 200 for response in responses)
+        assert {response.content for response in responses} == {b'[{"name":"item-2"}]'}
+
+    def test_different_requests_are_not_coalesced(self):
+        responses = get_concurrently(['/items/?page=1', '/items/?page=2'])
+
+        assert ItemViewSet.calls == 2
+        assert [response.json() for response in responses] == [
+            [{'name': 'item-1'}],
+            [{'name': 'item-2'}],
+        ]
+
+    def test_requests_of_pinned_clients_are_not_coalesced(self, settings):
+        settings.REST_BATTERIES = {'READ_REPLICA_ALIASES': ['replica']}
+        pin = make_primary_pin()
+
+        get_concurrently(['/items/'] * 2, headers=[{}, {'HTTP_X_PRIMARY_PIN': pin}])
+
+        assert ItemViewSet.calls == 2
+
+    def test_coalescing_is_disabled_by_default(self):
+        get_concurrently(['/not-coalesced-items/'] * 3)
+
+        assert ItemViewSet.calls == 3
+
+
+class TestSingleFlight:
+    def test_failed_call_is_retried_by_waiting_callers(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        results = []
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError
+
+        def run_failing():
+            with pytest.raises(ValueError):
+                single_flight.do('key', fail)
+
+        thread = threading.Thread(target=run_failing)
+        thread.start()
+        started.wait()
+        results.append(single_flight.do('key', lambda: 'result'))
+        thread.join()
+
+        assert results == [('result', True)]
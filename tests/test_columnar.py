@@ -0,0 +1,216 @@
+import json
+
+import pytest
+from rest_framework import pagination, renderers, routers, serializers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from rest_batteries.mixins import ListModelMixin
+from rest_batteries.renderers import ColumnarJSONRenderer
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Article, Comment
+from .serializers import ArticleResponseSerializer
+
+
+class ArticleSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Article
+        fields = (
+            'id',
+            'title',
+            'is_deleted',
+        )
+
+
+class CommentWithArticleSerializer(serializers.ModelSerializer):
+    article = ArticleSummarySerializer()
+    article_id = serializers.PrimaryKeyRelatedField(source='article', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'text',
+            'article',
+            'article_id',
+        )
+
+
+class CommentWithMethodFieldSerializer(serializers.ModelSerializer):
+    upper_text = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'upper_text',
+        )
+
+    def get_upper_text(self, comment):
+        return comment.text.upper()
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['id'] = str(data['id'])
+        return data
+
+
+class Pagination(pagination.PageNumberPagination):
+    page_size = 2
+
+
+class CommentViewSet(ListModelMixin, GenericViewSet):
+    queryset = Comment.objects.select_related('article').order_by('-id')
+    response_serializer_class = CommentWithArticleSerializer
+    renderer_classes = (renderers.JSONRenderer, ColumnarJSONRenderer)
+
+    @action(detail=False)
+    def texts(self, _request):
+        return Response(
+            [{'text': text} for text in self.get_queryset().values_list('text', flat=True)]
+        )
+
+
+class PaginatedCommentViewSet(CommentViewSet):
+    pagination_class = Pagination
+
+
+class DatabaseCommentViewSet(CommentViewSet):
+    db_json_rendering = True
+
+
+class DatabasePaginatedCommentViewSet(PaginatedCommentViewSet):
+    db_json_rendering = True
+
+
+class MethodFieldCommentViewSet(DatabaseCommentViewSet):
+    response_serializer_class = CommentWithMethodFieldSerializer
+
+
+class ArticleViewSet(ListModelMixin, GenericViewSet):
+    queryset = Article.objects.prefetch_related('comments').order_by('id')
+    response_serializer_class = ArticleResponseSerializer
+    renderer_classes = (renderers.JSONRenderer, ColumnarJSONRenderer)
+    db_json_rendering = True
+
+
+router = routers.SimpleRouter()
+router.register(r'comments', CommentViewSet, basename='comment')
+router.register(r'paginated-comments', PaginatedCommentViewSet, basename='paginated-comment')
+router.register(r'db-comments', DatabaseCommentViewSet, basename='db-comment')
+router.register(
+    r'db-paginated-comments', DatabasePaginatedCommentViewSet, basename='db-paginated-comment'
+)
+router.register(r'method-comments', MethodFieldCommentViewSet, basename='method-comment')
+router.register(r'articles', ArticleViewSet, basename='article')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture
+def comments():
+    article_1 = f.ArticleFactory.create()
+    article_2 = f.ArticleFactory.create(is_deleted=True)
+    return [
+        f.CommentFactory.create(article=article_1),
+        f.CommentFactory.create(article=article_2),
+        f.CommentFactory.create(article=article_1),
+    ]
+
+
+def get_columns(comments):
+    comments = sorted(comments, key=lambda comment: comment.id, reverse=True)
+    return {
+        'columns': ['id', 'text', 'article', 'article_id'],
+        'data': {
+            'id': [comment.id for comment in comments],
+            'text': [comment.text for comment in comments],
+            'article': [
+                {
+                    'id': comment.article.id,
+                    'title': comment.article.title,
+                    'is_deleted': comment.article.is_deleted,
+                }
+                for comment in comments
+            ],
+            'article_id': [comment.article_id for comment in comments],
+        },
+    }
+
+
+class TestColumnarFormat:
+    @pytest.mark.parametrize('url', ['/comments/', '/db-comments/'])
+    def test_list(self, api_client, comments, url):
+        response = api_client.get(url, {'format': 'columnar'})
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'application/json'
+        assert json.loads(response.content) == get_columns(comments)
+
+    @pytest.mark.parametrize('url', ['/paginated-comments/', '/db-paginated-comments/'])
+    def test_paginated_list(self, api_client, comments, url):
+        response = api_client.get(url, {'format': 'columnar', 'page': 1})
+
+        data = json.loads(response.content)
+        assert data['count'] == 3
+        assert data['results'] == get_columns(comments[1:])
+
+    @pytest.mark.parametrize('url', ['/comments/', '/db-comments/'])
+    def test_empty_list(self, api_client, url):
+        response = api_client.get(url, {'format': 'columnar'})
+
+        assert json.loads(response.content) == {
+            'columns': ['id', 'text', 'article', 'article_id'],
+            'data': {'id': [], 'text': [], 'article': [], 'article_id': []},
+        }
+
+    def test_database_builds_columns(self, api_client, comments, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = api_client.get('/db-comments/', {'format': 'columnar'})
+
+        assert json.loads(response.content) == get_columns(comments)
+
+    def test_nested_lists(self, api_client):
+        article_1, article_2 = f.ArticleFactory.create_batch(2)
+        comment_1 = f.CommentFactory.create(article=article_1)
+
+        response = api_client.get('/articles/', {'format': 'columnar'})
+
+        assert json.loads(response.content)['data']['comments'] == [
+            [{'id': comment_1.id, 'text': comment_1.text}],
+            [],
+        ]
+
+    def test_custom_representation(self, api_client, comments):
+        response = api_client.get('/method-comments/', {'format': 'columnar'})
+
+        assert json.loads(response.content) == {
+            'columns': ['id', 'upper_text'],
+            'data': {
+                'id': [str(comment.id) for comment in reversed(comments)],
+                'upper_text': [comment.text.upper() for comment in reversed(comments)],
+            },
+        }
+
+    def test_renderer_converts_other_lists(self, api_client, comments):
+        response = api_client.get('/comments/texts/', {'format': 'columnar'})
+
+        assert json.loads(response.content) == {
+            'columns': ['text'],
+            'data': {'text': [comment.text for comment in reversed(comments)]},
+        }
+
+    def test_json_format_is_not_affected(self, api_client, comments):
+        response = api_client.get('/db-comments/')
+
+        data = json.loads(b''.join(response.streaming_content))
+        assert [comment['id'] for comment in data] == [
+            comment.id for comment in reversed(comments)
+        ]
@@ -0,0 +1,82 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from rest_framework import routers
+
+from rest_batteries.viewsets import ModelViewSet
+
+from . import factories as f
+from .models import Article, Comment
+from .serializers import CommentRequestSerializer, CommentResponseSerializer
+
+
+class CommentViewSet(ModelViewSet):
+    queryset = Comment.objects.all()
+    request_action_serializer_classes = {
+        'create': CommentRequestSerializer,
+        'update': CommentRequestSerializer,
+    }
+    response_action_serializer_classes = {
+        'create': CommentResponseSerializer,
+        'retrieve': CommentResponseSerializer,
+        'list': CommentResponseSerializer,
+        'update': CommentResponseSerializer,
+    }
+
+
+router = routers.DefaultRouter()
+router.register(r'comments', CommentViewSet, basename='comment')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+def replay_load(*args, **kwargs):
+    stdout = StringIO()
+    call_command('replay_load', *args, stdout=stdout, **kwargs)
+    return stdout.getvalue()
+
+
+class TestReplayLoadCommand:
+    def test_replay_load(self):
+        article_1 = f.ArticleFactory.create()
+        f.CommentFactory.create_batch(10, article=article_1)
+
+        output = replay_load(
+            '--requests=50',
+            '--mix=list=1,retrieve=1,create=1,update=1,destroy=1',
+            '--seed=1',
+            '--json',
+        )
+        report = json.loads(output)
+
+        assert report['requests'] == 50
+        actions = {row['action']: row for row in report['actions']}
+        assert set(actions) == {'list', 'retrieve', 'create', 'update', 'destroy'}
+        for row in actions.values():
+            assert row['viewset'] == 'CommentViewSet'
+            assert row['errors'] == 0
+            assert row['p50_ms'] <= row['p95_ms'] <= row['p99_ms']
+            assert row['mean_queries'] >= 1
+        assert Comment.objects.count() == 10 + actions['create']['requests'] - (
+            actions['destroy']['requests']
+        )
+
+    def test_replay_load__when_rollback(self):
+        f.CommentFactory.create_batch(3)
+
+        output = replay_load('--requests=20', '--mix=create=1,destroy=1', '--rollback')
+
+        assert '20 requests in' in output
+        assert Comment.objects.count() == 3
+        assert Article.objects.count() == 3
+
+    def test_replay_load__when_no_routes_match(self):
+        with pytest.raises(CommandError):
+            replay_load('--viewset=UnknownViewSet')
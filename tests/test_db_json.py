@@ -0,0 +1,166 @@
+import json
+
+import pytest
+from rest_framework import pagination, routers, serializers
+
+from rest_batteries.mixins import ListModelMixin
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Article, Comment
+from .serializers import ArticleResponseSerializer
+
+
+class ArticleSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Article
+        fields = (
+            'id',
+            'title',
+            'is_deleted',
+        )
+
+
+class CommentWithArticleSerializer(serializers.ModelSerializer):
+    article = ArticleSummarySerializer()
+    article_id = serializers.PrimaryKeyRelatedField(source='article', read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'text',
+            'article',
+            'article_id',
+        )
+
+
+class CommentWithMethodFieldSerializer(serializers.ModelSerializer):
+    upper_text = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'upper_text',
+        )
+
+    def get_upper_text(self, comment):
+        return comment.text.upper()
+
+
+class Pagination(pagination.PageNumberPagination):
+    page_size = 2
+
+
+class ArticleViewSet(ListModelMixin, GenericViewSet):
+    queryset = Article.objects.prefetch_related('comments').order_by('-id')
+    response_serializer_class = ArticleResponseSerializer
+    db_json_rendering = True
+
+
+class PaginatedArticleViewSet(ArticleViewSet):
+    pagination_class = Pagination
+
+
+class DeletingArticleViewSet(PaginatedArticleViewSet):
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        # Another request deletes a row of the page
+        Article.objects.filter(pk=page[0]).delete()
+        return page
+
+
+class PythonArticleViewSet(PaginatedArticleViewSet):
+    db_json_rendering = False
+
+
+class CommentViewSet(ListModelMixin, GenericViewSet):
+    queryset = Comment.objects.select_related('article').order_by('id')
+    response_serializer_class = CommentWithArticleSerializer
+    db_json_rendering = True
+
+
+class MethodFieldCommentViewSet(CommentViewSet):
+    response_serializer_class = CommentWithMethodFieldSerializer
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'paginated-articles', PaginatedArticleViewSet, basename='paginated-article')
+router.register(r'deleting-articles', DeletingArticleViewSet, basename='deleting-article')
+router.register(r'python-articles', PythonArticleViewSet, basename='python-article')
+router.register(r'comments', CommentViewSet, basename='comment')
+router.register(r'method-comments', MethodFieldCommentViewSet, basename='method-comment')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture
+def articles():
+    article_1 = f.ArticleFactory.create(title='Ünïcode "quoted"')
+    f.CommentFactory.create_batch(2, article=article_1)
+    article_2 = f.ArticleFactory.create()
+    article_3 = f.ArticleFactory.create(is_deleted=True)
+    f.CommentFactory.create(article=article_3)
+    return [article_1, article_2, article_3]
+
+
+def get_json(response):
+    if response.streaming:
+        return json.loads(b''.join(response.streaming_content))
+    return json.loads(response.content)
+
+
+class TestDBJSONRendering:
+    def test_list_is_streamed(self, api_client, articles, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = api_client.get('/articles/')
+            data = get_json(response)
+
+        assert response.streaming
+        assert response['Content-Type'] == 'application/json'
+        assert data == ArticleResponseSerializer(reversed(articles), many=True).data
+
+    def test_pagination(self, api_client, articles, django_assert_num_queries):
+        # Count, page primary keys and JSON of the page
+        with django_assert_num_queries(3):
+            response = api_client.get('/paginated-articles/?page=2')
+
+        python_response = api_client.get('/python-articles/?page=2')
+        assert response.status_code == 200
+        data, python_data = get_json(response), get_json(python_response)
+        assert data['previous'] == 'http://testserver/paginated-articles/'
+        assert (data['count'], data['next']) == (python_data['count'], python_data['next'])
+        assert data['results'] == python_data['results']
+        assert data['results'][0]['id'] == articles[0].id
+
+    def test_pagination__when_row_is_deleted_after_page_query(self, api_client, articles):
+        response = api_client.get('/deleting-articles/')
+
+        assert response.status_code == 200
+        assert [article['id'] for article in get_json(response)['results']] == [articles[1].id]
+
+    def test_nested_foreign_key(self, api_client, articles):
+        response = api_client.get('/comments/')
+
+        data = get_json(response)
+        assert data == CommentWithArticleSerializer(Comment.objects.order_by('id'), many=True).data
+        assert data[-1]['article']['is_deleted'] is True
+
+    def test_fallback_for_not_compilable_fields(self, api_client, articles):
+        response = api_client.get('/method-comments/')
+
+        assert not response.streaming
+        assert get_json(response)[0]['upper_text'] == Comment.objects.first().text.upper()
+
+    def test_fallback_for_other_formats(self, api_client, articles):
+        response = api_client.get('/paginated-articles/', HTTP_ACCEPT='text/html')
+
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/html')
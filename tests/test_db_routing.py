@@ -0,0 +1,197 @@
+import time
+
+import pytest
+from django.core import signing
+from django.urls import path
+from rest_framework import routers
+
+from rest_batteries.mixins import BatchRetrieveModelMixin
+from rest_batteries.routing import PRIMARY_PIN_SALT
+from rest_batteries.views import BatchAPIView
+from rest_batteries.viewsets import ModelViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+pytestmark = pytest.mark.django_db(databases=['default', 'replica'])
+
+
+class ArticleViewSet(BatchRetrieveModelMixin, ModelViewSet):
+    queryset = Article.objects.all()
+    request_serializer_class = ArticleRequestSerializer
+    response_serializer_class = ArticleResponseSerializer
+
+
+class PrimaryRetrieveArticleViewSet(ArticleViewSet):
+    action_db_alias = {
+        'retrieve': 'default',
+    }
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'primary-articles', PrimaryRetrieveArticleViewSet, basename='primary-article')
+
+urlpatterns = router.urls + [
+    path('batch/', BatchAPIView.as_view()),
+]
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.REST_BATTERIES = {'READ_REPLICA_ALIASES': ['replica']}
+
+
+@pytest.fixture
+def primary_article():
+    return f.ArticleFactory(title='primary')
+
+
+@pytest.fixture
+def replica_article():
+    return Article.objects.using('replica').create(title='replica', text='text')
+
+
+def get_titles(response):
+    return [article['title'] for article in response.data]
+
+
+def sign_pin(pinned_until):
+    return signing.TimestampSigner(salt=PRIMARY_PIN_SALT).sign(str(int(pinned_until)))
+
+
+def get_pinned_until(pin):
+    return int(signing.TimestampSigner(salt=PRIMARY_PIN_SALT).unsign(pin))
+
+
+class TestReadReplicaRouting:
+    def test_list__when_request_is_safe(self, api_client, primary_article, replica_article):
+        response = api_client.get('/articles/')
+
+        assert response.status_code == 200
+        assert get_titles(response) == ['replica']
+        assert 'rest_batteries_primary_pin' not in response.cookies
+        assert 'X-Primary-Pin' not in response
+
+    def test_partial_update__when_request_is_a_write(self, api_client, primary_article):
+        response = api_client.patch(f'/articles/{primary_article.id}/', {'title': 'changed'})
+
+        assert response.status_code == 200
+        primary_article.refresh_from_db()
+        assert primary_article.title == 'changed'
+
+    def test_retrieve__when_action_has_db_alias(
+        self, api_client, primary_article, replica_article
+    ):
+        response = api_client.get(f'/primary-articles/{primary_article.id}/')
+        assert response.status_code == 200
+        assert response.data['title'] == 'primary'
+
+        response = api_client.get('/primary-articles/')
+        assert get_titles(response) == ['replica']
+
+    def test_batch_retrieve__when_fallback_action_has_db_alias(self, api_client, primary_article):
+        response = api_client.get(f'/primary-articles/batch/?ids={primary_article.id}')
+
+        assert response.status_code == 200
+        assert response.data[0]['title'] == 'primary'
+
+    def test_list__when_replicas_are_not_configured(self, settings, api_client, primary_article):
+        settings.REST_BATTERIES = {}
+
+        response = api_client.get('/articles/')
+        assert get_titles(response) == ['primary']
+
+        response = api_client.post('/articles/', {'title': 'created', 'text': 'text'})
+        assert response.status_code == 201
+        assert 'rest_batteries_primary_pin' not in response.cookies
+
+
+class TestPrimaryPinning:
+    def test_create__when_write_succeeds(self, api_client, primary_article, replica_article):
+        response = api_client.post('/articles/', {'title': 'created', 'text': 'text'})
+
+        assert response.status_code == 201
+        pin = response.cookies['rest_batteries_primary_pin'].value
+        assert response['X-Primary-Pin'] == pin
+        assert time.time() < get_pinned_until(pin) <= time.time() + 10
+
+        # The test client sends the cookie back
+        response = api_client.get('/articles/')
+        assert get_titles(response) == ['primary', 'created']
+
+    def test_create__when_write_fails(self, api_client):
+        response = api_client.post('/articles/', {'title': 'created'})
+
+        assert response.status_code == 400
+        assert 'rest_batteries_primary_pin' not in response.cookies
+        assert 'X-Primary-Pin' not in response
+
+    def test_create__when_pin_window_is_configured(self, settings, api_client):
+        settings.REST_BATTERIES = {'READ_REPLICA_ALIASES': ['replica'], 'PRIMARY_PIN_SECONDS': 60}
+
+        response = api_client.post('/articles/', {'title': 'created', 'text': 'text'})
+
+        assert response.cookies['rest_batteries_primary_pin']['max-age'] == 60
+        assert get_pinned_until(response['X-Primary-Pin']) > time.time() + 50
+
+    def test_list__when_pin_header_is_sent(self, api_client, primary_article, replica_article):
+        pin = sign_pin(time.time() + 10)
+
+        response = api_client.get('/articles/', HTTP_X_PRIMARY_PIN=pin)
+        assert get_titles(response) == ['primary']
+
+    def test_list__when_pin_is_expired(self, api_client, primary_article, replica_article):
+        pin = sign_pin(time.time() - 1)
+
+        response = api_client.get('/articles/', HTTP_X_PRIMARY_PIN=pin)
+        assert get_titles(response) == ['replica']
+
+    @pytest.mark.parametrize('pin', [str(int(time.time() + 10)), 'inf', '99999999999', 'invalid'])
+    def test_list__when_pin_is_forged(self, api_client, primary_article, replica_article, pin):
+        response = api_client.get('/articles/', HTTP_X_PRIMARY_PIN=pin)
+        assert get_titles(response) == ['replica']
+
+        api_client.cookies['rest_batteries_primary_pin'] = pin
+        response = api_client.get('/articles/')
+        assert get_titles(response) == ['replica']
+
+    def test_list__when_pin_is_too_far_in_future(
+        self, api_client, primary_article, replica_article
+    ):
+        pin = sign_pin(time.time() + 60)
+
+        response = api_client.get('/articles/', HTTP_X_PRIMARY_PIN=pin)
+        assert get_titles(response) == ['replica']
+
+    def test_batch__when_operation_writes(self, api_client, primary_article, replica_article):
+        response = api_client.post(
+            '/batch/',
+            [
+                {'method': 'GET', 'path': '/articles/'},
+                {
+                    'method': 'POST',
+                    'path': '/articles/',
+                    'body': {'title': 'created', 'text': 'x'},
+                },
+                {'method': 'GET', 'path': '/articles/'},
+            ],
+            format='json',
+        )
+
+        assert response.status_code == 200
+        first_read, _, second_read = [result['body'] for result in response.data]
+        assert [article['title'] for article in first_read] == ['replica']
+        assert [article['title'] for article in second_read] == ['primary', 'created']
+        pin = response.cookies['rest_batteries_primary_pin'].value
+        assert response['X-Primary-Pin'] == pin
+        assert time.time() < get_pinned_until(pin) <= time.time() + 10
+
+        response = api_client.get('/articles/')
+        assert get_titles(response) == ['primary', 'created']
@@ -0,0 +1,135 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.urls import path
+from rest_framework import routers
+
+from rest_batteries.deferred import ThreadPoolJobExecutor
+from rest_batteries.mixins import CreateModelMixin, UpdateModelMixin
+from rest_batteries.views import JobStatusView
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Comment
+from .serializers import CommentRequestSerializer, CommentResponseSerializer
+
+
+class CommentViewSet(CreateModelMixin, UpdateModelMixin, GenericViewSet):
+    queryset = Comment.objects.all()
+    request_serializer_class = CommentRequestSerializer
+    response_serializer_class = CommentResponseSerializer
+    deferred_actions = ('create', 'update')
+
+    def perform_create(self, serializer):
+        if serializer.validated_data['text'] == 'fail':
+            raise ValueError('Unexpected')
+        return super().perform_create(serializer)
+
+
+router = routers.SimpleRouter()
+router.register(r'comments', CommentViewSet, basename='comment')
+
+urlpatterns = router.urls + [path('jobs/<job_id>/', JobStatusView.as_view())]
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+    settings.REST_BATTERIES = {'DEFERRED_EXECUTOR': 'rest_batteries.deferred.ImmediateJobExecutor'}
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def on_commit(django_capture_on_commit_callbacks):
+    # Tests run in a transaction that is never committed
+    return lambda: django_capture_on_commit_callbacks(execute=True)
+
+
+class TestDeferredExecution:
+    def test_create(self, api_client, on_commit):
+        article_1 = f.ArticleFactory.create()
+
+        with on_commit():
+            response = api_client.post('/comments/', {'article_id': article_1.id, 'text': 'text'})
+
+        assert response.status_code == 202
+        assert response.data['status'] == 'pending'
+        comment = Comment.objects.get()
+
+        response = api_client.get(f'/jobs/{response.data["id"]}/')
+
+        assert response.status_code == 200
+        assert response.data['status'] == 'succeeded'
+        assert response.data['result'] == {'id': comment.id, 'text': 'text'}
+
+    def test_partial_update_falls_back_to_update(self, api_client, on_commit):
+        comment_1 = f.CommentFactory.create()
+
+        with on_commit():
+            response = api_client.patch(f'/comments/{comment_1.id}/', {'text': 'new-text'})
+
+        assert response.status_code == 202
+        response = api_client.get(f'/jobs/{response.data["id"]}/')
+        assert response.data['result'] == {'id': comment_1.id, 'text': 'new-text'}
+
+    def test_request_is_validated_before_deferring(self, api_client):
+        response = api_client.post('/comments/', {'text': 'text'})
+
+        assert response.status_code == 400
+
+    def test_failed_job(self, api_client, on_commit):
+        article_1 = f.ArticleFactory.create()
+
+        with on_commit():
+            response = api_client.post('/comments/', {'article_id': article_1.id, 'text': 'fail'})
+        response = api_client.get(f'/jobs/{response.data["id"]}/')
+
+        assert response.data['status'] == 'failed'
+        assert response.data['errors'] == [
+            {'message': 'A server error occurred.', 'code': 'error'}
+        ]
+
+    def test_jobs_of_other_users_are_not_visible(self, api_client, test_user):
+        article_1 = f.ArticleFactory.create()
+        response = api_client.post('/comments/', {'article_id': article_1.id, 'text': 'text'})
+
+        api_client.login(test_user)
+        response = api_client.get(f'/jobs/{response.data["id"]}/')
+
+        assert response.status_code == 404
+
+    def test_create__when_request_is_atomic(
+        self, api_client, monkeypatch, django_capture_on_commit_callbacks
+    ):
+        monkeypatch.setitem(connection.settings_dict, 'ATOMIC_REQUESTS', True)
+        article_1 = f.ArticleFactory.create()
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = api_client.post('/comments/', {'article_id': article_1.id, 'text': 'text'})
+            job_id = response.data['id']
+
+            # The job isn't submitted before the request is committed
+            assert response.status_code == 202
+            assert not Comment.objects.exists()
+            assert api_client.get(f'/jobs/{job_id}/').data['status'] == 'pending'
+
+        assert len(callbacks) == 1
+        callbacks[0]()
+        assert api_client.get(f'/jobs/{job_id}/').data['status'] == 'succeeded'
+        assert Comment.objects.exists()
+
+    def test_unknown_job(self, api_client):
+        response = api_client.get('/jobs/unknown/')
+
+        assert response.status_code == 404
+
+
+def test_thread_pool_executor():
+    executor = ThreadPoolJobExecutor(max_workers=1)
+    results = []
+
+    executor.submit(results.append, 'result')
+    executor.pool.shutdown(wait=True)
+
+    assert results == ['result']
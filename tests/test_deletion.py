@@ -0,0 +1,178 @@
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.db.models import F, signals
+from django.test.utils import CaptureQueriesContext
+from rest_framework import routers
+
+from rest_batteries.deletion import can_delete_in_chunks, delete_in_chunks
+from rest_batteries.mixins import DestroyModelMixin
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Article, Comment, Document, DocumentNote, DocumentPage
+
+
+class ArticleViewSet(DestroyModelMixin, GenericViewSet):
+    queryset = Article.objects.all()
+    destroy_chunk_size = 2
+
+
+class DocumentViewSet(DestroyModelMixin, GenericViewSet):
+    queryset = Document.objects.all()
+    destroy_chunk_size = 2
+    version_field = 'version'
+
+
+class RacingDocumentViewSet(DocumentViewSet):
+    @contextmanager
+    def versioned_destroy(self, instance):
+        with super().versioned_destroy(instance):
+            # Another request writes the document after the version is bumped
+            Document.objects.update(version=F('version') + 1)
+            yield
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'documents', DocumentViewSet, basename='document')
+router.register(r'racing-documents', RacingDocumentViewSet, basename='racing-document')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+def get_chunk_delete_queries(queries, table):
+    return [
+        query
+        for query in queries
+        if query['sql'].startswith(f'DELETE FROM "{table}" WHERE "{table}"."id" IN')
+    ]
+
+
+def get_savepoints():
+    # Atomic blocks without savepoints are stored as `None`
+    return [savepoint for savepoint in connection.savepoint_ids if savepoint is not None]
+
+
+@pytest.fixture
+def on_page_delete():
+    receivers = []
+
+    def connect(receiver):
+        receivers.append(receiver)
+        signals.pre_delete.connect(receiver, sender=DocumentPage)
+
+    yield connect
+    for receiver in receivers:
+        signals.pre_delete.disconnect(receiver, sender=DocumentPage)
+
+
+class TestDeleteInChunks:
+    def test_destroy(self, api_client):
+        article_1 = f.ArticleFactory.create()
+        f.CommentFactory.create_batch(5, article=article_1)
+        comment_2 = f.CommentFactory.create()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.delete(f'/articles/{article_1.id}/')
+
+        assert response.status_code == 204
+        assert not Article.objects.filter(id=article_1.id).exists()
+        assert list(Comment.objects.all()) == [comment_2]
+        assert len(get_chunk_delete_queries(queries, 'tests_comment')) == 3
+
+    def test_signals_are_sent(self):
+        article_1 = f.ArticleFactory.create()
+        comments = f.CommentFactory.create_batch(3, article=article_1)
+        deleted_ids = []
+
+        def receiver(instance, **_kwargs):
+            deleted_ids.append(instance.id)
+
+        signals.post_delete.connect(receiver, sender=Comment)
+        try:
+            result = delete_in_chunks(article_1, chunk_size=2)
+        finally:
+            signals.post_delete.disconnect(receiver, sender=Comment)
+
+        assert sorted(deleted_ids) == [comment.id for comment in comments]
+        assert result == (4, {'tests.Comment': 3, 'tests.Article': 1})
+
+    def test_result_is_the_same_as_delete(self):
+        article_1 = f.ArticleFactory.create()
+        f.CommentFactory.create_batch(3, article=article_1)
+        article_2 = f.ArticleFactory.create()
+        f.CommentFactory.create_batch(3, article=article_2)
+
+        assert delete_in_chunks(article_1, chunk_size=2) == article_2.delete()
+
+    def test_can_delete_in_chunks(self, django_user_model):
+        assert can_delete_in_chunks(Article)
+        # Permissions and groups are related through `ManyToManyField`
+        assert can_delete_in_chunks(django_user_model)
+
+    def test_destroy_with_version_field(self, api_client, on_page_delete):
+        document_1 = f.DocumentFactory.create()
+        f.DocumentPageFactory.create_batch(3, document=document_1)
+        savepoints = get_savepoints()
+        chunk_savepoints = []
+        on_page_delete(lambda **_kwargs: chunk_savepoints.append(get_savepoints()))
+
+        response = api_client.delete(f'/documents/{document_1.id}/', HTTP_IF_MATCH='"1"')
+
+        assert response.status_code == 204
+        assert not Document.objects.exists()
+        assert not DocumentPage.objects.exists()
+        # Chunks are not deleted in the transaction of the version
+        assert chunk_savepoints == [savepoints] * 3
+
+    # The conflict rolls back the transaction of the chunk, without an outer test transaction
+    @pytest.mark.django_db(transaction=True)
+    def test_destroy_with_version_field__when_object_is_written_during_chunks(
+        self, api_client, on_page_delete
+    ):
+        document_1 = f.DocumentFactory.create()
+        f.DocumentPageFactory.create_batch(3, document=document_1)
+        on_page_delete(lambda **_kwargs: Document.objects.update(version=F('version') + 1))
+
+        response = api_client.delete(f'/documents/{document_1.id}/')
+
+        # The deletion stops at the next chunk
+        assert response.status_code == 409
+        assert Document.objects.filter(id=document_1.id).exists()
+        assert DocumentPage.objects.count() == 1
+
+    # The conflict rolls back the transaction of the chunk, without an outer test transaction
+    @pytest.mark.django_db(transaction=True)
+    def test_destroy_with_version_field__when_object_is_written_before_chunks(self, api_client):
+        document_1 = f.DocumentFactory.create()
+        f.DocumentPageFactory.create_batch(3, document=document_1)
+        f.DocumentNoteFactory.create(document=document_1)
+
+        response = api_client.delete(f'/racing-documents/{document_1.id}/')
+
+        assert response.status_code == 409
+        assert Document.objects.filter(id=document_1.id).exists()
+        assert DocumentPage.objects.filter(document=document_1).count() == 3
+        assert DocumentNote.objects.get().document == document_1
+
+    def test_destroy__when_dependents_are_set_null(self, api_client):
+        document_1 = f.DocumentFactory.create()
+        notes = f.DocumentNoteFactory.create_batch(3, document=document_1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.delete(f'/documents/{document_1.id}/')
+
+        assert response.status_code == 204
+        assert [note.document_id for note in DocumentNote.objects.order_by('id')] == [None] * 3
+        assert [note.id for note in DocumentNote.objects.order_by('id')] == [n.id for n in notes]
+        updates = [
+            query for query in queries if query['sql'].startswith('UPDATE "tests_documentnote"')
+        ]
+        assert len(updates) == 2
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from rest_framework import serializers
+from store.models import Order, OrderLine, Product
+from store.serializers import OrderResponseSerializer
+
+
+class PlainProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Product
+        fields = (
+            'id',
+            'name',
+            'price',
+        )
+
+
+class PlainOrderLineSerializer(serializers.ModelSerializer):
+    product = PlainProductSerializer()
+
+    class Meta:
+        model = OrderLine
+        fields = (
+            'id',
+            'product',
+            'quantity',
+        )
+
+
+class PlainOrderSerializer(serializers.ModelSerializer):
+    lines = PlainOrderLineSerializer(many=True)
+    total_price = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Order
+        fields = (
+            'id',
+            'status',
+            'total_price',
+            'lines',
+        )
+
+
+def create_orders():
+    bread = Product.objects.create(name='Bread', price=Decimal('3.49'))
+    milk = Product.objects.create(name='Milk', price=Decimal('6.96'))
+    order_1 = Order.objects.create()
+    OrderLine.objects.create(order=order_1, product=bread, quantity=2)
+    OrderLine.objects.create(order=order_1, product=milk, quantity=1)
+    order_2 = Order.objects.create()
+    OrderLine.objects.create(order=order_2, product=milk, quantity=3)
+    Order.objects.create()
+
+
+def get_orders():
+    return Order.objects.prefetch_related('lines__product').order_by('id')
+
+
+def get_total_prices(data):
+    # Decimals compare equal regardless of their exponent, so compare the strings
+    return [str(order['total_price']) for order in data]
+
+
+class TestOrderResponseSerializer:
+    def test_representation_is_the_same__when_retrieving(self):
+        create_orders()
+        order = get_orders().first()
+
+        data = OrderResponseSerializer(order).data
+        expected_data = PlainOrderSerializer(order).data
+
+        assert data == expected_data
+        assert get_total_prices([data]) == get_total_prices([expected_data]) == ['13.94']
+
+    def test_representation_is_the_same__when_listing(self):
+        create_orders()
+        orders = get_orders()
+
+        data = OrderResponseSerializer(orders, many=True).data
+        expected_data = PlainOrderSerializer(orders, many=True).data
+
+        assert data == expected_data
+        assert get_total_prices(data) == get_total_prices(expected_data)
+        assert get_total_prices(data) == ['13.94', '20.88', '0']
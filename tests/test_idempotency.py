@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+from rest_framework import routers
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from rest_batteries.idempotency import (
+    CacheIdempotencyStore,
+    DatabaseIdempotencyStore,
+    IdempotencyRecord,
+    get_request_hash,
+)
+from rest_batteries.mixins import CreateModelMixin, UpdateModelMixin
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+
+class ArticleViewSet(CreateModelMixin, UpdateModelMixin, GenericViewSet):
+    queryset = Article.objects.all()
+    request_serializer_class = ArticleRequestSerializer
+    response_serializer_class = ArticleResponseSerializer
+    idempotency_poll_interval = 0.01
+    perform_calls = 0
+
+    def perform_create(self, serializer):
+        ArticleViewSet.perform_calls += 1
+        return super().perform_create(serializer)
+
+
+class DatabaseStoreArticleViewSet(ArticleViewSet):
+    idempotency_store = DatabaseIdempotencyStore()
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'db-articles', DatabaseStoreArticleViewSet, basename='db-article')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    CacheIdempotencyStore().cache.clear()
+    ArticleViewSet.perform_calls = 0
+
+
+@pytest.mark.parametrize('url', ['/articles/', '/db-articles/'])
+class TestIdempotentCreate:
+    def test_replay_returns_stored_response(self, api_client, url):
+        data = {'title': 'title', 'text': 'text'}
+
+        response_1 = api_client.post(url, data, HTTP_IDEMPOTENCY_KEY='key-1')
+        response_2 = api_client.post(url, data, HTTP_IDEMPOTENCY_KEY='key-1')
+
+        assert response_1.status_code == response_2.status_code == 201
+        assert response_1.content == response_2.content
+        assert response_2['Idempotent-Replayed'] == 'true'
+        assert Article.objects.count() == 1
+        assert ArticleViewSet.perform_calls == 1
+
+    def test_different_keys(self, api_client, url):
+        data = {'title': 'title', 'text': 'text'}
+
+        api_client.post(url, data, HTTP_IDEMPOTENCY_KEY='key-1')
+        response = api_client.post(url, data, HTTP_IDEMPOTENCY_KEY='key-2')
+
+        assert response.status_code == 201
+        assert Article.objects.count() == 2
+
+    def test_key_reused_with_different_payload(self, api_client, url):
+        api_client.post(url, {'title': 'title', 'text': 'text'}, HTTP_IDEMPOTENCY_KEY='key-1')
+        response = api_client.post(
+            url, {'title': 'other', 'text': 'text'}, HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+
+        assert response.status_code == 422
+        assert response.data['detail'].code == 'idempotency_key_reused'
+        assert Article.objects.count() == 1
+
+    def test_failed_requests_are_not_stored(self, api_client, url):
+        response_1 = api_client.post(url, {'title': 'title'}, HTTP_IDEMPOTENCY_KEY='key-1')
+        response_2 = api_client.post(url, {'title': 'title'}, HTTP_IDEMPOTENCY_KEY='key-1')
+
+        assert response_1.status_code == response_2.status_code == 400
+        assert not response_2.has_header('Idempotent-Replayed')
+
+
+class TestIdempotentConcurrentRequests:
+    data = {'title': 'title', 'text': 'text'}
+
+    def get_key_and_hash(self):
+        request = Request(
+            APIRequestFactory().post(
+                '/articles/', self.data, format='json', HTTP_IDEMPOTENCY_KEY='key-1'
+            ),
+            parsers=[JSONParser()],
+        )
+        return ArticleViewSet().get_idempotency_key(request), get_request_hash(request)
+
+    def post(self, api_client):
+        return api_client.post(
+            '/articles/', self.data, format='json', HTTP_IDEMPOTENCY_KEY='key-1'
+        )
+
+    def test_waits_for_request_in_progress(self, api_client):
+        store = CacheIdempotencyStore()
+        key, request_hash = self.get_key_and_hash()
+        store.set(key, IdempotencyRecord(request_hash), 10)
+
+        # The first request finishes while the second one is waiting
+        completed = IdempotencyRecord(
+            request_hash,
+            status_code=201,
+            headers=[('Content-Type', 'application/json')],
+            content=b'{"id": 1}',
+        )
+        timer = threading.Timer(0.1, store.set, (key, completed, 10))
+        timer.start()
+        response = self.post(api_client)
+        timer.join()
+
+        assert response.status_code == 201
+        assert response.content == b'{"id": 1}'
+        assert ArticleViewSet.perform_calls == 0
+
+    def test_request_in_progress_timeout(self, api_client, settings):
+        settings.REST_BATTERIES = {'IDEMPOTENCY_LOCK_TIMEOUT': 0.05}
+        key, request_hash = self.get_key_and_hash()
+        CacheIdempotencyStore().set(key, IdempotencyRecord(request_hash), 10)
+
+        response = self.post(api_client)
+
+        assert response.status_code == 409
+        assert response.data['detail'].code == 'idempotency_key_in_progress'
+        assert ArticleViewSet.perform_calls == 0
+
+
+def test_idempotent_update(api_client):
+    article_1 = f.ArticleFactory.create()
+    data = {'title': 'new-title', 'text': 'text'}
+
+    response_1 = api_client.put(f'/articles/{article_1.id}/', data, HTTP_IDEMPOTENCY_KEY='key-1')
+    Article.objects.filter(id=article_1.id).update(title='changed')
+    response_2 = api_client.put(f'/articles/{article_1.id}/', data, HTTP_IDEMPOTENCY_KEY='key-1')
+
+    assert response_1.content == response_2.content
+    assert response_2['Idempotent-Replayed'] == 'true'
+    assert Article.objects.get(id=article_1.id).title == 'changed'
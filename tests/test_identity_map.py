@@ -0,0 +1,90 @@
+import pytest
+from rest_framework import routers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from rest_batteries.mixins import DestroyModelMixin, FullUpdateModelMixin, RetrieveModelMixin
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Comment
+from .serializers import CommentRequestSerializer, CommentResponseSerializer
+
+
+class CommentViewSet(RetrieveModelMixin, FullUpdateModelMixin, DestroyModelMixin, GenericViewSet):
+    queryset = Comment.objects.all()
+    request_action_serializer_classes = {
+        'update': CommentRequestSerializer,
+    }
+    response_action_serializer_classes = {
+        'retrieve': CommentResponseSerializer,
+        'update': CommentResponseSerializer,
+    }
+    objects_after_update = []
+
+    def get_response_serializer(self, *args, **kwargs):
+        # Response-context builders often call `get_object()` again
+        if self.action == 'update':
+            self.objects_after_update.append((args[0], self.get_object()))
+        return super().get_response_serializer(*args, **kwargs)
+
+    @action(detail=True, methods=['get'])
+    def lookups(self, _request, *_args, **_kwargs):
+        first = self.get_object()
+        second = self.get_object()
+        from_identity_map = self.identity_map.get_or_fetch(self.get_queryset(), first.pk)
+
+        self.invalidate_object_cache()
+        third = self.get_object()
+
+        return Response(
+            {
+                'memoized': first is second,
+                'identity_map': from_identity_map is first,
+                'invalidated': third is not first,
+            }
+        )
+
+
+router = routers.SimpleRouter()
+router.register(r'comments', CommentViewSet, basename='comment')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+class TestGetObjectMemoization:
+    def test_get_object_is_memoized(self, api_client, django_assert_num_queries):
+        comment_1 = f.CommentFactory.create()
+
+        with django_assert_num_queries(2):
+            response = api_client.get(f'/comments/{comment_1.id}/lookups/')
+
+        assert response.status_code == 200
+        assert response.data == {'memoized': True, 'identity_map': True, 'invalidated': True}
+
+    def test_get_object_cache_is_invalidated_after_update(self, api_client):
+        comment_1 = f.CommentFactory.create()
+        CommentViewSet.objects_after_update.clear()
+
+        response = api_client.put(
+            f'/comments/{comment_1.id}/',
+            {'article_id': comment_1.article_id, 'text': 'new-text'},
+        )
+
+        assert response.status_code == 200
+        ((updated, refetched),) = CommentViewSet.objects_after_update
+        assert updated is not refetched
+        assert refetched.text == 'new-text'
+
+    def test_destroy(self, api_client):
+        comment_1 = f.CommentFactory.create()
+
+        response = api_client.delete(f'/comments/{comment_1.id}/')
+
+        assert response.status_code == 204
+        assert not Comment.objects.filter(id=comment_1.id).exists()
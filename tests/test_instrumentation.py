@@ -0,0 +1,180 @@
+import logging
+
+import pytest
+from django.core import mail
+from rest_framework import routers
+
+from rest_batteries.exceptions import QueryBudgetExceeded
+from rest_batteries.mixins import CreateModelMixin, ListModelMixin, RetrieveModelMixin
+from rest_batteries.signals import request_trace_finished
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+
+class ArticleViewSet(CreateModelMixin, ListModelMixin, RetrieveModelMixin, GenericViewSet):
+    queryset = Article.objects.all()
+    request_action_serializer_classes = {
+        'create': ArticleRequestSerializer,
+    }
+    response_action_serializer_classes = {
+        'create': ArticleResponseSerializer,
+        'list': ArticleResponseSerializer,
+        'retrieve': ArticleResponseSerializer,
+    }
+
+
+class BudgetedArticleViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
+    queryset = Article.objects.all()
+    response_action_serializer_classes = {
+        'list': ArticleResponseSerializer,
+        'retrieve': ArticleResponseSerializer,
+    }
+    action_query_budgets = {
+        'list': 2,
+        'retrieve': 2,
+    }
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'budgeted-articles', BudgetedArticleViewSet, basename='budgeted-article')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture
+def phase_timing(settings):
+    settings.REST_BATTERIES = {'PHASE_TIMING': True}
+
+
+def get_metric_names(response):
+    return [metric.strip().split(';')[0] for metric in response['Server-Timing'].split(',')]
+
+
+class TestPhaseTiming:
+    def test_server_timing_header__when_disabled(self, api_client):
+        response = api_client.get('/articles/')
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response
+
+    def test_server_timing_header__when_list(self, api_client, phase_timing):
+        f.ArticleFactory.create()
+
+        response = api_client.get('/articles/')
+        assert response.status_code == 200
+        assert get_metric_names(response) == [
+            'initial',
+            'filter_queryset',
+            'paginate_queryset',
+            'serialize',
+            'render',
+            'db',
+            'total',
+        ]
+        assert 'serialize;' in response['Server-Timing']
+        assert 'db;dur=' in response['Server-Timing']
+
+    def test_server_timing_header__when_retrieve(self, api_client, phase_timing):
+        article_1 = f.ArticleFactory.create()
+
+        response = api_client.get(f'/articles/{article_1.id}/')
+        assert response.status_code == 200
+        assert get_metric_names(response)[1:4] == ['get_object', 'filter_queryset', 'serialize']
+
+    def test_server_timing_header__when_create(self, api_client, phase_timing):
+        response = api_client.post('/articles/', {'title': 'title', 'text': 'text'})
+        assert response.status_code == 201
+        assert get_metric_names(response)[1:4] == ['is_valid', 'perform_create', 'serialize']
+
+    def test_request_trace_finished_signal(self, api_client, phase_timing):
+        f.ArticleFactory.create()
+        received = []
+
+        def receiver(sender, view, request, response, trace, **kwargs):
+            received.append((sender, trace))
+
+        request_trace_finished.connect(receiver)
+        try:
+            api_client.get('/articles/')
+        finally:
+            request_trace_finished.disconnect(receiver)
+
+        assert len(received) == 1
+        sender, trace = received[0]
+        assert sender is ArticleViewSet
+        assert trace.query_count == 2
+        serialize_phase = next(phase for phase in trace.phases if phase.name == 'serialize')
+        assert serialize_phase.query_count == 2
+
+
+@pytest.fixture
+def query_budgets_raise(settings):
+    settings.REST_BATTERIES = {'QUERY_BUDGETS_RAISE': True}
+
+
+class TestQueryBudgets:
+    def test_list__when_within_budget(self, api_client, query_budgets_raise):
+        f.ArticleFactory.create()
+
+        response = api_client.get('/budgeted-articles/')
+        assert response.status_code == 200
+
+    def test_retrieve__when_within_budget(self, test_user_api_client, query_budgets_raise):
+        article_1 = f.ArticleFactory.create()
+        f.CommentFactory.create_batch(3, article=article_1)
+
+        # Authentication queries do not count towards the budget
+        response = test_user_api_client.get(f'/budgeted-articles/{article_1.id}/')
+        assert response.status_code == 200
+
+    def test_list__when_budget_exceeded(self, api_client, query_budgets_raise):
+        f.ArticleFactory.create_batch(3)
+
+        with pytest.raises(QueryBudgetExceeded) as exc_info:
+            api_client.get('/budgeted-articles/')
+
+        message = str(exc_info.value)
+        assert 'BudgetedArticleViewSet.list executed 4 queries, the budget is 2.' in message
+        expected_n_plus_one = (
+            'Likely N+1: 3 similar queries triggered by `ArticleResponseSerializer.comments`'
+        )
+        assert expected_n_plus_one in message
+
+    def test_list__when_budget_exceeded_under_test_runner(self, api_client, settings):
+        settings.DEBUG = False
+        f.ArticleFactory.create_batch(3)
+
+        with pytest.raises(QueryBudgetExceeded):
+            api_client.get('/budgeted-articles/')
+
+    def test_list__when_budget_exceeded_in_production_mode(
+        self, api_client, settings, monkeypatch, caplog
+    ):
+        settings.DEBUG = False
+        # Outside of test runners there's no outbox
+        monkeypatch.delattr(mail, 'outbox')
+        f.ArticleFactory.create_batch(3)
+
+        with caplog.at_level(logging.WARNING, logger='rest_batteries.query_budgets'):
+            response = api_client.get('/budgeted-articles/')
+
+        assert response.status_code == 200
+        assert 'BudgetedArticleViewSet.list executed 4 queries' in caplog.text
+
+    def test_list__when_raising_is_disabled(self, api_client, settings, caplog):
+        settings.REST_BATTERIES = {'QUERY_BUDGETS_RAISE': False}
+        f.ArticleFactory.create_batch(3)
+
+        with caplog.at_level(logging.WARNING, logger='rest_batteries.query_budgets'):
+            response = api_client.get('/budgeted-articles/')
+
+        assert response.status_code == 200
+        assert 'BudgetedArticleViewSet.list executed 4 queries' in caplog.text
@@ -0,0 +1,169 @@
+from unittest import mock
+
+import pytest
+from django.urls import path
+from rest_framework import routers
+
+from rest_batteries import metrics
+from rest_batteries.metrics import FileMetricsStore, MetricsRegistry, render_prometheus
+from rest_batteries.views import MetricsView
+from rest_batteries.viewsets import ModelViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+
+class ArticleViewSet(ModelViewSet):
+    queryset = Article.objects.all()
+    request_serializer_class = ArticleRequestSerializer
+    response_serializer_class = ArticleResponseSerializer
+
+
+class UntrackedArticleViewSet(ArticleViewSet):
+    metrics_enabled = False
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'untracked-articles', UntrackedArticleViewSet, basename='untracked-article')
+
+urlpatterns = router.urls + [
+    path('metrics/', MetricsView.as_view()),
+]
+
+VIEW = f'{__name__}.ArticleViewSet'
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+    settings.REST_FRAMEWORK = {
+        'EXCEPTION_HANDLER': 'rest_batteries.exception_handlers.errors_formatter_exception_handler'
+    }
+    settings.REST_BATTERIES = {'METRICS_ENABLED': True}
+
+
+@pytest.fixture(autouse=True)
+def registry():
+    registry = metrics.get_metrics_store().registry
+    registry.clear()
+    yield registry
+    registry.clear()
+
+
+class TestMetrics:
+    def test_requests_are_recorded(self, api_client, registry):
+        f.ArticleFactory.create_batch(2)
+
+        api_client.get('/articles/')
+        api_client.get('/articles/')
+        api_client.post('/articles/', data={'title': 'title', 'text': 'text'})
+
+        labels = (('view', VIEW), ('action', 'list'))
+        bucket_counts, _, count = registry.histograms[(metrics.REQUEST_DURATION, labels)]
+        assert count == 2
+        assert sum(bucket_counts) == 2
+        _, queries, _ = registry.histograms[(metrics.REQUEST_QUERIES, labels)]
+        # Articles and comments of 2 articles
+        assert queries == 6
+        assert registry.histograms[(metrics.RESPONSE_SIZE, labels)][1] > 0
+        assert (metrics.REQUEST_DURATION, (('view', VIEW), ('action', 'create'))) in (
+            registry.histograms
+        )
+        assert registry.counters == {}
+
+    def test_errors_are_counted_by_code(self, api_client, registry):
+        api_client.get('/articles/999/')
+        api_client.get('/articles/999/')
+        api_client.post('/articles/', data={})
+
+        assert registry.counters == {
+            (
+                metrics.ERRORS,
+                (('view', VIEW), ('action', 'retrieve'), ('status', '404'), ('code', 'error')),
+            ): 2,
+            (
+                metrics.ERRORS,
+                (('view', VIEW), ('action', 'create'), ('status', '400'), ('code', 'required')),
+            ): 1,
+        }
+
+    def test_disabled(self, api_client, registry):
+        api_client.get('/untracked-articles/')
+
+        assert registry.histograms == {}
+
+    def test_metrics_view(self, api_client):
+        api_client.get('/articles/')
+        api_client.get('/articles/999/')
+
+        response = api_client.get('/metrics/')
+
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/plain; version=0.0.4; charset=utf-8'
+        content = response.content.decode()
+        assert '# TYPE rest_batteries_request_duration_seconds histogram' in content
+        assert (
+            f'rest_batteries_request_duration_seconds_count{{view="{VIEW}",action="list"}} 1'
+        ) in content
+        assert (
+            f'rest_batteries_request_queries_bucket{{view="{VIEW}",action="list",le="+Inf"}} 1'
+        ) in content
+        assert (
+            f'rest_batteries_errors_total{{view="{VIEW}",action="retrieve",status="404",'
+            f'code="error"}} 1'
+        ) in content
+
+
+class TestRenderPrometheus:
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        labels = (('view', 'a"b\\c'),)
+        for value in (0, 1, 3, 1000):
+            registry.observe(metrics.REQUEST_QUERIES, labels, value)
+
+        lines = render_prometheus(registry).splitlines()
+
+        assert lines[:2] == [
+            '# HELP rest_batteries_request_queries Number of database queries per request.',
+            '# TYPE rest_batteries_request_queries histogram',
+        ]
+        assert lines[2] == 'rest_batteries_request_queries_bucket{view="a\\"b\\\\c",le="0"} 1'
+        assert lines[4] == 'rest_batteries_request_queries_bucket{view="a\\"b\\\\c",le="2"} 2'
+        assert lines[5] == 'rest_batteries_request_queries_bucket{view="a\\"b\\\\c",le="5"} 3'
+        assert lines[10:] == [
+            'rest_batteries_request_queries_bucket{view="a\\"b\\\\c",le="+Inf"} 4',
+            'rest_batteries_request_queries_sum{view="a\\"b\\\\c"} 1004',
+            'rest_batteries_request_queries_count{view="a\\"b\\\\c"} 4',
+        ]
+
+
+class TestFileMetricsStore:
+    def test_processes_are_aggregated(self, tmp_path):
+        labels = (('view', 'view'), ('action', 'list'))
+        with mock.patch('os.getpid', return_value=1):
+            store_1 = FileMetricsStore(str(tmp_path), flush_interval=60)
+            store_1.observe(metrics.REQUEST_DURATION, labels, 0.1)
+        with mock.patch('os.getpid', return_value=2):
+            store_2 = FileMetricsStore(str(tmp_path), flush_interval=60)
+            store_2.observe(metrics.REQUEST_DURATION, labels, 0.3)
+            store_2.inc(metrics.ERRORS, labels)
+            registry = store_2.collect()
+
+        _, total, count = registry.histograms[(metrics.REQUEST_DURATION, labels)]
+        assert count == 2
+        assert total == pytest.approx(0.4)
+        assert registry.counters == {(metrics.ERRORS, labels): 1}
+
+    def test_forked_process_starts_empty(self, tmp_path):
+        labels = (('view', 'view'), ('action', 'list'))
+        with mock.patch('os.getpid', return_value=1):
+            store = FileMetricsStore(str(tmp_path), flush_interval=60)
+            store.observe(metrics.REQUEST_DURATION, labels, 0.1)
+        with mock.patch('os.getpid', return_value=3):
+            store.observe(metrics.REQUEST_DURATION, labels, 0.1)
+            registry = store.collect()
+
+        assert registry.histograms[(metrics.REQUEST_DURATION, labels)][2] == 2
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['1.json', '3.json']
@@ -0,0 +1,129 @@
+import pytest
+from django.db.models import F
+from rest_framework import routers
+
+from rest_batteries.mixins import DestroyModelMixin, RetrieveModelMixin, UpdateModelMixin
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Document
+from .serializers import DocumentSerializer
+
+
+class RacingDocumentSerializer(DocumentSerializer):
+    def validate_title(self, value):
+        if value == 'race':
+            # Another request saves the document while this one is being validated
+            Document.objects.update(version=F('version') + 1)
+        return value
+
+
+class DocumentViewSet(RetrieveModelMixin, UpdateModelMixin, DestroyModelMixin, GenericViewSet):
+    queryset = Document.objects.all()
+    request_serializer_class = RacingDocumentSerializer
+    response_serializer_class = DocumentSerializer
+    version_field = 'version'
+
+
+class TimestampDocumentViewSet(DocumentViewSet):
+    version_field = 'updated_at'
+
+
+router = routers.SimpleRouter()
+router.register(r'documents', DocumentViewSet, basename='document')
+router.register(r'timestamp-documents', TimestampDocumentViewSet, basename='timestamp-document')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+    settings.REST_FRAMEWORK = {
+        'EXCEPTION_HANDLER': 'rest_batteries.exception_handlers.errors_formatter_exception_handler'
+    }
+
+
+class TestOptimisticLocking:
+    def test_retrieve_returns_etag(self, api_client):
+        document_1 = f.DocumentFactory.create()
+
+        response = api_client.get(f'/documents/{document_1.id}/')
+
+        assert response['ETag'] == '"1"'
+
+    def test_update_bumps_version(self, api_client):
+        document_1 = f.DocumentFactory.create()
+
+        response = api_client.put(
+            f'/documents/{document_1.id}/', {'title': 'new-title'}, HTTP_IF_MATCH='"1"'
+        )
+
+        assert response.status_code == 200
+        assert response.data['version'] == 2
+        assert response['ETag'] == '"2"'
+        document_1.refresh_from_db()
+        assert (document_1.title, document_1.version) == ('new-title', 2)
+
+    def test_update_with_stale_etag(self, api_client):
+        document_1 = f.DocumentFactory.create(version=2)
+
+        response = api_client.put(
+            f'/documents/{document_1.id}/', {'title': 'new-title'}, HTTP_IF_MATCH='W/"1", "3"'
+        )
+
+        assert response.status_code == 412
+        assert response.data == {
+            'errors': [
+                {
+                    'message': (
+                        'The object was changed, its version does not match `If-Match` header.'
+                    ),
+                    'code': 'precondition_failed',
+                }
+            ]
+        }
+        document_1.refresh_from_db()
+        assert document_1.title != 'new-title'
+
+    def test_concurrent_update(self, api_client):
+        document_1 = f.DocumentFactory.create()
+
+        response = api_client.patch(f'/documents/{document_1.id}/', {'title': 'race'})
+
+        assert response.status_code == 409
+        assert response.data['errors'][0]['code'] == 'version_conflict'
+        document_1.refresh_from_db()
+        assert document_1.title != 'race'
+        assert document_1.version == 2
+
+    def test_destroy_with_stale_etag(self, api_client):
+        document_1 = f.DocumentFactory.create(version=2)
+
+        response = api_client.delete(f'/documents/{document_1.id}/', HTTP_IF_MATCH='"1"')
+
+        assert response.status_code == 412
+        assert Document.objects.filter(id=document_1.id).exists()
+
+    def test_destroy(self, api_client):
+        document_1 = f.DocumentFactory.create()
+
+        response = api_client.delete(f'/documents/{document_1.id}/', HTTP_IF_MATCH='*')
+
+        assert response.status_code == 204
+        assert not Document.objects.filter(id=document_1.id).exists()
+
+    def test_timestamp_version_field(self, api_client):
+        document_1 = f.DocumentFactory.create()
+        etag = api_client.get(f'/timestamp-documents/{document_1.id}/')['ETag']
+
+        response = api_client.put(
+            f'/timestamp-documents/{document_1.id}/', {'title': 'new-title'}, HTTP_IF_MATCH=etag
+        )
+        stale_response = api_client.put(
+            f'/timestamp-documents/{document_1.id}/', {'title': 'other'}, HTTP_IF_MATCH=etag
+        )
+
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+        assert stale_response.status_code == 412
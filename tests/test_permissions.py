@@ -0,0 +1,199 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import permissions, routers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from rest_batteries.mixins import ListModelMixin, RetrieveModelMixin
+from rest_batteries.permissions import AllowAny, QuerysetFilterPermission, StatelessPermission
+from rest_batteries.viewsets import GenericViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleResponseSerializer
+
+
+class CountingPermission(permissions.BasePermission):
+    instances = 0
+    object_checks = 0
+
+    def __init__(self):
+        CountingPermission.instances += 1
+
+    def has_object_permission(self, request, view, obj):
+        CountingPermission.object_checks += 1
+        return not obj.is_deleted
+
+
+class StatelessCountingPermission(StatelessPermission):
+    instances = 0
+
+    def __init__(self):
+        StatelessCountingPermission.instances += 1
+
+
+class ArticleViewSet(RetrieveModelMixin, GenericViewSet):
+    queryset = Article.objects.all()
+    permission_classes = (AllowAny,)
+    action_permission_classes = {
+        'retrieve': (CountingPermission, StatelessCountingPermission),
+        'touch': (CountingPermission, StatelessCountingPermission),
+    }
+    response_action_serializer_classes = {
+        'retrieve': ArticleResponseSerializer,
+    }
+
+    @action(detail=True, methods=['post'])
+    def touch(self, _request, *_args, **_kwargs):
+        instance = self.get_object()
+        self.check_object_permissions(self.request, instance)
+        self.check_object_permissions(self.request, instance)
+        return Response({'id': instance.id})
+
+
+class IsNotDeletedOrStaff(QuerysetFilterPermission):
+    def filter_queryset_for(self, request, view, queryset):
+        if request.user.is_staff:
+            return queryset
+        return queryset.filter(is_deleted=False)
+
+
+class VisibleArticleViewSet(ListModelMixin, RetrieveModelMixin, GenericViewSet):
+    queryset = Article.objects.all()
+    action_permission_classes = {
+        'list': IsNotDeletedOrStaff,
+        'retrieve': IsNotDeletedOrStaff,
+    }
+    response_action_serializer_classes = {
+        'list': ArticleResponseSerializer,
+        'retrieve': ArticleResponseSerializer,
+    }
+
+
+class HasTitle(QuerysetFilterPermission):
+    def filter_queryset_for(self, request, view, queryset):
+        return queryset.filter(title='visible')
+
+
+class AndComposedArticleViewSet(VisibleArticleViewSet):
+    action_permission_classes = None
+    permission_classes = (IsNotDeletedOrStaff & AllowAny,)
+
+
+class OrComposedArticleViewSet(VisibleArticleViewSet):
+    action_permission_classes = None
+    permission_classes = (IsNotDeletedOrStaff | HasTitle,)
+
+
+class InvalidOrComposedArticleViewSet(VisibleArticleViewSet):
+    action_permission_classes = None
+    permission_classes = (IsNotDeletedOrStaff | AllowAny,)
+
+
+class NegatedArticleViewSet(VisibleArticleViewSet):
+    action_permission_classes = None
+    permission_classes = (IsNotDeletedOrStaff | ~HasTitle,)
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+router.register(r'visible-articles', VisibleArticleViewSet, basename='visible-article')
+router.register(r'and-articles', AndComposedArticleViewSet, basename='and-article')
+router.register(r'or-articles', OrComposedArticleViewSet, basename='or-article')
+router.register(r'invalid-or-articles', InvalidOrComposedArticleViewSet, basename='invalid-or')
+router.register(r'negated-articles', NegatedArticleViewSet, basename='negated-article')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture(autouse=True)
+def reset_counters():
+    CountingPermission.instances = 0
+    CountingPermission.object_checks = 0
+    StatelessCountingPermission.instances = 0
+    if '_stateless_permissions' in ArticleViewSet.__dict__:
+        del ArticleViewSet._stateless_permissions
+
+
+class TestPermissions:
+    def test_stateless_permissions_are_instantiated_once(self, api_client):
+        article_1 = f.ArticleFactory.create()
+
+        for _ in range(3):
+            response = api_client.get(f'/articles/{article_1.id}/')
+            assert response.status_code == 200
+
+        assert StatelessCountingPermission.instances == 1
+        assert CountingPermission.instances >= 3
+
+    def test_object_permission_results_are_memoized_per_request(self, api_client):
+        article_1 = f.ArticleFactory.create()
+
+        response = api_client.post(f'/articles/{article_1.id}/touch/')
+        assert response.status_code == 200
+        assert CountingPermission.object_checks == 1
+
+        response = api_client.post(f'/articles/{article_1.id}/touch/')
+        assert response.status_code == 200
+        assert CountingPermission.object_checks == 2
+
+    def test_object_permission_denied(self, api_client):
+        article_1 = f.ArticleFactory.create(is_deleted=True)
+
+        response = api_client.post(f'/articles/{article_1.id}/touch/')
+        assert response.status_code == 403
+        assert CountingPermission.object_checks == 1
+
+
+class TestQuerysetFilterPermissions:
+    def test_list__when_rows_are_filtered(self, api_client):
+        article_1 = f.ArticleFactory.create()
+        f.ArticleFactory.create(is_deleted=True)
+
+        response = api_client.get('/visible-articles/')
+        assert response.status_code == 200
+        assert [article['id'] for article in response.data] == [article_1.id]
+
+    def test_list__when_rows_are_not_filtered(self, api_client, test_user):
+        test_user.is_staff = True
+        test_user.save(update_fields=['is_staff'])
+        api_client.login(test_user)
+        f.ArticleFactory.create()
+        f.ArticleFactory.create(is_deleted=True)
+
+        response = api_client.get('/visible-articles/')
+        assert response.status_code == 200
+        assert len(response.data) == 2
+
+    def test_retrieve__when_object_is_filtered(self, api_client):
+        article_1 = f.ArticleFactory.create(is_deleted=True)
+
+        response = api_client.get(f'/visible-articles/{article_1.id}/')
+        assert response.status_code == 404
+
+    def test_list__when_permissions_are_composed_with_and(self, api_client):
+        article_1 = f.ArticleFactory.create()
+        f.ArticleFactory.create(is_deleted=True)
+
+        response = api_client.get('/and-articles/')
+        assert response.status_code == 200
+        assert [article['id'] for article in response.data] == [article_1.id]
+
+    def test_list__when_permissions_are_composed_with_or(self, api_client):
+        article_1 = f.ArticleFactory.create()
+        article_2 = f.ArticleFactory.create(title='visible', is_deleted=True)
+        f.ArticleFactory.create(is_deleted=True)
+
+        response = api_client.get('/or-articles/')
+        assert response.status_code == 200
+        assert [article['id'] for article in response.data] == [article_1.id, article_2.id]
+
+    @pytest.mark.parametrize('prefix', ['invalid-or-articles', 'negated-articles'])
+    def test_list__when_filter_cant_be_composed(self, api_client, prefix):
+        with pytest.raises(ImproperlyConfigured):
+            api_client.get(f'/{prefix}/')
@@ -0,0 +1,125 @@
+import pstats
+from unittest import mock
+
+import pytest
+from django.urls import path
+from rest_framework import routers
+
+from rest_batteries.generics import ListAPIView
+from rest_batteries.profiling import DirectoryProfileSink, MemoryProfileSink
+from rest_batteries.viewsets import ModelViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+sink = MemoryProfileSink()
+
+
+class ArticleViewSet(ModelViewSet):
+    queryset = Article.objects.all()
+    request_serializer_class = ArticleRequestSerializer
+    response_serializer_class = ArticleResponseSerializer
+    action_profiling = {
+        'list': 1,
+        'update': 1,
+    }
+    profile_sink = sink
+
+
+class ArticleListView(ListAPIView):
+    queryset = Article.objects.all()
+    response_serializer_class = ArticleResponseSerializer
+    profiling_sample_rate = 1
+    profile_sink = sink
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+
+urlpatterns = router.urls + [
+    path('article-list/', ArticleListView.as_view()),
+]
+
+KEY = f'{__name__}.ArticleViewSet'
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture(autouse=True)
+def clear_sink():
+    yield
+    sink.stats.clear()
+    sink.sample_counts.clear()
+
+
+class TestProfiling:
+    def test_action_profiling(self, api_client):
+        article_1 = f.ArticleFactory.create()
+
+        api_client.get('/articles/')
+        api_client.get('/articles/')
+        api_client.get(f'/articles/{article_1.id}/')
+        api_client.patch(f'/articles/{article_1.id}/', data={'text': 'text'})
+
+        assert sink.sample_counts == {f'{KEY}.list': 2, f'{KEY}.partial_update': 1}
+        functions = {function for _, _, function in sink.stats[f'{KEY}.list'].stats}
+        assert '_list' in functions
+
+    def test_sample_rate(self, api_client):
+        api_client.get('/article-list/')
+
+        assert sink.sample_counts == {f'{__name__}.ArticleListView.get': 1}
+
+    def test_unsampled_requests_are_not_profiled(self, api_client):
+        article_1 = f.ArticleFactory.create()
+
+        with mock.patch('cProfile.Profile') as profile_class:
+            api_client.get(f'/articles/{article_1.id}/')
+
+        profile_class.assert_not_called()
+        assert sink.sample_counts == {}
+
+    def test_header(self, api_client, settings):
+        settings.REST_BATTERIES = {'PROFILING_SECRET': 'secret'}
+        article_1 = f.ArticleFactory.create()
+
+        api_client.get(f'/articles/{article_1.id}/', HTTP_X_PROFILE='wrong')
+        assert sink.sample_counts == {}
+
+        api_client.get(f'/articles/{article_1.id}/', HTTP_X_PROFILE='secret')
+        assert sink.sample_counts == {f'{KEY}.retrieve': 1}
+
+    def test_non_ascii_header(self, api_client, settings):
+        settings.REST_BATTERIES = {'PROFILING_SECRET': 'secret'}
+        article_1 = f.ArticleFactory.create()
+
+        response = api_client.get(f'/articles/{article_1.id}/', HTTP_X_PROFILE='é')
+        assert response.status_code == 200
+        assert sink.sample_counts == {}
+
+    def test_non_ascii_secret(self, api_client, settings):
+        settings.REST_BATTERIES = {'PROFILING_SECRET': 'sécret'}
+        article_1 = f.ArticleFactory.create()
+
+        # WSGI servers decode the UTF-8 bytes of the header as latin-1
+        value = 'sécret'.encode().decode('latin-1')
+        api_client.get(f'/articles/{article_1.id}/', HTTP_X_PROFILE=value)
+        assert sink.sample_counts == {f'{KEY}.retrieve': 1}
+
+
+class TestDirectoryProfileSink:
+    def test_samples_are_aggregated(self, api_client, tmp_path):
+        directory_sink = DirectoryProfileSink(str(tmp_path))
+
+        with mock.patch.object(ArticleViewSet, 'profile_sink', directory_sink):
+            api_client.get('/articles/')
+            total_calls = pstats.Stats(str(tmp_path / f'{KEY}.list.prof')).total_calls
+            api_client.get('/articles/')
+
+        stats = pstats.Stats(str(tmp_path / f'{KEY}.list.prof'))
+        assert stats.total_calls > total_calls
+        assert [path.name for path in tmp_path.iterdir()] == [f'{KEY}.list.prof']
@@ -0,0 +1,219 @@
+from unittest import mock
+
+from django.db.models import Count
+from rest_framework import serializers
+
+from rest_batteries.serializers import (
+    BatchFieldsMixin,
+    BatchMethodField,
+    CachedFieldsMixin,
+    MemoizedRepresentationMixin,
+)
+
+from . import factories as f
+from .models import Article, Comment
+from .serializers import ArticleResponseSerializer
+
+
+class CachedCommentSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    article_title = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'text',
+            'article_title',
+        )
+
+    def get_article_title(self, comment):
+        return f'{self.context["prefix"]}{comment.article.title}'
+
+
+class CachedArticleSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    comments = CachedCommentSerializer(many=True)
+
+    class Meta:
+        model = Article
+        fields = (
+            'id',
+            'title',
+            'text',
+            'comments',
+        )
+
+
+class TestCachedFieldsMixin:
+    def test_representation_is_the_same(self):
+        article_1 = f.ArticleFactory.create()
+        f.CommentFactory.create_batch(2, article=article_1)
+
+        data = CachedArticleSerializer(article_1, context={'prefix': '> '}).data
+        expected_data = ArticleResponseSerializer(article_1).data
+
+        assert [comment.pop('article_title') for comment in data['comments']] == [
+            f'> {article_1.title}'
+        ] * 2
+        assert data == expected_data
+
+    def test_fields_are_built_once(self):
+        article_1 = f.ArticleFactory.create()
+        CachedArticleSerializer(article_1, context={'prefix': ''}).data
+
+        with mock.patch.object(
+            serializers.ModelSerializer, 'build_field', side_effect=AssertionError
+        ):
+            data = CachedArticleSerializer([article_1], many=True, context={'prefix': ''}).data
+
+        assert data[0]['id'] == article_1.id
+
+    def test_instances_get_own_bound_fields(self):
+        serializer_1 = CachedArticleSerializer(context={'prefix': '1'})
+        serializer_2 = CachedArticleSerializer(context={'prefix': '2'})
+
+        comments_1 = serializer_1.fields['comments']
+        comments_2 = serializer_2.fields['comments']
+        assert comments_1 is not comments_2
+        assert comments_1.child is not comments_2.child
+        assert comments_1.parent is serializer_1
+        assert comments_1.child.parent is comments_1
+        assert comments_1.child.fields['article_title'].context == {'prefix': '1'}
+        assert comments_2.child.fields['article_title'].context == {'prefix': '2'}
+
+
+class BatchArticleSerializer(BatchFieldsMixin, serializers.ModelSerializer):
+    comment_count = BatchMethodField()
+    first_comment = BatchMethodField(method_name='load_first_comments')
+
+    class Meta:
+        model = Article
+        fields = (
+            'id',
+            'comment_count',
+            'first_comment',
+        )
+
+    def get_comment_count_batch(self, articles):
+        return dict(
+            Article.objects.filter(pk__in=[article.pk for article in articles])
+            .annotate(comment_count=Count('comments'))
+            .values_list('pk', 'comment_count')
+        )
+
+    def load_first_comments(self, articles):
+        comments = Comment.objects.filter(article__in=articles).order_by('-id')
+        return {comment.article_id: comment.text for comment in comments}
+
+
+class CachedBatchArticleSerializer(CachedFieldsMixin, BatchArticleSerializer):
+    pass
+
+
+class TestBatchMethodField:
+    def test_list_is_loaded_in_one_call(self, django_assert_num_queries):
+        article_1, article_2, article_3 = f.ArticleFactory.create_batch(3)
+        comment_1 = f.CommentFactory.create(article=article_1)
+        f.CommentFactory.create_batch(2, article=article_2)
+        articles = list(Article.objects.order_by('id'))
+
+        with django_assert_num_queries(2):
+            data = BatchArticleSerializer(articles, many=True).data
+
+        assert data == [
+            {'id': article_1.id, 'comment_count': 1, 'first_comment': comment_1.text},
+            {'id': article_2.id, 'comment_count': 2, 'first_comment': mock.ANY},
+            {'id': article_3.id, 'comment_count': 0, 'first_comment': None},
+        ]
+
+    def test_queryset_and_cached_fields(self, django_assert_num_queries):
+        f.ArticleFactory.create_batch(3)
+
+        with django_assert_num_queries(3):
+            data = CachedBatchArticleSerializer(Article.objects.all(), many=True).data
+
+        assert [article['comment_count'] for article in data] == [0, 0, 0]
+
+    def test_single_instance(self, django_assert_num_queries):
+        article_1 = f.ArticleFactory.create()
+        f.CommentFactory.create_batch(2, article=article_1)
+
+        with django_assert_num_queries(2):
+            data = BatchArticleSerializer(article_1).data
+
+        assert data['comment_count'] == 2
+
+    def test_nested_list_without_mixin(self):
+        class CommentSerializer(serializers.ModelSerializer):
+            article_title = BatchMethodField()
+
+            class Meta:
+                model = Comment
+                fields = ('id', 'article_title')
+
+            def get_article_title_batch(self, comments):
+                return {comment.pk: comment.article.title for comment in comments}
+
+        comment_1 = f.CommentFactory.create()
+        data = CommentSerializer([comment_1], many=True).data
+
+        assert data == [{'id': comment_1.id, 'article_title': comment_1.article.title}]
+
+
+class MemoizedArticleSerializer(MemoizedRepresentationMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Article
+        fields = (
+            'id',
+            'title',
+        )
+
+
+class CommentWithArticleSerializer(CachedFieldsMixin, serializers.ModelSerializer):
+    article = MemoizedArticleSerializer()
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'article',
+        )
+
+
+class TestMemoizedRepresentationMixin:
+    def test_repeated_objects_are_serialized_once(self):
+        article_1, article_2 = f.ArticleFactory.create_batch(2)
+        comments = [
+            *f.CommentFactory.create_batch(3, article=article_1),
+            f.CommentFactory.create(article=article_2),
+        ]
+
+        with mock.patch.object(
+            serializers.ModelSerializer,
+            'to_representation',
+            autospec=True,
+            side_effect=serializers.ModelSerializer.to_representation,
+        ) as to_representation:
+            data = CommentWithArticleSerializer(comments, many=True).data
+
+        # 4 comments and 2 articles
+        assert to_representation.call_count == 6
+        assert [comment['article']['id'] for comment in data] == [article_1.id] * 3 + [
+            article_2.id
+        ]
+        assert data[0]['article'] is data[1]['article']
+
+    def test_memo_is_per_response(self):
+        comment_1 = f.CommentFactory.create()
+        data_1 = CommentWithArticleSerializer(comment_1).data
+
+        comment_1.article.title = 'changed'
+        data_2 = CommentWithArticleSerializer(comment_1).data
+
+        assert data_1['article']['title'] != 'changed'
+        assert data_2['article']['title'] == 'changed'
+
+    def test_unsaved_objects_are_not_memoized(self):
+        serializer = MemoizedArticleSerializer()
+
+        assert serializer.to_representation(Article(title='a')) == {'id': None, 'title': 'a'}
+        assert serializer.to_representation(Article(title='b')) == {'id': None, 'title': 'b'}
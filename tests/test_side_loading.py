@@ -0,0 +1,155 @@
+import pytest
+from rest_framework import routers, serializers
+from rest_framework.pagination import PageNumberPagination
+
+from rest_batteries.serializers import SideLoadedMixin
+from rest_batteries.viewsets import ModelViewSet, ReadOnlyModelViewSet
+
+from . import factories as f
+from .models import Article, Comment
+
+
+class ArticleSerializer(SideLoadedMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Article
+        fields = (
+            'id',
+            'title',
+        )
+
+
+class CommentSerializer(serializers.ModelSerializer):
+    article = ArticleSerializer(read_only=True)
+    article_id = serializers.PrimaryKeyRelatedField(
+        queryset=Article.objects.all(), source='article', write_only=True
+    )
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id',
+            'text',
+            'article',
+            'article_id',
+        )
+
+
+class PageSizePagination(PageNumberPagination):
+    page_size = 3
+
+
+class CommentViewSet(ModelViewSet):
+    queryset = Comment.objects.order_by('id')
+    request_serializer_class = CommentSerializer
+    response_serializer_class = CommentSerializer
+    side_loading = True
+
+
+class PaginatedCommentViewSet(ReadOnlyModelViewSet):
+    queryset = Comment.objects.order_by('id')
+    response_serializer_class = CommentSerializer
+    pagination_class = PageSizePagination
+    side_loading = True
+
+
+class NestedCommentViewSet(ReadOnlyModelViewSet):
+    queryset = Comment.objects.order_by('id')
+    response_serializer_class = CommentSerializer
+
+
+class ArticleViewSet(ReadOnlyModelViewSet):
+    queryset = Article.objects.order_by('id')
+    response_serializer_class = ArticleSerializer
+    side_loading = True
+
+
+router = routers.SimpleRouter()
+router.register(r'comments', CommentViewSet, basename='comment')
+router.register(r'paginated-comments', PaginatedCommentViewSet, basename='paginated-comment')
+router.register(r'nested-comments', NestedCommentViewSet, basename='nested-comment')
+router.register(r'articles', ArticleViewSet, basename='article')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture
+def comments():
+    article_1, article_2 = f.ArticleFactory.create_batch(2)
+    return [
+        f.CommentFactory.create(article=article_1),
+        f.CommentFactory.create(article=article_2),
+        f.CommentFactory.create(article=article_1),
+        f.CommentFactory.create(article=article_1),
+    ]
+
+
+def get_included(*articles):
+    return {
+        'article': {
+            str(article.id): {'id': article.id, 'title': article.title} for article in articles
+        }
+    }
+
+
+class TestSideLoading:
+    def test_list(self, api_client, comments):
+        response = api_client.get('/comments/')
+
+        assert response.status_code == 200
+        assert [comment['article'] for comment in response.data['data']] == [
+            comment.article_id for comment in comments
+        ]
+        assert response.data['included'] == get_included(comments[0].article, comments[1].article)
+
+    def test_paginated_list(self, api_client, comments):
+        response = api_client.get('/paginated-comments/', {'page': 2})
+
+        assert response.status_code == 200
+        assert response.data['count'] == 4
+        assert response.data['results'] == [
+            {'id': comments[3].id, 'text': comments[3].text, 'article': comments[3].article_id}
+        ]
+        assert response.data['included'] == get_included(comments[3].article)
+
+    def test_retrieve(self, api_client, comments):
+        comment_1 = comments[0]
+
+        response = api_client.get(f'/comments/{comment_1.id}/')
+
+        assert response.data == {
+            'data': {'id': comment_1.id, 'text': comment_1.text, 'article': comment_1.article_id},
+            'included': get_included(comment_1.article),
+        }
+
+    def test_create_is_not_side_loaded(self, api_client):
+        article_1 = f.ArticleFactory.create()
+
+        response = api_client.post('/comments/', {'text': 'text', 'article_id': article_1.id})
+
+        assert response.status_code == 201
+        assert response.data['article'] == {'id': article_1.id, 'title': article_1.title}
+
+    def test_top_level_objects_are_not_side_loaded(self, api_client):
+        article_1 = f.ArticleFactory.create()
+
+        response = api_client.get('/articles/')
+
+        assert response.data == {
+            'data': [{'id': article_1.id, 'title': article_1.title}],
+            'included': {},
+        }
+
+    def test_disabled(self, api_client, comments):
+        comment_1 = comments[0]
+
+        response = api_client.get(f'/nested-comments/{comment_1.id}/')
+
+        assert response.data['article'] == {
+            'id': comment_1.article_id,
+            'title': comment_1.article.title,
+        }
@@ -0,0 +1,111 @@
+import logging
+
+import pytest
+from django.urls import path
+from rest_framework import routers
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from rest_batteries.generics import ListAPIView
+from rest_batteries.viewsets import ModelViewSet
+
+from . import factories as f
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+
+class ArticleViewSet(ModelViewSet):
+    queryset = Article.objects.all()
+    request_serializer_class = ArticleRequestSerializer
+    response_serializer_class = ArticleResponseSerializer
+    action_slow_thresholds = {
+        'list': 0,
+        'update': 0,
+        'count': 0,
+        'retrieve': 60,
+    }
+
+    @action(detail=False)
+    def count(self, _request):
+        return Response(count_articles())
+
+
+def count_articles():
+    return Article.objects.count()
+
+
+class ArticleListView(ListAPIView):
+    queryset = Article.objects.all()
+    response_serializer_class = ArticleResponseSerializer
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+
+urlpatterns = router.urls + [
+    path('article-list/', ArticleListView.as_view()),
+]
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture
+def slow_actions(caplog):
+    caplog.set_level(logging.WARNING, logger='rest_batteries.slow_actions')
+    return lambda: [record.slow_action for record in caplog.records]
+
+
+class TestSlowActions:
+    def test_slow_action_is_logged(self, api_client, slow_actions):
+        article_1 = f.ArticleFactory.create()
+        f.CommentFactory.create(article=article_1)
+
+        api_client.get('/articles/')
+
+        (data,) = slow_actions()
+        assert data['view'] == f'{__name__}.ArticleViewSet'
+        assert data['action'] == 'list'
+        assert data['status'] == 200
+        assert data['threshold'] == 0
+        assert {'initial', 'filter_queryset', 'serialize', 'render'} <= {
+            phase['name'] for phase in data['phases']
+        }
+        articles_query, comments_query = data['queries']
+        assert articles_query['phase'] == 'serialize'
+        assert articles_query['field'] == 'ArticleResponseSerializer'
+        assert comments_query['field'] == 'ArticleResponseSerializer.comments'
+        assert comments_query['duration'] >= 0
+        assert 'rest_batteries/generics.py' in comments_query['frame']
+
+    def test_frame_of_query(self, api_client, slow_actions):
+        api_client.get('/articles/count/')
+
+        (data,) = slow_actions()
+        assert data['queries'][0]['frame'].startswith(__file__)
+        assert data['queries'][0]['frame'].endswith('in count_articles')
+
+    def test_fast_action_is_not_logged(self, api_client, slow_actions):
+        article_1 = f.ArticleFactory.create()
+
+        api_client.get(f'/articles/{article_1.id}/')
+
+        assert slow_actions() == []
+
+    def test_fallback_action(self, api_client, slow_actions):
+        article_1 = f.ArticleFactory.create()
+
+        api_client.patch(f'/articles/{article_1.id}/', data={'text': 'text'})
+
+        assert [data['action'] for data in slow_actions()] == ['partial_update']
+
+    def test_global_threshold(self, api_client, settings, slow_actions):
+        api_client.get('/article-list/')
+        assert slow_actions() == []
+
+        settings.REST_BATTERIES = {'SLOW_ACTION_THRESHOLD': 0}
+        api_client.get('/article-list/')
+
+        assert [data['action'] for data in slow_actions()] == ['get']
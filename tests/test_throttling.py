@@ -0,0 +1,174 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import routers
+from rest_framework.test import APIRequestFactory
+
+from rest_batteries.throttling import TokenBucketThrottle, UserTokenBucketThrottle
+from rest_batteries.viewsets import ModelViewSet
+
+from .models import Article
+from .serializers import ArticleRequestSerializer, ArticleResponseSerializer
+
+
+class Clock:
+    now = 0.0
+
+    @classmethod
+    def time(cls):
+        return cls.now
+
+
+class CreateThrottle(UserTokenBucketThrottle):
+    scope = 'create'
+    rate = '1/min'
+    timer = Clock.time
+
+
+class UpdateThrottle(UserTokenBucketThrottle):
+    scope = 'update'
+    rate = '2/min'
+    timer = Clock.time
+
+
+class ArticleViewSet(ModelViewSet):
+    queryset = Article.objects.all()
+    request_serializer_class = ArticleRequestSerializer
+    response_serializer_class = ArticleResponseSerializer
+    action_throttle_classes = {
+        'create': CreateThrottle,
+        'update': (UpdateThrottle,),
+    }
+
+
+router = routers.SimpleRouter()
+router.register(r'articles', ArticleViewSet, basename='article')
+
+urlpatterns = router.urls
+
+
+@pytest.fixture(autouse=True)
+def root_urlconf(settings):
+    settings.ROOT_URLCONF = __name__
+
+
+@pytest.fixture(autouse=True)
+def reset_throttles():
+    Clock.now = 0.0
+    cache.clear()
+    yield
+    for throttle_class in (CreateThrottle, UpdateThrottle, BurstThrottle, *PROCESSES):
+        throttle_class.get_buckets().clear()
+
+
+class BurstThrottle(TokenBucketThrottle):
+    rate = '60/min'
+    burst = 3
+    timer = Clock.time
+
+    def get_cache_key(self, request, view):
+        return 'client'
+
+
+def make_process_throttle(name):
+    return type(
+        name,
+        (TokenBucketThrottle,),
+        {
+            'rate': '5/h',
+            'sync_interval': 0,
+            'timer': Clock.time,
+            'get_cache_key': lambda self, request, view: 'client',
+        },
+    )
+
+
+PROCESSES = (make_process_throttle('FirstProcess'), make_process_throttle('SecondProcess'))
+
+
+def allow(throttle_class):
+    return throttle_class().allow_request(APIRequestFactory().get('/'), None)
+
+
+class TestActionThrottleClasses:
+    def test_action_throttles(self, api_client):
+        data = {'title': 'title', 'text': 'text'}
+
+        assert api_client.post('/articles/', data=data).status_code == 201
+        response = api_client.post('/articles/', data=data)
+        assert response.status_code == 429
+        assert response['Retry-After'] == '60'
+
+        assert api_client.get('/articles/').status_code == 200
+        assert api_client.get('/articles/').status_code == 200
+
+    def test_fallback_action(self, api_client):
+        article_id = api_client.post('/articles/', data={'title': 't', 'text': 't'}).data['id']
+
+        assert api_client.patch(f'/articles/{article_id}/', data={'text': 'a'}).status_code == 200
+        assert (
+            api_client.put(
+                f'/articles/{article_id}/', data={'title': 't', 'text': 'b'}
+            ).status_code
+            == 200
+        )
+        assert api_client.patch(f'/articles/{article_id}/', data={'text': 'c'}).status_code == 429
+
+    def test_users_have_separate_buckets(self, api_client, test_user_api_client):
+        data = {'title': 'title', 'text': 'text'}
+
+        assert test_user_api_client.post('/articles/', data=data).status_code == 201
+        api_client.logout()
+        assert api_client.post('/articles/', data=data).status_code == 201
+
+
+class TestTokenBucketThrottle:
+    def test_burst_and_refill(self):
+        assert [allow(BurstThrottle) for _ in range(4)] == [True, True, True, False]
+
+        Clock.now += 0.5
+        assert not allow(BurstThrottle)
+        Clock.now += 0.5
+        assert allow(BurstThrottle)
+        assert not allow(BurstThrottle)
+
+        Clock.now += 60
+        assert [allow(BurstThrottle) for _ in range(4)] == [True, True, True, False]
+
+    def test_wait(self):
+        throttle = BurstThrottle()
+        for _ in range(3):
+            throttle.allow_request(APIRequestFactory().get('/'), None)
+
+        assert throttle.wait() == pytest.approx(1)
+
+    def test_invalid_rate(self):
+        class Throttle(TokenBucketThrottle):
+            scope = 'unknown'
+
+        with pytest.raises(ImproperlyConfigured):
+            Throttle()
+
+    def test_drops_idle_buckets(self):
+        class Throttle(BurstThrottle):
+            max_buckets = 2
+
+            def get_cache_key(self, request, view):
+                return request.GET['client']
+
+        factory = APIRequestFactory()
+        for client in ('a', 'b'):
+            Throttle().allow_request(factory.get('/', {'client': client}), None)
+        Clock.now += 10
+        Throttle().allow_request(factory.get('/', {'client': 'c'}), None)
+
+        assert list(Throttle.get_buckets()) == ['c']
+
+    def test_sync_between_processes(self):
+        first, second = PROCESSES
+        allowed = [allow(throttle_class) for _ in range(5) for throttle_class in PROCESSES]
+
+        # Each process would allow 5 requests on its own
+        assert 5 <= allowed.count(True) < 8
+        assert not allow(first)
+        assert not allow(second)